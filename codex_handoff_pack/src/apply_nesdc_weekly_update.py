@@ -1,23 +1,21 @@
 from __future__ import annotations
 
 import argparse
-import hashlib
+import json
 import subprocess
 import sys
 from pathlib import Path
 
 import pandas as pd
 
+from pipeline_core.change_detection import load_change_report
+from pipeline_core.parse_cache import sha256
+from pipeline_core.poll_store import PollStore, ingest_workbooks, manifest_workbooks
 
-def sha256(path: Path) -> str:
-    h = hashlib.sha256()
-    with path.open('rb') as f:
-        while True:
-            b = f.read(1024 * 1024)
-            if not b:
-                break
-            h.update(b)
-    return h.hexdigest()
+
+APPROVAL_OUTPUTS = ('president_approval_weekly.csv', 'president_approval_weekly_detail.csv')
+# Inputs the last successful forecast/backtest/site run consumed.
+DOWNSTREAM_STATE = 'outputs/.downstream_state.json'
 
 
 def pick_latest_xlsx_from_manifest(manifest: Path) -> Path | None:
@@ -35,6 +33,26 @@ def pick_latest_xlsx_from_manifest(manifest: Path) -> Path | None:
     return p if p.exists() else None
 
 
+def downstream_inputs(base: Path) -> dict:
+    """What forecast/backtest/site read: the blended party series and the approval outputs."""
+    changes = load_change_report(base / 'outputs' / 'poll_changes.json') or {}
+    approval = {n: sha256(base / 'outputs' / n) if (base / 'outputs' / n).exists() else None for n in APPROVAL_OUTPUTS}
+    return {
+        'input_sha256': changes.get('input_sha256'),
+        'blended_sha256': changes.get('blended_sha256'),
+        'approval_sha256': approval,
+    }
+
+
+def load_downstream_state(path: Path) -> dict | None:
+    if not path.exists():
+        return None
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except Exception:
+        return None
+
+
 def run_cmd(cmd: list[str], cwd: Path) -> None:
     print('RUN:', ' '.join(cmd))
     subprocess.run(cmd, cwd=str(cwd), check=True)
@@ -45,12 +63,19 @@ def main() -> None:
     ap.add_argument('--manifest', default='outputs/nesdc_fetch_manifest.csv')
     ap.add_argument('--target-input', default='data/전국단위+선거여론조사결과의+주요+데이터(2023.10.30.~).xlsx')
     ap.add_argument('--rebuild', action='store_true', help='run pipeline/forecast/site after apply')
+    ap.add_argument('--poll-store', default='', help='also append the manifest workbooks to this point-in-time store (e.g. outputs/poll_store)')
+    ap.add_argument('--force', action='store_true', help='run forecast/backtest/site even if the change report shows no change')
     args = ap.parse_args()
 
     base = Path(__file__).resolve().parents[1]
     manifest = base / args.manifest
     target_input = base / args.target_input
 
+    if args.poll_store and manifest.exists():
+        store = PollStore(base / args.poll_store)
+        for info in ingest_workbooks(store, manifest_workbooks(manifest, base)):
+            print(f"Poll store {info['known_from']} {info['source']}: {info.get('skipped') or str(info['rows']) + ' rows'}")
+
     src = pick_latest_xlsx_from_manifest(manifest)
     if src is None:
         print('No xlsx found in manifest. Nothing to apply.')
@@ -74,12 +99,22 @@ def main() -> None:
 
     if args.rebuild:
         py = sys.executable
-        run_cmd([py, 'src/pipeline.py'], base)
+        run_cmd([py, 'src/pipeline.py', '--incremental', 'on'], base)
         run_cmd([py, 'src/president_approval_pipeline.py'], base)
         run_cmd([py, 'src/president_approval_postprocess.py'], base)
+
+        # Compare against what forecast/site last consumed, not against the last
+        # pipeline run: a pipeline run whose downstream steps failed must not
+        # make the next update look like a no-op.
+        state_path = base / DOWNSTREAM_STATE
+        inputs = downstream_inputs(base)
+        if not args.force and inputs['blended_sha256'] and load_downstream_state(state_path) == inputs:
+            print('Blended series and approval series unchanged since the last forecast/site build. Skipping forecast/backtest/site (use --force to run).')
+            return
         run_cmd([py, 'src/forecast.py', '--model', 'ssm', '--regime-guard', 'on', '--exog-approval', 'on'], base)
         run_cmd([py, 'src/backtest_report.py', '--regime-guard', 'on', '--exog-approval', 'on'], base)
         run_cmd([py, 'src/generate_site.py'], base)
+        state_path.write_text(json.dumps(inputs, ensure_ascii=False, indent=2) + '\n', encoding='utf-8')
         print('Rebuild complete.')
 
 
@@ -2,25 +2,60 @@ from __future__ import annotations
 
 import argparse
 from pathlib import Path
+from typing import Dict, List, Optional, Sequence
 
 import numpy as np
 import pandas as pd
 
 from forecast import (
-    detect_regime_shift,
     forecast_next,
     forecast_next_ssm,
     forecast_next_ssm_with_exog,
+    ModelParams,
     load_approval_weekly,
-    to_weekly,
+    load_tuned_config,
+    load_weekly_series,
+    run_backtest_walk,
 )
+from forecast_core.backtest_engine import BACKTEST_COLUMNS, _clean_party_label, run_backtest_vintages
+from forecast_core.config import Z80
+from forecast_core.features import _detect_regime_shift_reference
+from pipeline_core.parse_cache import _parquet_available
 
 
-def _clean_party_label(s: str) -> str:
-    return str(s).replace("\n", " ").strip()
+def run_backtest(
+    weekly: pd.DataFrame,
+    approval_weekly: pd.Series,
+    min_train_weeks: int = 20,
+    window_weeks: int = 24,
+    horizon_weeks: int = 1,
+    regime_guard: bool = True,
+    regime_q_scale: float = 2.0,
+    exog_approval: bool = False,
+    exog_engine: str = "closed",
+    exog_forgetting: float = 1.0,
+    jobs: Optional[int] = 1,
+    params: Optional[ModelParams] = None,
+    horizons: Optional[Sequence[int]] = None,
+) -> pd.DataFrame:
+    return run_backtest_walk(
+        weekly=weekly,
+        approval_weekly=approval_weekly,
+        min_train_weeks=min_train_weeks,
+        window_weeks=window_weeks,
+        horizon_weeks=horizon_weeks,
+        regime_guard=regime_guard,
+        regime_q_scale=regime_q_scale,
+        exog_approval=exog_approval,
+        exog_engine=exog_engine,
+        exog_forgetting=exog_forgetting,
+        jobs=jobs,
+        params=params if params is not None else ModelParams(),
+        horizons=horizons,
+    )
 
 
-def run_backtest(
+def _run_backtest_reference(
     weekly: pd.DataFrame,
     approval_weekly: pd.Series,
     min_train_weeks: int = 20,
@@ -29,16 +64,22 @@ def run_backtest(
     regime_guard: bool = True,
     regime_q_scale: float = 2.0,
     exog_approval: bool = False,
+    exog_forgetting: float = 1.0,
 ) -> pd.DataFrame:
+    """
+    The original per-origin loop: every origin re-detects the regime on its
+    training prefix and refits each party from scratch, with the closed-form
+    ARX solve. `run_backtest(..., exog_engine="closed")` returns the same rows.
+    """
     rows: list[dict] = []
     party_cols = [c for c in weekly.columns]
     if len(weekly) < min_train_weeks + horizon_weeks + 1:
-        return pd.DataFrame(columns=["date", "party", "model", "actual", "pred", "error", "abs_error", "sq_error", "triggered"])
+        return pd.DataFrame(columns=BACKTEST_COLUMNS)
 
     for t in range(min_train_weeks, len(weekly) - horizon_weeks + 1):
         train = weekly.iloc[:t]
         actual_row = weekly.iloc[t + horizon_weeks - 1]
-        regime = detect_regime_shift(train) if regime_guard else {"triggered": False}
+        regime = _detect_regime_shift_reference(train) if regime_guard else {"triggered": False}
         q_scale = regime_q_scale if regime.get("triggered", False) else 1.0
         dt = weekly.index[t + horizon_weeks - 1]
 
@@ -53,24 +94,26 @@ def run_backtest(
             pred_legacy, _ = forecast_next(
                 s_train, horizon_weeks=horizon_weeks, window_weeks=window_weeks
             )
-            pred_ssm, _, _ = forecast_next_ssm(
+            pred_ssm, sd_ssm, _ = forecast_next_ssm(
                 s_train,
                 horizon_weeks=horizon_weeks,
                 window_weeks=window_weeks,
                 q_scale=q_scale,
             )
-            preds = [("legacy", pred_legacy), ("ssm", pred_ssm)]
+            preds = [("legacy", pred_legacy, float("nan")), ("ssm", pred_ssm, sd_ssm)]
             if exog_approval and not approval_weekly.empty and isinstance(approval_weekly.index, pd.DatetimeIndex):
                 exog_hist = approval_weekly[approval_weekly.index <= s_train.index.max()]
-                pred_exog, _, _ = forecast_next_ssm_with_exog(
+                pred_exog, sd_exog, _ = forecast_next_ssm_with_exog(
                     series=s_train,
                     approval_weekly=exog_hist,
                     horizon_weeks=horizon_weeks,
                     window_weeks=window_weeks,
                     q_scale=q_scale,
+                    engine="closed",
+                    forgetting=exog_forgetting,
                 )
-                preds.append(("ssm_exog", pred_exog))
-            for model, pred in preds:
+                preds.append(("ssm_exog", pred_exog, sd_exog))
+            for model, pred, pred_sd in preds:
                 err = float(actual - pred)
                 rows.append(
                     {
@@ -83,12 +126,84 @@ def run_backtest(
                         "abs_error": abs(err),
                         "sq_error": err * err,
                         "triggered": bool(regime.get("triggered", False)),
+                        "pred_sd": float(pred_sd),
+                        "horizon": horizon_weeks,
                     }
                 )
     return pd.DataFrame(rows)
 
 
+SUMMARY_COLUMNS = ["level", "horizon", "party", "model", "n", "mae", "rmse", "hit_rate", "cover_80"]
+
+
+def _group_metrics(preds: pd.DataFrame, codes: np.ndarray) -> pd.DataFrame:
+    """
+    n, MAE, RMSE, hit rate and 80% interval coverage per integer group code,
+    indexed by the codes present. The hit rate is the share of rows whose
+    error sign matches the previous row's in the same group (the first row
+    compares with 0); coverage counts rows with |error| <= Z80 * pred_sd
+    among those with a pred_sd.
+    """
+    # Only the hit rate depends on row order: each row's previous error in its
+    # group, from a grouped shift (no stable argsort of the codes).
+    e = preds["error"].to_numpy(dtype=float)
+    prev = pd.Series(e).groupby(codes, sort=False).shift(fill_value=0.0).to_numpy()
+
+    abs_error = preds["abs_error"].to_numpy(dtype=float)
+    sd = pd.to_numeric(preds["pred_sd"], errors="coerce").to_numpy(dtype=float) if "pred_sd" in preds else np.full(len(preds), np.nan)
+    has_sd = ~np.isnan(sd)
+    n = np.bincount(codes)
+    hits = np.bincount(codes, weights=np.sign(e) == np.sign(prev), minlength=len(n))
+    n_sd = np.bincount(codes, weights=has_sd, minlength=len(n))
+    covered = np.bincount(codes, weights=has_sd & (abs_error <= Z80 * np.where(has_sd, sd, 0.0)), minlength=len(n))
+    present = np.flatnonzero(n)
+    n = n[present]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return pd.DataFrame(
+            {
+                "n": n,
+                "mae": np.bincount(codes, weights=abs_error)[present] / n,
+                "cover_80": np.where(n_sd[present] > 0, covered[present] / n_sd[present], np.nan),
+                "hit_rate": hits[present] / n,
+                "rmse": np.sqrt(np.bincount(codes, weights=preds["sq_error"].to_numpy(dtype=float))[present] / n),
+            },
+            index=present,
+        )
+
+
 def build_summary(preds: pd.DataFrame) -> pd.DataFrame:
+    """
+    Overall (per horizon and model) and per (horizon, party, model) metrics.
+    Keys are factorized once to integer codes and every metric is a
+    `np.bincount` sum per code.
+    """
+    if preds.empty:
+        return pd.DataFrame(columns=SUMMARY_COLUMNS)
+    horizon_codes, horizons = pd.factorize(preds["horizon"] if "horizon" in preds else pd.Series(1, index=preds.index), sort=True)
+    model_codes, models = pd.factorize(preds["model"], sort=True)
+    party_codes, parties = pd.factorize(preds["party"], sort=True)
+    n_m, n_p = len(models), len(parties)
+    horizons, models, parties = np.asarray(horizons), np.asarray(models, dtype=object), np.asarray(parties, dtype=object)
+
+    overall = _group_metrics(preds, horizon_codes * n_m + model_codes)
+    overall = overall.assign(
+        level="overall",
+        horizon=horizons[overall.index // n_m],
+        party="ALL",
+        model=models[overall.index % n_m],
+    )
+    by_party = _group_metrics(preds, (horizon_codes * n_p + party_codes) * n_m + model_codes)
+    by_party = by_party.assign(
+        level="party",
+        horizon=horizons[by_party.index // (n_p * n_m)],
+        party=parties[by_party.index // n_m % n_p],
+        model=models[by_party.index % n_m],
+    )
+    return pd.concat([overall, by_party], ignore_index=True)[SUMMARY_COLUMNS]
+
+
+def _build_summary_reference(preds: pd.DataFrame) -> pd.DataFrame:
+    """Per-group lambda aggregation `build_summary` replaced (no coverage); kept for parity checks."""
     if preds.empty:
         return pd.DataFrame(columns=["level", "party", "model", "n", "mae", "rmse", "hit_rate"])
 
@@ -118,14 +233,98 @@ def build_summary(preds: pd.DataFrame) -> pd.DataFrame:
     ]
 
 
-def write_markdown(summary: pd.DataFrame, out_md: Path) -> None:
+def write_columnar(preds: pd.DataFrame, path: Path) -> Optional[Path]:
+    """Write the prediction rows as Parquet or Feather (by suffix); None when pyarrow is missing."""
+    if not _parquet_available():
+        return None
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix == ".feather":
+        preds.reset_index(drop=True).to_feather(path)
+    else:
+        preds.to_parquet(path, index=False)
+    return path
+
+
+def _horizon_lines(overall: pd.DataFrame) -> List[str]:
+    """Markdown tables of overall MAE and 80% coverage per horizon (rows) and model (columns)."""
+    mae = overall.pivot(index="horizon", columns="model", values="mae").sort_index()
+    cover = overall.pivot(index="horizon", columns="model", values="cover_80").sort_index().dropna(axis=1, how="all")
+    lines = ["", "## Horizon Accuracy", ""]
+    for title, table in (("MAE", mae), ("80% interval coverage", cover)):
+        if table.empty or not len(table.columns):
+            continue
+        models = list(table.columns)
+        lines += [
+            f"{title} by forecast horizon (weeks ahead):",
+            "",
+            "| Horizon | " + " | ".join(models) + " |",
+            "|---:|" + "---:|" * len(models),
+        ]
+        for h, row in zip(table.index, table.to_numpy()):
+            lines.append(f"| {int(h)} | " + " | ".join(f"{v:.3f}" if pd.notna(v) else "-" for v in row) + " |")
+        lines.append("")
+    return lines[:-1]
+
+
+def load_vintage_series(vintage_dir: Path, name: str = "weighted_time_series.xlsx") -> Dict[pd.Timestamp, pd.DataFrame]:
+    """Weekly series of each `<vintage_dir>/<YYYY-MM-DD>/<name>` written by `pipeline.py --as-of`."""
+    out: Dict[pd.Timestamp, pd.DataFrame] = {}
+    for p in sorted(Path(vintage_dir).glob(f"*/{name}")):
+        d = pd.to_datetime(p.parent.name, format="%Y-%m-%d", errors="coerce")
+        if pd.notna(d):
+            out[pd.Timestamp(d)] = load_weekly_series(p)
+    return out
+
+
+def vintage_comparison(vintage_preds: pd.DataFrame, preds: pd.DataFrame) -> pd.DataFrame:
+    """
+    Per (horizon, model): MAE of the point-in-time forecasts and of the same
+    (target week, party) forecasts made from the final series.
+    """
+    keys = ["date", "party", "model", "horizon"]
+    both = vintage_preds[keys + ["abs_error"]].merge(
+        preds[keys + ["abs_error"]], on=keys, how="inner", suffixes=("_vintage", "_final")
+    )
+    if both.empty:
+        return pd.DataFrame(columns=["horizon", "model", "n", "mae_vintage", "mae_final"])
+    g = both.groupby(["horizon", "model"], sort=True)
+    return pd.DataFrame(
+        {
+            "n": g.size(),
+            "mae_vintage": g["abs_error_vintage"].mean(),
+            "mae_final": g["abs_error_final"].mean(),
+        }
+    ).reset_index()
+
+
+def _vintage_lines(comparison: pd.DataFrame, n_vintages: int) -> List[str]:
+    lines = [
+        "",
+        "## Vintage Replay",
+        "",
+        f"Forecasts from the poll rows published by each of {n_vintages} vintage dates vs the same targets forecast from the final series:",
+        "",
+        "| Horizon | Model | N | MAE (vintage) | MAE (final) |",
+        "|---:|---|---:|---:|---:|",
+    ]
+    for r in comparison.itertuples(index=False):
+        lines.append(f"| {int(r.horizon)} | {r.model} | {int(r.n)} | {float(r.mae_vintage):.3f} | {float(r.mae_final):.3f} |")
+    return lines
+
+
+def write_markdown(
+    summary: pd.DataFrame, out_md: Path, vintage: Optional[pd.DataFrame] = None, n_vintages: int = 0
+) -> None:
     lines = ["# Backtest Report", ""]
     if summary.empty:
         lines += ["No backtest rows generated.", ""]
         out_md.write_text("\n".join(lines), encoding="utf-8")
         return
 
-    o = summary[(summary["level"] == "overall")].copy()
+    # Headline and tables at the shortest horizon; every horizon in "Horizon Accuracy".
+    h0 = summary["horizon"].min()
+    at_h0 = summary[summary["horizon"] == h0]
+    o = at_h0[at_h0["level"] == "overall"].copy()
     models = set(o["model"])
     if not o.empty and {"legacy", "ssm"}.issubset(models):
         legacy_mae = float(o[o["model"] == "legacy"]["mae"].iloc[0])
@@ -147,42 +346,85 @@ def write_markdown(summary: pd.DataFrame, out_md: Path) -> None:
             "",
         ]
 
-    lines += ["## Overall", "", "| Model | N | MAE | RMSE | Hit Rate |", "|---|---:|---:|---:|---:|"]
-    for _, r in o.sort_values("mae").iterrows():
-        lines.append(
-            f"| {r['model']} | {int(r['n'])} | {float(r['mae']):.3f} | {float(r['rmse']):.3f} | {float(r['hit_rate']):.3f} |"
-        )
+    if summary["horizon"].nunique() > 1:
+        lines += [f"Headline and tables are for horizon {int(h0)}; see Horizon Accuracy for the rest.", ""]
+    lines += ["## Overall", "", "| Model | N | MAE | RMSE | Hit Rate | 80% Cover |", "|---|---:|---:|---:|---:|---:|"]
+    for r in o.sort_values("mae").itertuples(index=False):
+        cover = f"{float(r.cover_80):.3f}" if pd.notna(r.cover_80) else "-"
+        lines.append(f"| {r.model} | {int(r.n)} | {float(r.mae):.3f} | {float(r.rmse):.3f} | {float(r.hit_rate):.3f} | {cover} |")
 
-    p = summary[summary["level"] == "party"].copy()
+    p = at_h0[at_h0["level"] == "party"].copy()
     lines += ["", "## By Party", "", "| Party | Model | N | MAE | RMSE |", "|---|---|---:|---:|---:|"]
-    for _, r in p.sort_values(["party", "mae"]).iterrows():
-        lines.append(
-            f"| {r['party']} | {r['model']} | {int(r['n'])} | {float(r['mae']):.3f} | {float(r['rmse']):.3f} |"
-        )
+    for r in p.sort_values(["party", "mae"]).itertuples(index=False):
+        lines.append(f"| {r.party} | {r.model} | {int(r.n)} | {float(r.mae):.3f} | {float(r.rmse):.3f} |")
+
+    lines += _horizon_lines(summary[summary["level"] == "overall"])
+    if vintage is not None:
+        lines += _vintage_lines(vintage, n_vintages)
 
     out_md.write_text("\n".join(lines) + "\n", encoding="utf-8")
 
 
+def _parse_horizons(spec: str) -> List[int]:
+    """'1-4,8' -> [1, 2, 3, 4, 8]."""
+    out: List[int] = []
+    for part in spec.split(","):
+        lo, _, hi = part.strip().partition("-")
+        try:
+            out += list(range(int(lo), int(hi or lo) + 1))
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"expected horizons like 1-8 or 1,2,4: {spec}")
+    if not out or min(out) < 1:
+        raise argparse.ArgumentTypeError(f"horizons must be >= 1: {spec}")
+    return sorted(set(out))
+
+
 def main() -> None:
+    pre = argparse.ArgumentParser(add_help=False)
+    pre.add_argument("--tuned-config", default="")
+    tuned_path = pre.parse_known_args()[0].tuned_config
+    overrides, params = load_tuned_config(Path(tuned_path)) if tuned_path else ({}, ModelParams())
+
     ap = argparse.ArgumentParser(description="Run rolling one-step backtest: legacy vs ssm forecast.")
+    ap.add_argument("--tuned-config", default="", help="Recommended config from forecast_tune.py; sets defaults and model params")
     ap.add_argument("--blended-xlsx", default="outputs/weighted_time_series.xlsx")
     ap.add_argument("--min-train-weeks", type=int, default=20)
     ap.add_argument("--window-weeks", type=int, default=24)
     ap.add_argument("--horizon-weeks", type=int, default=1)
+    ap.add_argument(
+        "--horizons",
+        type=_parse_horizons,
+        default=None,
+        help="Horizons backtested in one pass, e.g. 1-8 or 1,2,4 (default: --horizon-weeks)",
+    )
     ap.add_argument("--regime-guard", choices=["on", "off"], default="on")
     ap.add_argument("--regime-q-scale", type=float, default=2.0)
     ap.add_argument("--exog-approval", choices=["off", "on"], default="off")
     ap.add_argument("--approval-weekly-csv", default="outputs/president_approval_weekly.csv")
+    ap.add_argument("--exog-engine", choices=["closed", "rls"], default="closed", help="ARX fit: closed-form ridge solve per origin, or recursive least squares (faster, agrees to ~1e-10)")
+    ap.add_argument("--exog-forgetting", type=float, default=1.0, help="RLS forgetting factor (1.0 = plain window)")
+    ap.add_argument("--jobs", type=int, default=1, help="Worker processes for the backtest shards (0 = CPU count)")
     ap.add_argument("--out-preds", default="outputs/backtest_predictions.csv")
+    ap.add_argument(
+        "--out-preds-columnar",
+        default="outputs/backtest_predictions.parquet",
+        help="Prediction rows as Parquet or Feather (.feather); empty to skip",
+    )
+    ap.add_argument(
+        "--vintage-dir",
+        default="",
+        help="Replay point-in-time vintages: <dir>/<date>/weighted_time_series.xlsx from pipeline.py --as-of",
+    )
+    ap.add_argument("--out-vintage-preds", default="outputs/backtest_vintage_predictions.csv")
     ap.add_argument("--out-summary", default="outputs/backtest_summary.csv")
     ap.add_argument("--out-report", default="outputs/backtest_report.md")
+    ap.set_defaults(**overrides)
     args = ap.parse_args()
 
     blended_path = Path(args.blended_xlsx)
     if not blended_path.exists():
         raise FileNotFoundError(f"Blended file not found: {blended_path}")
-    blended = pd.read_excel(blended_path)
-    weekly = to_weekly(blended)
+    weekly = load_weekly_series(blended_path)
     approval_weekly = (
         load_approval_weekly(Path(args.approval_weekly_csv))
         if args.exog_approval == "on"
@@ -198,22 +440,58 @@ def main() -> None:
         regime_guard=(args.regime_guard == "on"),
         regime_q_scale=args.regime_q_scale,
         exog_approval=(args.exog_approval == "on"),
+        exog_engine=args.exog_engine,
+        exog_forgetting=args.exog_forgetting,
+        jobs=args.jobs,
+        params=params,
+        horizons=args.horizons,
     )
     summary = build_summary(preds)
 
+    vintage_preds, comparison, vintages = None, None, {}
+    if args.vintage_dir:
+        vintages = load_vintage_series(Path(args.vintage_dir))
+        vintage_preds = run_backtest_vintages(
+            weekly=weekly,
+            vintages=vintages,
+            approval_weekly=approval_weekly,
+            min_train_weeks=args.min_train_weeks,
+            window_weeks=args.window_weeks,
+            horizon_weeks=args.horizon_weeks,
+            horizons=args.horizons,
+            regime_guard=(args.regime_guard == "on"),
+            regime_q_scale=args.regime_q_scale,
+            exog_approval=(args.exog_approval == "on"),
+            exog_engine=args.exog_engine,
+            exog_forgetting=args.exog_forgetting,
+            params=params,
+        )
+        comparison = vintage_comparison(vintage_preds, preds)
+
     out_preds = Path(args.out_preds)
     out_summary = Path(args.out_summary)
     out_report = Path(args.out_report)
     out_preds.parent.mkdir(parents=True, exist_ok=True)
     preds.to_csv(out_preds, index=False)
     summary.to_csv(out_summary, index=False)
-    write_markdown(summary, out_report)
+    write_markdown(summary, out_report, comparison, len(vintages))
 
     print("Wrote:", out_preds)
+    if args.out_preds_columnar:
+        out_columnar = write_columnar(preds, Path(args.out_preds_columnar))
+        if out_columnar is None:
+            print("Skipped columnar predictions: pyarrow not installed")
+        else:
+            print("Wrote:", out_columnar)
+    if vintage_preds is not None:
+        out_vintage = Path(args.out_vintage_preds)
+        vintage_preds.to_csv(out_vintage, index=False)
+        print(f"Replayed {len(vintages)} vintages from {args.vintage_dir}")
+        print("Wrote:", out_vintage)
     print("Wrote:", out_summary)
     print("Wrote:", out_report)
     if not summary.empty:
-        print(summary[summary["level"] == "overall"].sort_values("mae").to_string(index=False))
+        print(summary[summary["level"] == "overall"].sort_values(["horizon", "mae"]).to_string(index=False))
 
 
 if __name__ == "__main__":
@@ -1,18 +1,40 @@
 from __future__ import annotations
 
-from forecast_core.config import parse_args
+from forecast_core.backtest_engine import run_backtest_walk
+from forecast_core.config import load_tuned_config, parse_args
 from forecast_core.features import detect_regime_shift, load_approval_weekly, to_weekly
-from forecast_core.models import forecast_next, forecast_next_ssm, forecast_next_ssm_with_exog
+from forecast_core.io import load_weekly_series
+from forecast_core.models import (
+    ArxRls,
+    arx_frame,
+    forecast_exog_from_arx,
+    forecast_next,
+    forecast_next_ssm,
+    forecast_next_ssm_batch,
+    forecast_next_ssm_with_exog,
+)
+from forecast_core.params import ModelParams
+from forecast_core.regime import regime_at, regime_timeline
 from forecast_core.runner import run_forecast
 
 __all__ = [
+    "ArxRls",
+    "ModelParams",
+    "arx_frame",
     "detect_regime_shift",
+    "forecast_exog_from_arx",
     "forecast_next",
     "forecast_next_ssm",
+    "forecast_next_ssm_batch",
     "forecast_next_ssm_with_exog",
     "load_approval_weekly",
+    "load_tuned_config",
+    "load_weekly_series",
     "to_weekly",
     "parse_args",
+    "regime_at",
+    "regime_timeline",
+    "run_backtest_walk",
     "run_forecast",
 ]
 
@@ -1,4 +1,5 @@
-from .config import ForecastConfig, parse_args
+from .config import ForecastConfig, load_tuned_config, parse_args
+from .params import ModelParams
 from .runner import run_forecast
 
-__all__ = ["ForecastConfig", "parse_args", "run_forecast"]
+__all__ = ["ForecastConfig", "ModelParams", "load_tuned_config", "parse_args", "run_forecast"]
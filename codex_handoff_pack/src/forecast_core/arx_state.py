@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .models import ArxRls, _arx_closed_form, arx_frame
+
+ARX_STATE_VERSION = 1
+
+
+def load_arx_state(path: Path, window_weeks: int, forgetting: float) -> Dict[str, ArxRls]:
+    path = Path(path)
+    if not path.exists():
+        return {}
+    try:
+        d = json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+    if d.get("version") != ARX_STATE_VERSION or d.get("window_weeks") != window_weeks or d.get("forgetting") != forgetting:
+        return {}
+    return {p: ArxRls.from_dict(v) for p, v in d.get("parties", {}).items()}
+
+
+def save_arx_state(path: Path, states: Dict[str, ArxRls], window_weeks: int, forgetting: float) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "version": ARX_STATE_VERSION,
+        "window_weeks": window_weeks,
+        "forgetting": forgetting,
+        "parties": {p: s.to_dict() for p, s in states.items()},
+    }
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(payload, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    tmp.replace(path)
+
+
+def _is_current(st: ArxRls, frame: pd.DataFrame) -> bool:
+    """The checkpoint's window rows and row count still match `frame` up to its last week."""
+    if not st.rows or st.last not in frame.index:
+        return False
+    if int(frame.index.searchsorted(st.last, side="right")) != st.n_seen:
+        return False
+    held = frame.reindex([d for d, _, _ in st.rows])
+    return bool(
+        np.array_equal(held["y"].to_numpy(dtype=float), [y for _, y, _ in st.rows])
+        and np.array_equal(held["x"].to_numpy(dtype=float), [x for _, _, x in st.rows])
+    )
+
+
+def resume_arx_states(
+    weekly: pd.DataFrame,
+    approval_weekly: pd.Series,
+    states: Dict[str, ArxRls],
+    window_weeks: int,
+    forgetting: float = 1.0,
+    verify: bool = False,
+) -> Tuple[Dict[str, ArxRls], Dict[str, str]]:
+    """
+    Advance each party's ARX state over the weeks after its checkpoint. A
+    missing checkpoint, or one whose rows no longer match the joined
+    history, is replayed from the first row. With `verify=True`, each state's
+    prediction must match `_arx_closed_form` on the same rows.
+    Returns (states per party, mode per party).
+    """
+    out: Dict[str, ArxRls] = {}
+    modes: Dict[str, str] = {}
+    for party in weekly.columns:
+        frame = arx_frame(pd.to_numeric(weekly[party], errors="coerce"), approval_weekly)
+        st = states.get(party)
+        if st is not None and _is_current(st, frame):
+            modes[party] = f"warm:+{st.advance(frame)}"
+        else:
+            st = ArxRls(window_weeks, forgetting)
+            modes[party] = f"replay:{st.advance(frame)}"
+        out[party] = st
+        if verify and st.predict() is not None:
+            ref = _arx_closed_form(frame, window_weeks, forgetting)
+            if not np.isclose(st.predict(), ref, rtol=1e-8, atol=1e-8):
+                raise AssertionError(f"ARX state for {party} disagrees with the closed form: {st.predict()} vs {ref}")
+            modes[party] += " (verified)"
+    return out, modes
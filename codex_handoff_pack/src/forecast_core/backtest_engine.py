@@ -0,0 +1,350 @@
+from __future__ import annotations
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .models import (
+    ArxRls,
+    _fit_local_level_params_batch,
+    _linear_trend_forecasts,
+    _ssm_forecasts_from_params,
+    arx_frame,
+    forecast_exog_from_arx,
+    forecast_next_ssm_with_exog,
+)
+from .params import DEFAULT_PARAMS, ModelParams
+from .regime import regime_timeline
+
+BACKTEST_COLUMNS = ["date", "party", "model", "actual", "pred", "error", "abs_error", "sq_error", "triggered", "pred_sd", "horizon"]
+MODEL_ORDER = ("legacy", "ssm", "ssm_exog")
+# Series per batched (q, r) grid fit; bounds the (series x grid x time) working set.
+FIT_CHUNK = 4096
+
+# (origin ids, party ids) of one shard.
+Shard = Tuple[np.ndarray, np.ndarray]
+
+
+def _clean_party_label(s: str) -> str:
+    return str(s).replace("\n", " ").strip()
+
+
+def _walk_shard(
+    index: pd.DatetimeIndex,
+    values: np.ndarray,
+    approval_weekly: pd.Series,
+    origins: np.ndarray,
+    triggered: np.ndarray,
+    shard: Shard,
+    opts: dict,
+) -> Dict[str, np.ndarray]:
+    """
+    Prediction rows for the origins and parties of `shard`, written into
+    preallocated typed columns: datetime64 dates, party column `pj`, model
+    code `model` (into `MODEL_ORDER`), origin id `oi` and `horizon`; `_merge`
+    labels them. `values` is the (weeks x parties) weekly matrix. Every
+    horizon in `opts["horizons"]` whose target week is observed is forecast
+    from the same fit: one trend fit, one filter pass and one ARX step per
+    (origin, party). Each party's training prefix at origin t is the first
+    k(t) of its observed values, so windows are array slices; the (q, r) grid
+    runs over all the shard's windows in a few batches. The approval ARX is a
+    ridge solve on each origin's window by default (`exog_engine="closed"`),
+    or one RLS state per party replayed from the first row with "rls"; either
+    way any shard reproduces the serial rows.
+    """
+    window_weeks, horizons = opts["window_weeks"], opts["horizons"]
+    use_exog, exog_engine = opts["use_exog"], opts["exog_engine"]
+    params: ModelParams = opts["params"]
+    oids, pids = shard
+
+    positions = {j: np.flatnonzero(~np.isnan(values[:, j])) for j in pids}
+    n_weeks = len(values)
+    tasks: List[tuple] = []
+    for oi in oids:
+        t = origins[oi]
+        for j in pids:
+            k = int(np.searchsorted(positions[j], t))
+            if k < 8:
+                continue
+            hs = [h for h in horizons if t + h - 1 < n_weeks and not np.isnan(values[t + h - 1, j])]
+            if hs:
+                tasks.append((oi, j, hs, k))
+
+    def window(j: int, k: int) -> np.ndarray:
+        obs = values[positions[j][:k], j]
+        return obs[-window_weeks:] if k > window_weeks else obs
+
+    windows = [window(j, k) for _, j, _, k in tasks]
+    fitted: List[tuple[float, float]] = []
+    for i in range(0, len(windows), FIT_CHUNK):
+        fitted += _fit_local_level_params_batch(windows[i : i + FIT_CHUNK], params)
+
+    arx_frames: Dict[int, pd.DataFrame] = {}
+    arx_states: Dict[int, ArxRls] = {}
+    if use_exog and exog_engine == "rls":
+        for j in pids:
+            arx_frames[j] = arx_frame(pd.Series(values[:, j], index=index), approval_weekly)
+            arx_states[j] = ArxRls(window_weeks, opts["exog_forgetting"])
+
+    n_models = 3 if use_exog else 2
+    size = sum(len(hs) for _, _, hs, _ in tasks) * n_models
+    cols: Dict[str, np.ndarray] = {
+        "date": np.empty(size, dtype=index.values.dtype),
+        "pj": np.empty(size, dtype=np.int64),
+        "model": np.tile(np.arange(n_models, dtype=np.int8), size // n_models),
+        "actual": np.empty(size),
+        "pred": np.empty(size),
+        "pred_sd": np.full(size, np.nan),
+        "triggered": np.empty(size, dtype=bool),
+        "oi": np.empty(size, dtype=np.int64),
+        "horizon": np.empty(size, dtype=np.int64),
+    }
+    dates = index.values
+    at = 0
+    for (oi, j, hs, k), y, (q, r) in zip(tasks, windows, fitted):
+        t = origins[oi]
+        q_scale = opts["regime_q_scale"] if triggered[oi] else 1.0
+        ssm = _ssm_forecasts_from_params(y, max(q * float(q_scale), 1e-9), r, hs, params.recency_shrink)
+        legacy = _linear_trend_forecasts(y, hs)
+        if use_exog:
+            # The ARX step is one week ahead for every horizon; only the SSM base's sd depends on h.
+            last_obs = index[positions[j][k - 1]]
+            if exog_engine == "rls":
+                arx = arx_states[j]
+                arx.advance(arx_frames[j], until=last_obs)
+                pred_exog, _, _ = forecast_exog_from_arx(ssm[0], arx, float(y[-1]), k, params)
+            else:
+                s_train = pd.Series(values[positions[j][:k], j], index=index[positions[j][:k]])
+                pred_exog, _, _ = forecast_next_ssm_with_exog(
+                    series=s_train,
+                    approval_weekly=approval_weekly[approval_weekly.index <= last_obs],
+                    horizon_weeks=hs[0],
+                    window_weeks=window_weeks,
+                    q_scale=q_scale,
+                    base=ssm[0],
+                    engine="closed",
+                    forgetting=opts["exog_forgetting"],
+                    params=params,
+                )
+        for h, (pred_legacy, _), ssm_base in zip(hs, legacy, ssm):
+            rows = slice(at, at + n_models)
+            cols["pred"][at] = pred_legacy
+            cols["pred"][at + 1] = ssm_base[0]
+            cols["pred_sd"][at + 1] = ssm_base[1]
+            if use_exog:
+                cols["pred"][at + 2] = pred_exog
+                cols["pred_sd"][at + 2] = ssm_base[1]
+            cols["date"][rows] = dates[t + h - 1]
+            cols["pj"][rows] = j
+            cols["actual"][rows] = values[t + h - 1, j]
+            cols["triggered"][rows] = triggered[oi]
+            cols["oi"][rows] = oi
+            cols["horizon"][rows] = h
+            at += n_models
+    return cols
+
+
+# Worker-side views of the shared weekly matrix and approval series, set once per process.
+_WORKER: dict = {}
+
+
+def _share_arrays(arrays: Dict[str, np.ndarray]) -> Tuple[shared_memory.SharedMemory, dict]:
+    """Copy `arrays` into one shared-memory block; returns it and the (name -> dtype, shape, offset) layout."""
+    layout, offset = {}, 0
+    for name, a in arrays.items():
+        layout[name] = (a.dtype.str, a.shape, offset)
+        offset += a.nbytes
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for name, a in arrays.items():
+        dtype, shape, off = layout[name]
+        np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=off)[...] = a
+    return shm, layout
+
+
+def _init_worker(shm_name: str, layout: dict, triggered: np.ndarray, opts: dict) -> None:
+    shm = shared_memory.SharedMemory(name=shm_name)
+    view = {name: np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=off) for name, (dtype, shape, off) in layout.items()}
+    _WORKER.update(
+        shm=shm,
+        index=pd.DatetimeIndex(view["index"].view("datetime64[ns]")),
+        values=view["values"],
+        approval=pd.Series(view["approval"], index=pd.DatetimeIndex(view["approval_index"].view("datetime64[ns]"))),
+        origins=view["origins"],
+        triggered=triggered,
+        opts=opts,
+    )
+
+
+def _run_shard(shard: Shard) -> Dict[str, np.ndarray]:
+    w = _WORKER
+    return _walk_shard(w["index"], w["values"], w["approval"], w["origins"], w["triggered"], shard, w["opts"])
+
+
+def _shards(n_origins: int, n_parties: int, jobs: int) -> List[Shard]:
+    """Party x time-block shards, at least two per worker when there are enough origins."""
+    blocks = max(1, min(n_origins, math.ceil(2 * jobs / max(n_parties, 1))))
+    edges = np.linspace(0, n_origins, blocks + 1).astype(int)
+    return [
+        (np.arange(edges[b], edges[b + 1]), np.array([j]))
+        for b in range(blocks)
+        for j in range(n_parties)
+        if edges[b + 1] > edges[b]
+    ]
+
+
+def _merge(parts: Sequence[Dict[str, np.ndarray]], parties: Sequence[str]) -> pd.DataFrame:
+    """
+    Concatenate shard columns in (horizon, origin, party, model) order and
+    label them; each horizon's rows are in the serial walk's order.
+    """
+    cols = {c: np.concatenate([p[c] for p in parts]) for c in parts[0]}
+    if not len(cols["date"]):
+        return pd.DataFrame()
+    order = np.lexsort((cols["model"], cols["pj"], cols["oi"], cols["horizon"]))
+    cols = {c: v[order] for c, v in cols.items()}
+    error = cols["actual"] - cols["pred"]
+    labels = np.array([_clean_party_label(p) for p in parties], dtype=object)
+    return pd.DataFrame(
+        {
+            "date": pd.DatetimeIndex(cols["date"]),
+            "party": labels[cols["pj"]],
+            "model": np.array(MODEL_ORDER, dtype=object)[cols["model"]],
+            "actual": cols["actual"],
+            "pred": cols["pred"],
+            "error": error,
+            "abs_error": np.abs(error),
+            "sq_error": error * error,
+            "triggered": cols["triggered"],
+            "pred_sd": cols["pred_sd"],
+            "horizon": cols["horizon"],
+        },
+        columns=BACKTEST_COLUMNS,
+    )
+
+
+def run_backtest_walk(
+    weekly: pd.DataFrame,
+    approval_weekly: pd.Series,
+    min_train_weeks: int = 20,
+    window_weeks: int = 24,
+    horizon_weeks: int = 1,
+    regime_guard: bool = True,
+    regime_q_scale: float = 2.0,
+    exog_approval: bool = False,
+    exog_engine: str = "closed",
+    exog_forgetting: float = 1.0,
+    jobs: Optional[int] = 1,
+    params: ModelParams = DEFAULT_PARAMS,
+    horizons: Optional[Sequence[int]] = None,
+) -> pd.DataFrame:
+    """
+    Rolling-origin backtest in one walk over time; same rows as the
+    per-origin loop in `backtest_report._run_backtest_reference`.
+
+    `horizons` (default: just `horizon_weeks`) are all forecast in the same
+    pass; the rows with `horizon == h` equal a single-horizon run with
+    `horizon_weeks=h`.
+
+    The regime check is one `regime_timeline`. With `jobs` > 1 (None or 0 =
+    CPU count) the (origin block, party) shards run in a process pool; the
+    weekly matrix and approval series go to the workers once through shared
+    memory, and rows are merged in serial order, so the output is identical.
+    `params` sets the model constants (see `forecast_tune.py`).
+    """
+    n = len(weekly)
+    horizons = sorted({int(h) for h in (horizons or [horizon_weeks])})
+    horizons = [h for h in horizons if n >= min_train_weeks + h + 1]
+    if not horizons:
+        return pd.DataFrame(columns=BACKTEST_COLUMNS)
+    origins = np.arange(min_train_weeks, n - horizons[0] + 1)
+    triggered = (
+        regime_timeline(weekly, params)["triggered"].to_numpy(dtype=bool)[origins - 1]
+        if regime_guard
+        else np.zeros(len(origins), dtype=bool)
+    )
+    use_exog = exog_approval and not approval_weekly.empty and isinstance(approval_weekly.index, pd.DatetimeIndex)
+    opts = {
+        "window_weeks": window_weeks,
+        "horizons": horizons,
+        "regime_q_scale": regime_q_scale,
+        "use_exog": bool(use_exog),
+        "exog_engine": exog_engine,
+        "exog_forgetting": exog_forgetting,
+        "params": params,
+    }
+    index = pd.DatetimeIndex(weekly.index)
+    parties = list(weekly.columns)
+    values = np.column_stack([pd.to_numeric(weekly[c], errors="coerce").to_numpy(dtype=float) for c in parties]) if parties else np.empty((n, 0))
+    approval = approval_weekly if use_exog else pd.Series(dtype=float, index=pd.DatetimeIndex([]))
+
+    workers = jobs if jobs else (os.cpu_count() or 1)
+    if workers <= 1 or not parties:
+        shard = (np.arange(len(origins)), np.arange(len(parties)))
+        return _merge([_walk_shard(index, values, approval, origins, triggered, shard, opts)], parties)
+
+    shm, layout = _share_arrays(
+        {
+            "index": index.asi8,
+            "values": np.ascontiguousarray(values),
+            "approval": approval.to_numpy(dtype=float),
+            "approval_index": pd.DatetimeIndex(approval.index).asi8,
+            "origins": origins,
+        }
+    )
+    try:
+        shards = _shards(len(origins), len(parties), workers)
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(shards)),
+            initializer=_init_worker,
+            initargs=(shm.name, layout, triggered, opts),
+        ) as pool:
+            parts = list(pool.map(_run_shard, shards))
+    finally:
+        shm.close()
+        shm.unlink()
+    return _merge(parts, parties)
+
+
+def run_backtest_vintages(
+    weekly: pd.DataFrame,
+    vintages: Dict[pd.Timestamp, pd.DataFrame],
+    approval_weekly: pd.Series,
+    min_train_weeks: int = 20,
+    horizon_weeks: int = 1,
+    horizons: Optional[Sequence[int]] = None,
+    **kwargs,
+) -> pd.DataFrame:
+    """
+    Point-in-time replay. Each vintage's weekly series (blended from the poll
+    rows published by its date, e.g. `pipeline.py --as-of`) is the whole
+    training history of one origin right after its last week; forecasts are
+    scored against the final series `weekly`. Returns `run_backtest_walk`
+    rows for those origins plus the `vintage` date. Other keyword arguments
+    go to `run_backtest_walk`.
+    """
+    horizons = sorted({int(h) for h in (horizons or [horizon_weeks])})
+    parts = []
+    for known, hist in sorted(vintages.items()):
+        hist = hist.reindex(columns=weekly.columns)
+        if hist.empty or len(hist) < min_train_weeks:
+            continue
+        ahead = weekly.loc[weekly.index > hist.index[-1]].iloc[: horizons[-1]]
+        if ahead.empty:
+            continue
+        # One unobserved week at the end: run_backtest_walk wants a row past the last target.
+        pad = pd.DataFrame(np.nan, index=[ahead.index[-1] + pd.Timedelta(weeks=1)], columns=weekly.columns)
+        frame = pd.concat([hist, ahead, pad])
+        rows = run_backtest_walk(frame, approval_weekly, min_train_weeks=len(hist), horizons=horizons, **kwargs)
+        if rows.empty:
+            continue
+        edge = frame.index[len(hist) - 1 + rows["horizon"].to_numpy(dtype=int)]
+        rows = rows[pd.DatetimeIndex(rows["date"]) == edge]
+        parts.append(rows.assign(vintage=pd.Timestamp(known)))
+    if not parts:
+        return pd.DataFrame(columns=BACKTEST_COLUMNS + ["vintage"])
+    return pd.concat(parts, ignore_index=True)
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import asdict
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+from .config import ForecastConfig
+
+CACHE_VERSION = 1
+# Fields that decide where and whether results are cached, or only shape the
+# distribution written next to them, not what the cached rows are.
+_NON_KEY_FIELDS = {"cache", "cache_dir", "cache_max_mb", "dist_draws", "dist_seed"}
+
+
+def _frame_digest(h, obj) -> None:
+    h.update("|".join(map(str, getattr(obj, "columns", [getattr(obj, "name", "")]))).encode("utf-8"))
+    if len(obj):
+        h.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+
+
+def forecast_cache_key(weekly: pd.DataFrame, approval_weekly: pd.Series, cfg: ForecastConfig) -> str:
+    """sha256 of the weekly input frame, the approval series, the forecast config and, when used, the SSM/ARX checkpoints."""
+    h = hashlib.sha256()
+    h.update(f"v{CACHE_VERSION}".encode("utf-8"))
+    _frame_digest(h, weekly)
+    _frame_digest(h, approval_weekly)
+    params = {k: v for k, v in asdict(cfg).items() if k not in _NON_KEY_FIELDS}
+    h.update(json.dumps(params, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    if cfg.model != "legacy" and cfg.ssm_state != "off":
+        states = [cfg.ssm_state_path]
+        if cfg.exog_approval == "on" and cfg.exog_engine == "rls":
+            states.append(cfg.arx_state_path)
+        for state in map(Path, states):
+            h.update(state.read_bytes() if state.exists() else b"-")
+    return h.hexdigest()
+
+
+class ForecastCache:
+    """
+    Forecast rows and regime payload per input key, one JSON file each under
+    `cache_dir`. Hits refresh the entry's mtime; after a write, least
+    recently used entries are evicted until the directory fits `max_bytes`.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        self.dir = Path(cache_dir)
+        self.max_bytes = int(max_bytes)
+
+    def _path(self, key: str) -> Path:
+        return self.dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[tuple[pd.DataFrame, dict]]:
+        p = self._path(key)
+        if not p.exists():
+            return None
+        try:
+            d = json.loads(p.read_text(encoding="utf-8"))
+            os.utime(p)
+        except Exception:
+            return None
+        return pd.DataFrame(d["rows"], columns=d["columns"]), d["regime"]
+
+    def put(self, key: str, out: pd.DataFrame, regime_payload: dict) -> None:
+        payload = {
+            "version": CACHE_VERSION,
+            "columns": list(out.columns),
+            "rows": out.to_dict(orient="records"),
+            "regime": regime_payload,
+        }
+        try:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            tmp = self._path(key).with_suffix(".json.tmp")
+            tmp.write_text(json.dumps(payload, ensure_ascii=False) + "\n", encoding="utf-8")
+            tmp.replace(self._path(key))
+            self.evict()
+        except OSError as e:
+            print(f"Forecast cache write skipped ({self.dir}): {e}")
+
+    def evict(self) -> int:
+        entries = sorted(self.dir.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in entries)
+        removed = 0
+        while entries and total > self.max_bytes:
+            p = entries.pop(0)
+            total -= p.stat().st_size
+            p.unlink(missing_ok=True)
+            removed += 1
+        return removed
@@ -1,9 +1,17 @@
 from __future__ import annotations
 
 import argparse
-from dataclasses import dataclass
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, Sequence
+
+from .params import ModelParams
 
 Z80 = 1.2815515655446004
+TUNED_CONFIG_VERSION = 1
+# ForecastConfig fields a tuned config file may set, besides the model params.
+TUNED_FIELDS = ("window_weeks", "regime_q_scale")
 
 
 @dataclass(frozen=True)
@@ -15,10 +23,46 @@ class ForecastConfig:
     regime_q_scale: float
     exog_approval: str
     approval_weekly_csv: str
+    exog_engine: str = "closed"
+    exog_forgetting: float = 1.0
+    ssm_state: str = "off"
+    ssm_state_path: str = "outputs/forecast_ssm_state.json"
+    ssm_refit_weeks: int = 4
+    ssm_drift_nats: float = 0.5
+    arx_state_path: str = "outputs/forecast_arx_state.json"
+    cache: str = "on"
+    cache_dir: str = "outputs/.forecast_cache"
+    cache_max_mb: float = 16.0
+    dist_draws: int = 100_000
+    dist_seed: int = 0
+    params: ModelParams = field(default_factory=ModelParams)
+
+
+def load_tuned_config(path: Path) -> tuple[dict, ModelParams]:
+    """
+    Read a recommended config written by `forecast_tune.py`. Returns the
+    ForecastConfig field overrides (`TUNED_FIELDS`) and the model params.
+    """
+    d = json.loads(Path(path).read_text(encoding="utf-8"))
+    if d.get("version") != TUNED_CONFIG_VERSION:
+        raise ValueError(f"Unsupported tuned config version in {path}: {d.get('version')}")
+    overrides = {k: d[k] for k in TUNED_FIELDS if k in d}
+    return overrides, ModelParams.from_dict(d.get("params", {}))
 
 
-def parse_args() -> ForecastConfig:
+def parse_args(argv: Optional[Sequence[str]] = None) -> ForecastConfig:
+    # --tuned-config supplies defaults, so explicit flags still win over the file.
+    pre = argparse.ArgumentParser(add_help=False)
+    pre.add_argument("--tuned-config", default="")
+    tuned_path = pre.parse_known_args(argv)[0].tuned_config
+    overrides, params = load_tuned_config(Path(tuned_path)) if tuned_path else ({}, ModelParams())
+
     ap = argparse.ArgumentParser(description="Forecast next-week party support from blended series.")
+    ap.add_argument(
+        "--tuned-config",
+        default="",
+        help="Recommended config from forecast_tune.py (e.g. outputs/forecast_tuned_config.json); sets defaults and model params",
+    )
     ap.add_argument("--model", choices=["legacy", "ssm"], default="ssm")
     ap.add_argument("--window-weeks", type=int, default=24)
     ap.add_argument("--horizon-weeks", type=int, default=1)
@@ -26,7 +70,25 @@ def parse_args() -> ForecastConfig:
     ap.add_argument("--regime-q-scale", type=float, default=2.0, help="Q scale when regime shift is triggered")
     ap.add_argument("--exog-approval", choices=["off", "on"], default="off")
     ap.add_argument("--approval-weekly-csv", default="outputs/president_approval_weekly.csv")
-    ns = ap.parse_args()
+    ap.add_argument("--exog-engine", choices=["closed", "rls"], default="closed", help="ARX fit: closed-form ridge solve per origin, or recursive least squares (faster, agrees to ~1e-10)")
+    ap.add_argument("--exog-forgetting", type=float, default=1.0, help="RLS forgetting factor (1.0 = plain window)")
+    ap.add_argument(
+        "--ssm-state",
+        choices=["off", "on", "verify"],
+        default="off",
+        help="Resume each party's SSM filter from its checkpoint (verify: also re-filter and assert agreement)",
+    )
+    ap.add_argument("--ssm-state-path", default="outputs/forecast_ssm_state.json", help="SSM filter checkpoint path")
+    ap.add_argument("--ssm-refit-weeks", type=int, default=4, help="Re-estimate (q, r) after this many new weeks")
+    ap.add_argument("--ssm-drift-nats", type=float, default=0.5, help="Re-estimate when mean one-step NLL rises by this much")
+    ap.add_argument("--arx-state-path", default="outputs/forecast_arx_state.json", help="ARX (RLS) checkpoint path, used with --ssm-state")
+    ap.add_argument("--cache", choices=["on", "off"], default="on", help="Reuse stored results for identical inputs and config")
+    ap.add_argument("--cache-dir", default="outputs/.forecast_cache", help="Forecast result cache directory")
+    ap.add_argument("--cache-max-mb", type=float, default=16.0, help="Evict least recently used entries beyond this size")
+    ap.add_argument("--dist-draws", type=int, default=100_000, help="Joint samples for forecast_distribution.csv (0 = skip)")
+    ap.add_argument("--dist-seed", type=int, default=0)
+    ap.set_defaults(**overrides)
+    ns = ap.parse_args(argv)
     return ForecastConfig(
         model=ns.model,
         window_weeks=ns.window_weeks,
@@ -35,4 +97,17 @@ def parse_args() -> ForecastConfig:
         regime_q_scale=ns.regime_q_scale,
         exog_approval=ns.exog_approval,
         approval_weekly_csv=ns.approval_weekly_csv,
+        exog_engine=ns.exog_engine,
+        exog_forgetting=ns.exog_forgetting,
+        ssm_state=ns.ssm_state,
+        ssm_state_path=ns.ssm_state_path,
+        ssm_refit_weeks=ns.ssm_refit_weeks,
+        ssm_drift_nats=ns.ssm_drift_nats,
+        arx_state_path=ns.arx_state_path,
+        cache=ns.cache,
+        cache_dir=ns.cache_dir,
+        cache_max_mb=ns.cache_max_mb,
+        dist_draws=ns.dist_draws,
+        dist_seed=ns.dist_seed,
+        params=params,
     )
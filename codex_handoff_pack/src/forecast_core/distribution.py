@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .models import _fit_local_level_params_batch, _local_level_filter
+from .params import DEFAULT_PARAMS, ModelParams
+
+DISTRIBUTION_COLUMNS = ["party", "pred_mean", "pred_sd", "p10", "p50", "p90", "p_win", "p025", "p975"]
+GAP_COLUMNS = ["party_a", "party_b", "gap_mean", "p_gap_gt_0"]
+# Response categories that are forecast but cannot place first.
+NON_PARTY_MARKERS = ("없음", "무응답", "모름", "기타")
+
+
+def is_party(label: str) -> bool:
+    return not any(m in str(label) for m in NON_PARTY_MARKERS)
+
+
+def ssm_residuals(
+    weekly: pd.DataFrame, window_weeks: int = 24, q_scale: float = 1.0, params: ModelParams = DEFAULT_PARAMS
+) -> pd.DataFrame:
+    """One-step SSM prediction errors over each party's trailing window, aligned by week."""
+    cols, windows = [], []
+    for c in weekly.columns:
+        s = weekly[c].dropna()
+        if len(s) >= 8:
+            cols.append(c)
+            windows.append(s.iloc[-window_weeks:] if len(s) > window_weeks else s)
+    fitted = _fit_local_level_params_batch([w.to_numpy(dtype=float) for w in windows], params)
+    out = {}
+    for c, w, (q, r) in zip(cols, windows, fitted):
+        y = w.to_numpy(dtype=float)
+        q = max(q * float(q_scale), 1e-9)
+        _, _, errors, _ = _local_level_filter(y[1:], float(y[0]), max(float(np.var(y)), 1.0), q, r)
+        out[c] = pd.Series(errors, index=w.index[1:])
+    return pd.DataFrame(out, columns=list(weekly.columns))
+
+
+def residual_correlation(resid: pd.DataFrame, min_periods: int = 8) -> np.ndarray:
+    """
+    Pairwise-complete correlation of the residuals, with unknown pairs set to 0,
+    projected to the nearest positive-definite correlation matrix by clipping
+    eigenvalues, so it always has a Cholesky factor.
+    """
+    corr = resid.corr(min_periods=min_periods).to_numpy(dtype=float)
+    corr = np.where(np.isfinite(corr), corr, 0.0)
+    np.fill_diagonal(corr, 1.0)
+    vals, vecs = np.linalg.eigh(corr)
+    corr = (vecs * np.clip(vals, 1e-6, None)) @ vecs.T
+    d = np.sqrt(np.diag(corr))
+    return corr / np.outer(d, d)
+
+
+def sample_joint(mean: np.ndarray, sd: np.ndarray, corr: np.ndarray, draws: int, seed: int = 0) -> np.ndarray:
+    """(draws x parties) correlated normal samples, floored at 0 (shares cannot be negative)."""
+    rng = np.random.default_rng(seed)
+    z = rng.standard_normal((draws, len(mean)))
+    x = mean + (z @ np.linalg.cholesky(corr).T) * sd
+    return np.maximum(x, 0.0)
+
+
+def summarize_draws(parties: Sequence[str], mean: np.ndarray, sd: np.ndarray, x: np.ndarray) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Quantiles and first-place probabilities per party, and P(a - b > 0) for every ordered pair."""
+    q = np.quantile(x, [0.10, 0.50, 0.90, 0.025, 0.975], axis=0)
+    contenders = np.array([is_party(p) for p in parties])
+    p_win = np.zeros(len(parties))
+    if contenders.any():
+        idx = np.flatnonzero(contenders)
+        winners = idx[np.argmax(x[:, idx], axis=1)]
+        p_win = np.bincount(winners, minlength=len(parties)) / len(x)
+    dist = pd.DataFrame(
+        {
+            "party": list(parties),
+            "pred_mean": mean,
+            "pred_sd": sd,
+            "p10": q[0],
+            "p50": q[1],
+            "p90": q[2],
+            "p_win": p_win,
+            "p025": q[3],
+            "p975": q[4],
+        },
+        columns=DISTRIBUTION_COLUMNS,
+    )
+
+    gt = (x[:, :, None] > x[:, None, :]).mean(axis=0)
+    a, b = np.nonzero(~np.eye(len(parties), dtype=bool))
+    gaps = pd.DataFrame(
+        {
+            "party_a": np.asarray(parties, dtype=object)[a],
+            "party_b": np.asarray(parties, dtype=object)[b],
+            "gap_mean": (mean[:, None] - mean[None, :])[a, b],
+            "p_gap_gt_0": gt[a, b],
+        },
+        columns=GAP_COLUMNS,
+    )
+    return dist, gaps
+
+
+def forecast_distribution(
+    weekly: pd.DataFrame,
+    forecast: pd.DataFrame,
+    window_weeks: int = 24,
+    q_scale: float = 1.0,
+    draws: int = 100_000,
+    seed: int = 0,
+    params: ModelParams = DEFAULT_PARAMS,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Joint predictive distribution for the forecast rows: party means from
+    `next_week_pred`, scales from `pred_sd` (else `rmse`), and correlation
+    from the SSM one-step residuals. Returns (distribution, pairwise gaps).
+    """
+    fc = forecast.dropna(subset=["next_week_pred"])
+    sd = pd.to_numeric(fc["pred_sd"], errors="coerce").fillna(pd.to_numeric(fc["rmse"], errors="coerce"))
+    fc, sd = fc[sd.notna()], sd[sd.notna()]
+    parties: List[str] = fc["party"].tolist()
+    if not parties:
+        return pd.DataFrame(columns=DISTRIBUTION_COLUMNS), pd.DataFrame(columns=GAP_COLUMNS)
+
+    resid = ssm_residuals(weekly, window_weeks=window_weeks, q_scale=q_scale, params=params)
+    corr = residual_correlation(resid.reindex(columns=parties))
+
+    mean = fc["next_week_pred"].to_numpy(dtype=float)
+    x = sample_joint(mean, sd.to_numpy(dtype=float), corr, draws=draws, seed=seed)
+    return summarize_draws(parties, mean, sd.to_numpy(dtype=float), x)
+
+
+def write_distribution_outputs(outputs_dir: Path, dist: pd.DataFrame, gaps: pd.DataFrame) -> tuple[Path, Path]:
+    outputs_dir.mkdir(parents=True, exist_ok=True)
+    dist_out = outputs_dir / "forecast_distribution.csv"
+    gaps_out = outputs_dir / "forecast_gap_probabilities.csv"
+    dist.to_csv(dist_out, index=False)
+    gaps.to_csv(gaps_out, index=False)
+    return dist_out, gaps_out
@@ -4,7 +4,9 @@ from pathlib import Path
 
 import numpy as np
 import pandas as pd
-def detect_regime_shift(weekly: pd.DataFrame) -> dict:
+
+from .regime import regime_at, regime_timeline
+def _detect_regime_shift_reference(weekly: pd.DataFrame) -> dict:
     focus = [c for c in ["더불어민주당", "국민의힘", "지지정당\n없음"] if c in weekly.columns]
     if not focus:
         return {"triggered": False, "reasons": ["focus_parties_missing"], "score": 0.0}
@@ -33,6 +35,11 @@ def detect_regime_shift(weekly: pd.DataFrame) -> dict:
     return {"triggered": triggered, "reasons": reasons if reasons else ["normal"], "score": score}
 
 
+def detect_regime_shift(weekly: pd.DataFrame) -> dict:
+    """Volatility-regime check on the latest week; see `regime.regime_timeline` for every week at once."""
+    return regime_at(regime_timeline(weekly), -1) if len(weekly) else _detect_regime_shift_reference(weekly)
+
+
 def load_approval_weekly(path: Path) -> pd.Series:
     if not path.exists():
         return pd.Series(dtype=float)
@@ -62,7 +69,7 @@ def load_approval_weekly(path: Path) -> pd.Series:
     return s_clean
 
 
-def to_weekly(blended: pd.DataFrame, date_col: str = "date_end") -> pd.DataFrame:
+def _to_weekly_reference(blended: pd.DataFrame, date_col: str = "date_end") -> pd.DataFrame:
     df = blended.copy()
     df[date_col] = pd.to_datetime(df[date_col])
     df = df.sort_values(date_col).set_index(date_col)
@@ -75,3 +82,31 @@ def to_weekly(blended: pd.DataFrame, date_col: str = "date_end") -> pd.DataFrame
     return weekly
 
 
+def to_weekly(blended: pd.DataFrame, date_col: str = "date_end") -> pd.DataFrame:
+    """
+    Blended series on the W-MON grid, time-interpolated straight onto the
+    Mondays (no daily frame). Mondays before a party's first value stay NaN,
+    and Mondays after its last value carry it forward, as `_to_weekly_reference` does.
+    """
+    dates = pd.DatetimeIndex(pd.to_datetime(blended[date_col]))
+    order = np.argsort(dates.asi8, kind="stable")
+    t = dates.asi8[order]
+    party_cols = [c for c in blended.columns if c not in (date_col, "n_polls")]
+    if not len(t):
+        return pd.DataFrame(columns=party_cols, index=pd.DatetimeIndex([], name="week_monday"), dtype=float)
+
+    start = dates[order[0]]
+    # Last point of the daily grid the reference builds from `start`.
+    end = start + (dates[order[-1]] - start).floor("D")
+    grid = pd.date_range(start, end, freq="W-MON", name="week_monday")
+    g = grid.asi8
+    values = blended[party_cols].to_numpy(dtype=float)[order]
+    out = np.full((len(g), len(party_cols)), np.nan)
+    for j in range(len(party_cols)):
+        y = values[:, j]
+        ok = ~np.isnan(y)
+        if ok.any():
+            tv = t[ok]
+            out[:, j] = np.interp(g, tv, y[ok])
+            out[g < tv[0], j] = np.nan
+    return pd.DataFrame(out, index=grid, columns=party_cols)
@@ -1,13 +1,24 @@
 from __future__ import annotations
 
+import hashlib
+import importlib.util
 import json
 from pathlib import Path
+from typing import Optional
 
 import pandas as pd
-def load_blended_input(outputs_dir: Path) -> pd.DataFrame:
+
+from .features import to_weekly
+
+
+WEEKLY_SERIES_VERSION = 1
+
+
+def blended_input_path(outputs_dir: Path) -> tuple[Path, str | int]:
+    """(workbook, sheet) holding the blended daily series."""
     blended_path = outputs_dir / "weighted_time_series.xlsx"
     if blended_path.exists():
-        return pd.read_excel(blended_path)
+        return blended_path, 0
     fallback_path = outputs_dir / "weighted_poll_9_agencies_all_parties_2025_present.xlsx"
     if not fallback_path.exists():
         raise FileNotFoundError(
@@ -15,9 +26,67 @@ def load_blended_input(outputs_dir: Path) -> pd.DataFrame:
             "'outputs/weighted_time_series.xlsx' or "
             "'outputs/weighted_poll_9_agencies_all_parties_2025_present.xlsx'."
         )
-    return pd.read_excel(fallback_path, sheet_name="weighted_time_series")
+    return fallback_path, "weighted_time_series"
+
+
+def load_blended_input(outputs_dir: Path) -> pd.DataFrame:
+    path, sheet = blended_input_path(outputs_dir)
+    return pd.read_excel(path, sheet_name=sheet)
+
+
+def _file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for b in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(b)
+    return h.hexdigest()
+
+
+def load_weekly_series(blended_xlsx: Path, sheet_name: str | int = 0, artifact: Optional[Path] = None) -> pd.DataFrame:
+    """
+    `to_weekly` of the blended workbook, through the `weekly_series.parquet`
+    artifact next to it. The artifact's `weekly_series.json` records the
+    format version and the workbook sha256; when both match it is read
+    directly, otherwise the workbook is parsed and the artifact rewritten.
+    Without pyarrow the frame is built every time.
+    """
+    blended_xlsx = Path(blended_xlsx)
+    artifact = Path(artifact) if artifact is not None else blended_xlsx.parent / "weekly_series.parquet"
+    meta_path = artifact.with_suffix(".json")
+    if importlib.util.find_spec("pyarrow") is None:
+        return to_weekly(pd.read_excel(blended_xlsx, sheet_name=sheet_name))
+
+    meta = {
+        "version": WEEKLY_SERIES_VERSION,
+        "source": blended_xlsx.name,
+        "sheet": sheet_name,
+        "source_sha256": _file_sha256(blended_xlsx),
+    }
+    if artifact.exists() and meta_path.exists():
+        try:
+            stored = json.loads(meta_path.read_text(encoding="utf-8"))
+            if all(stored.get(k) == v for k, v in meta.items()):
+                weekly = pd.read_parquet(artifact)
+                weekly.index = pd.DatetimeIndex(weekly.index, freq="W-MON", name="week_monday")
+                return weekly
+        except Exception:
+            pass
+
+    weekly = to_weekly(pd.read_excel(blended_xlsx, sheet_name=sheet_name))
+    try:
+        tmp = artifact.with_suffix(".parquet.tmp")
+        weekly.to_parquet(tmp)
+        tmp.replace(artifact)
+        meta.update(rows=int(len(weekly)), columns=list(weekly.columns))
+        meta_path.write_text(json.dumps(meta, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    except Exception as e:
+        print(f"Weekly series write skipped ({artifact}): {e}")
+    return weekly
 
 
+def load_weekly_input(outputs_dir: Path) -> pd.DataFrame:
+    path, sheet = blended_input_path(outputs_dir)
+    return load_weekly_series(path, sheet_name=sheet)
 
 
 def write_forecast_outputs(outputs_dir: Path, out: pd.DataFrame, regime_payload: dict) -> Path:
@@ -1,9 +1,17 @@
 from __future__ import annotations
 
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence
+
 import numpy as np
 import pandas as pd
 
-RECENCY_SHRINK = 0.35
+from .params import DEFAULT_PARAMS, Q_GRID, R_GRID, RECENCY_SHRINK, ModelParams
+
+# ARX(1) approval model: ridge strength and minimum joined rows / training pairs.
+ARX_RIDGE = 1e-3
+ARX_MIN_ROWS = 12
+ARX_MIN_PAIRS = 8
 def forecast_next(series: pd.Series, horizon_weeks: int = 1, window_weeks: int = 16) -> tuple[float, float]:
     s = series.dropna()
     if len(s) < 6:
@@ -11,7 +19,16 @@ def forecast_next(series: pd.Series, horizon_weeks: int = 1, window_weeks: int =
         return last, float("nan")
 
     s = s.iloc[-window_weeks:] if len(s) > window_weeks else s
-    y = s.values.astype(float)
+    return _linear_trend_forecast(s.values.astype(float), horizon_weeks)
+
+
+def _linear_trend_forecast(y: np.ndarray, horizon_weeks: int) -> tuple[float, float]:
+    """`forecast_next` on an already-trimmed window of at least 6 values."""
+    return _linear_trend_forecasts(y, [horizon_weeks])[0]
+
+
+def _linear_trend_forecasts(y: np.ndarray, horizons: Sequence[int]) -> List[tuple[float, float]]:
+    """`_linear_trend_forecast` for each horizon from one trend fit."""
     x = np.arange(len(y), dtype=float)
 
     A = np.vstack([x, np.ones_like(x)]).T
@@ -24,11 +41,9 @@ def forecast_next(series: pd.Series, horizon_weeks: int = 1, window_weeks: int =
 
     # damp slope to avoid runaway
     slope_d = 0.5 * slope
-    next_x = (len(y) - 1) + horizon_weeks
     # anchor at last fitted point
     anchor = yhat[-1]
-    pred = float(anchor + slope_d * horizon_weeks)
-    return pred, sigma
+    return [(float(anchor + slope_d * h), sigma) for h in horizons]
 
 
 def _kalman_local_level_nll(y: np.ndarray, q: float, r: float) -> float:
@@ -51,14 +66,83 @@ def _kalman_local_level_nll(y: np.ndarray, q: float, r: float) -> float:
     return float(nll)
 
 
+def _kalman_local_level_nll_batch(y: np.ndarray, lengths: np.ndarray, q: np.ndarray, r: np.ndarray) -> np.ndarray:
+    """
+    `_kalman_local_level_nll` for many series and parameter pairs at once.
+
+    `y` is (series x time), right-padded past each series' length; `q` and `r`
+    are (series x grid). The filter advances all cells one time step per
+    iteration, and cells past their series' end stop updating. Returns the
+    (series x grid) negative log-likelihoods.
+    """
+    n_series, n_time = y.shape
+    p0 = np.array([max(float(np.var(y[i, :n])), 1.0) for i, n in enumerate(lengths)])
+    mu = np.repeat(y[:, :1], q.shape[1], axis=1)
+    p = np.repeat(p0[:, None], q.shape[1], axis=1)
+    nll = np.zeros(q.shape)
+    dead = np.zeros(q.shape, dtype=bool)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for t in range(1, n_time):
+            active = (t < lengths)[:, None]
+            p_pred = p + q
+            s = p_pred + r
+            dead |= active & ~((s > 0) & np.isfinite(s))
+            live = active & ~dead
+            e = y[:, t:t + 1] - mu
+            nll = np.where(live, nll + 0.5 * (np.log(s) + (e * e) / s), nll)
+            k = p_pred / s
+            mu = np.where(live, mu + k * e, mu)
+            p = np.where(live, (1.0 - k) * p_pred, p)
+    nll[dead] = np.inf
+    return nll
+
+
+def _fit_local_level_params_batch(ys: Sequence[np.ndarray], params: ModelParams = DEFAULT_PARAMS) -> List[tuple[float, float]]:
+    """
+    Grid-search (q, r) for every series in one batched filter run. Returns the
+    same argmin as `_fit_local_level_params` on each series: the first grid
+    point, r-major then q, with the smallest finite NLL. The grids are scaled
+    by `params.r_grid_scale` / `params.q_grid_scale`.
+    """
+    if not len(ys):
+        return []
+    lengths = np.array([len(y) for y in ys], dtype=int)
+    y = np.full((len(ys), int(lengths.max())), np.nan)
+    for i, v in enumerate(ys):
+        y[i, : len(v)] = v
+    scale = np.array([max(float(np.var(v)), 1e-3) for v in ys])
+
+    rf, qf = np.meshgrid(
+        np.asarray(R_GRID, dtype=float) * params.r_grid_scale,
+        np.asarray(Q_GRID, dtype=float) * params.q_grid_scale,
+        indexing="ij",
+    )
+    r = rf.ravel()[None, :] * scale[:, None]
+    q = qf.ravel()[None, :] * scale[:, None]
+    nll = _kalman_local_level_nll_batch(y, lengths, q, r)
+    nll = np.where(np.isnan(nll), np.inf, nll)
+
+    out = []
+    for i in range(len(ys)):
+        j = int(np.argmin(nll[i]))
+        if np.isfinite(nll[i, j]):
+            out.append((float(q[i, j]), float(r[i, j])))
+        else:
+            out.append((float(0.02 * scale[i]), float(0.2 * scale[i])))
+    return out
+
+
 def _fit_local_level_params(y: np.ndarray) -> tuple[float, float]:
+    return _fit_local_level_params_batch([y])[0]
+
+
+def _fit_local_level_params_reference(y: np.ndarray) -> tuple[float, float]:
+    """Scalar grid search over `_kalman_local_level_nll`; kept for parity checks."""
     var_y = float(np.var(y))
     scale = max(var_y, 1e-3)
-    r_grid = [0.05, 0.1, 0.2, 0.4, 0.8, 1.2]
-    q_grid = [0.001, 0.003, 0.01, 0.03, 0.07, 0.15, 0.3]
     best = (float("inf"), 0.02 * scale, 0.2 * scale)
-    for rf in r_grid:
-        for qf in q_grid:
+    for rf in R_GRID:
+        for qf in Q_GRID:
             r = rf * scale
             q = qf * scale
             nll = _kalman_local_level_nll(y, q=q, r=r)
@@ -67,68 +151,109 @@ def _fit_local_level_params(y: np.ndarray) -> tuple[float, float]:
     return float(best[1]), float(best[2])
 
 
-def forecast_next_ssm(
-    series: pd.Series,
-    horizon_weeks: int = 1,
-    window_weeks: int = 24,
-    q_scale: float = 1.0,
-) -> tuple[float, float, float]:
-    s = series.dropna()
-    if len(s) < 8:
-        pred, rmse = forecast_next(s, horizon_weeks=horizon_weeks, window_weeks=window_weeks)
-        return pred, float("nan"), rmse
-
-    s = s.iloc[-window_weeks:] if len(s) > window_weeks else s
-    y = s.to_numpy(dtype=float)
-    q, r = _fit_local_level_params(y)
-    q = max(q * float(q_scale), 1e-9)
-
-    mu = float(y[0])
-    p = max(float(np.var(y)), 1.0)
+def _local_level_filter(y: np.ndarray, mu: float, p: float, q: float, r: float) -> tuple[float, float, list, float]:
+    """Advance the local-level filter over `y` from (mu, p). Returns (mu, p, one-step errors, NLL)."""
     pred_errors = []
-    for t in range(1, len(y)):
+    nll = 0.0
+    for v in y:
         mu_pred = mu
         p_pred = p + q
         s_var = p_pred + r
-        e = float(y[t] - mu_pred)
+        e = float(v - mu_pred)
         pred_errors.append(e)
+        nll += 0.5 * (np.log(s_var) + (e * e) / s_var)
         k = p_pred / s_var
         mu = mu_pred + k * e
         p = (1.0 - k) * p_pred
+    return mu, p, pred_errors, float(nll)
+
 
+def _ssm_forecast(
+    mu: float,
+    p: float,
+    q: float,
+    r: float,
+    latest_y: float,
+    horizon_weeks: int,
+    pred_errors: Sequence[float],
+    recency_shrink: float = RECENCY_SHRINK,
+) -> tuple[float, float, float]:
     # h-step ahead latent and observed variance
     p_future = p + horizon_weeks * q
     pred_mean = float(mu)
     # Pull the one-step forecast toward the latest observed level for faster adaptation.
-    latest_y = float(y[-1])
-    pred_mean = float((1.0 - RECENCY_SHRINK) * pred_mean + RECENCY_SHRINK * latest_y)
+    pred_mean = float((1.0 - recency_shrink) * pred_mean + recency_shrink * float(latest_y))
     pred_sd = float(np.sqrt(max(p_future + r, 1e-9)))
-    rmse = float(np.sqrt(np.mean(np.square(pred_errors)))) if pred_errors else float("nan")
+    rmse = float(np.sqrt(np.mean(np.square(pred_errors)))) if len(pred_errors) else float("nan")
     return pred_mean, pred_sd, rmse
 
 
-def forecast_next_ssm_with_exog(
+def _ssm_from_params(
+    y: np.ndarray, q: float, r: float, horizon_weeks: int, recency_shrink: float = RECENCY_SHRINK
+) -> tuple[float, float, float]:
+    return _ssm_forecasts_from_params(y, q, r, [horizon_weeks], recency_shrink)[0]
+
+
+def _ssm_forecasts_from_params(
+    y: np.ndarray, q: float, r: float, horizons: Sequence[int], recency_shrink: float = RECENCY_SHRINK
+) -> List[tuple[float, float, float]]:
+    """`_ssm_from_params` for each horizon from one filter pass."""
+    mu, p, pred_errors, _ = _local_level_filter(y[1:], float(y[0]), max(float(np.var(y)), 1.0), q, r)
+    return [_ssm_forecast(mu, p, q, r, y[-1], h, pred_errors, recency_shrink) for h in horizons]
+
+
+def forecast_next_ssm_batch(
+    series: Sequence[pd.Series],
+    horizon_weeks: int = 1,
+    window_weeks: int = 24,
+    q_scale: float = 1.0,
+    params: ModelParams = DEFAULT_PARAMS,
+) -> List[tuple[float, float, float]]:
+    """`forecast_next_ssm` for several series (e.g. all parties), fitting their (q, r) in one batch."""
+    out: List[Optional[tuple[float, float, float]]] = [None] * len(series)
+    windows = []
+    for i, ser in enumerate(series):
+        s = ser.dropna()
+        if len(s) < 8:
+            pred, rmse = forecast_next(s, horizon_weeks=horizon_weeks, window_weeks=window_weeks)
+            out[i] = (pred, float("nan"), rmse)
+            continue
+        s = s.iloc[-window_weeks:] if len(s) > window_weeks else s
+        windows.append((i, s.to_numpy(dtype=float)))
+
+    fitted = _fit_local_level_params_batch([y for _, y in windows], params)
+    for (i, y), (q, r) in zip(windows, fitted):
+        q = max(q * float(q_scale), 1e-9)
+        out[i] = _ssm_from_params(y, q, r, horizon_weeks, params.recency_shrink)
+    return out
+
+
+def forecast_next_ssm(
     series: pd.Series,
-    approval_weekly: pd.Series,
     horizon_weeks: int = 1,
     window_weeks: int = 24,
     q_scale: float = 1.0,
+    params: ModelParams = DEFAULT_PARAMS,
 ) -> tuple[float, float, float]:
-    base_pred, pred_sd, rmse = forecast_next_ssm(
-        series=series,
-        horizon_weeks=horizon_weeks,
-        window_weeks=window_weeks,
-        q_scale=q_scale,
-    )
-    s = series.dropna()
-    if len(s) < 12 or approval_weekly.empty:
-        return base_pred, pred_sd, rmse
+    return forecast_next_ssm_batch(
+        [series], horizon_weeks=horizon_weeks, window_weeks=window_weeks, q_scale=q_scale, params=params
+    )[0]
+
 
-    df = pd.DataFrame({"y": s.astype(float)})
+def arx_frame(series: pd.Series, approval_weekly: pd.Series) -> pd.DataFrame:
+    """Weeks where both the party series (`y`) and approval (`x`) are observed, oldest first."""
+    df = pd.DataFrame({"y": series.dropna().astype(float)})
     df = df.join(approval_weekly.rename("x"), how="left")
-    df = df.dropna(subset=["y", "x"]).sort_index()
-    if len(df) < 12:
-        return base_pred, pred_sd, rmse
+    return df.dropna(subset=["y", "x"]).sort_index()
+
+
+def _arx_closed_form(df: pd.DataFrame, window_weeks: int, forgetting: float = 1.0) -> Optional[float]:
+    """
+    Reference ARX(1) fit: ridge solve over the last `window_weeks` rows of `df`,
+    pairs weighted forgetting**age and the ridge by forgetting**(pairs ever seen),
+    which is what `ArxRls` carries forward. None when there are too few pairs.
+    """
+    n_pairs_seen = len(df) - 1
     if len(df) > window_weeks:
         df = df.iloc[-window_weeks:]
 
@@ -136,20 +261,179 @@ def forecast_next_ssm_with_exog(
     y_t = df["y"].iloc[:-1].to_numpy(dtype=float)
     x_t = df["x"].iloc[:-1].to_numpy(dtype=float)
     y_tp1 = df["y"].iloc[1:].to_numpy(dtype=float)
-    if len(y_tp1) < 8:
-        return base_pred, pred_sd, rmse
+    if len(y_tp1) < ARX_MIN_PAIRS:
+        return None
 
     X = np.column_stack([np.ones_like(y_t), y_t, x_t])
+    w = forgetting ** np.arange(len(y_tp1) - 1, -1, -1, dtype=float)
     # Ridge-stabilized closed-form for small samples.
-    ridge = 1e-3 * np.eye(X.shape[1])
-    beta = np.linalg.solve(X.T @ X + ridge, X.T @ y_tp1)
+    ridge = ARX_RIDGE * forgetting**n_pairs_seen * np.eye(X.shape[1])
+    beta = np.linalg.solve((X * w[:, None]).T @ X + ridge, (X * w[:, None]).T @ y_tp1)
     y_last = float(df["y"].iloc[-1])
     x_last = float(df["x"].iloc[-1])
-    pred_arx = float(beta[0] + beta[1] * y_last + beta[2] * x_last)
+    return float(beta[0] + beta[1] * y_last + beta[2] * x_last)
+
+
+@dataclass
+class ArxRls:
+    """
+    ARX(1) y_{t+1} = a + b*y_t + c*x_t by recursive least squares with
+    forgetting factor `forgetting`, over the last `window` rows of an
+    `arx_frame`. Each new row is one rank-1 update of (theta, P), and the
+    pair leaving the window is removed by a rank-1 downdate. The downdates
+    accumulate rounding error, so every `window` pushes (theta, P) is rebuilt
+    from the window with the `_arx_closed_form` solve; between rebuilds the
+    prediction tracks the closed form to about 1e-9. `rows` holds the window.
+    """
+
+    window: int
+    forgetting: float = 1.0
+    theta: np.ndarray = field(default_factory=lambda: np.zeros(3))
+    P: np.ndarray = field(default_factory=lambda: np.eye(3) / ARX_RIDGE)
+    rows: List[tuple] = field(default_factory=list)
+    n_seen: int = 0
+
+    @property
+    def n_pairs(self) -> int:
+        return max(len(self.rows) - 1, 0)
+
+    @property
+    def last(self) -> Optional[pd.Timestamp]:
+        return self.rows[-1][0] if self.rows else None
+
+    def _add(self, phi: np.ndarray, y: float) -> None:
+        lam = self.forgetting
+        Pphi = self.P @ phi
+        k = Pphi / (lam + phi @ Pphi)
+        self.theta = self.theta + k * (y - phi @ self.theta)
+        P = (self.P - np.outer(k, Pphi)) / lam
+        self.P = 0.5 * (P + P.T)
+
+    def _remove(self, phi: np.ndarray, y: float, weight: float) -> None:
+        Pphi = self.P @ phi
+        P = self.P + np.outer(Pphi, Pphi) / (1.0 / weight - phi @ Pphi)
+        self.P = 0.5 * (P + P.T)
+        self.theta = self.theta - weight * (self.P @ phi) * (y - phi @ self.theta)
+
+    def _resync(self) -> None:
+        """(theta, P) of `_arx_closed_form` on the current window."""
+        if len(self.rows) < 2:
+            return
+        vals = np.array([(y, x) for _, y, x in self.rows], dtype=float)
+        X = np.column_stack([np.ones(len(vals) - 1), vals[:-1, 0], vals[:-1, 1]])
+        w = self.forgetting ** np.arange(len(vals) - 2, -1, -1, dtype=float)
+        A = (X * w[:, None]).T @ X + ARX_RIDGE * self.forgetting ** (self.n_seen - 1) * np.eye(3)
+        self.theta = np.linalg.solve(A, (X * w[:, None]).T @ vals[1:, 0])
+        P = np.linalg.inv(A)
+        self.P = 0.5 * (P + P.T)
+
+    def push(self, date: pd.Timestamp, y: float, x: float) -> None:
+        if self.rows:
+            _, y0, x0 = self.rows[-1]
+            self._add(np.array([1.0, y0, x0]), y)
+        self.rows.append((pd.Timestamp(date), float(y), float(x)))
+        self.n_seen += 1
+        if len(self.rows) > self.window:
+            (_, ya, xa), (_, yb, _) = self.rows[0], self.rows[1]
+            self._remove(np.array([1.0, ya, xa]), yb, self.forgetting ** (len(self.rows) - 2))
+            self.rows.pop(0)
+        if self.n_seen % self.window == 0:
+            self._resync()
+
+    def advance(self, frame: pd.DataFrame, until: Optional[pd.Timestamp] = None) -> int:
+        """Push the rows of `frame` after `last` and up to `until`; returns how many."""
+        idx = frame.index
+        t = idx.asi8
+        start = int(np.searchsorted(t, self.last.value, side="right")) if self.rows else 0
+        stop = len(t) if until is None else int(np.searchsorted(t, pd.Timestamp(until).value, side="right"))
+        if stop <= start:
+            return 0
+        ys = frame["y"].to_numpy(dtype=float)
+        xs = frame["x"].to_numpy(dtype=float)
+        for i in range(start, stop):
+            self.push(idx[i], ys[i], xs[i])
+        return stop - start
 
+    def predict(self) -> Optional[float]:
+        if self.n_seen < ARX_MIN_ROWS or self.n_pairs < ARX_MIN_PAIRS:
+            return None
+        _, y, x = self.rows[-1]
+        return float(self.theta @ np.array([1.0, y, x]))
+
+    def to_dict(self) -> dict:
+        return {
+            "window": self.window,
+            "forgetting": self.forgetting,
+            "theta": [float(v) for v in self.theta],
+            "P": [[float(v) for v in r] for r in self.P],
+            "rows": [[str(d.date()), y, x] for d, y, x in self.rows],
+            "n_seen": self.n_seen,
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "ArxRls":
+        return cls(
+            window=int(d["window"]),
+            forgetting=float(d["forgetting"]),
+            theta=np.asarray(d["theta"], dtype=float),
+            P=np.asarray(d["P"], dtype=float),
+            rows=[(pd.Timestamp(r[0]), float(r[1]), float(r[2])) for r in d["rows"]],
+            n_seen=int(d["n_seen"]),
+        )
+
+
+def _blend_exog(base_pred: float, pred_arx: float, latest_y: float, params: ModelParams = DEFAULT_PARAMS) -> float:
     # Blend to preserve baseline stability.
-    pred = 0.65 * float(base_pred) + 0.35 * pred_arx
-    latest_y = float(s.iloc[-1])
-    pred = float((1.0 - RECENCY_SHRINK) * pred + RECENCY_SHRINK * latest_y)
-    return float(pred), pred_sd, rmse
+    w = params.exog_weight
+    pred = (1.0 - w) * float(base_pred) + w * pred_arx
+    return float((1.0 - params.recency_shrink) * pred + params.recency_shrink * latest_y)
+
 
+def forecast_exog_from_arx(
+    base: tuple[float, float, float], arx: ArxRls, latest_y: float, n_obs: int, params: ModelParams = DEFAULT_PARAMS
+) -> tuple[float, float, float]:
+    """`forecast_next_ssm_with_exog` from an `ArxRls` already advanced to the series' last week."""
+    base_pred, pred_sd, rmse = base
+    pred_arx = arx.predict() if n_obs >= ARX_MIN_ROWS else None
+    if pred_arx is None:
+        return base_pred, pred_sd, rmse
+    return _blend_exog(base_pred, pred_arx, latest_y, params), pred_sd, rmse
+
+
+def forecast_next_ssm_with_exog(
+    series: pd.Series,
+    approval_weekly: pd.Series,
+    horizon_weeks: int = 1,
+    window_weeks: int = 24,
+    q_scale: float = 1.0,
+    base: Optional[tuple[float, float, float]] = None,
+    engine: str = "closed",
+    forgetting: float = 1.0,
+    arx: Optional[ArxRls] = None,
+    params: ModelParams = DEFAULT_PARAMS,
+) -> tuple[float, float, float]:
+    """
+    `base` is this series' forecast_next_ssm result when the caller already has it.
+    engine="closed" solves the ridge system from scratch;
+    engine="rls" advances `arx` (a fresh one when None) over the new rows.
+    """
+    base = base if base is not None else forecast_next_ssm(
+        series=series,
+        horizon_weeks=horizon_weeks,
+        window_weeks=window_weeks,
+        q_scale=q_scale,
+        params=params,
+    )
+    s = series.dropna()
+    if len(s) < ARX_MIN_ROWS or approval_weekly.empty:
+        return base
+    df = arx_frame(s, approval_weekly)
+    if engine == "closed":
+        pred_arx = _arx_closed_form(df, window_weeks, forgetting) if len(df) >= ARX_MIN_ROWS else None
+        if pred_arx is None:
+            return base
+        return _blend_exog(base[0], pred_arx, float(s.iloc[-1]), params), base[1], base[2]
+    if arx is None:
+        arx = ArxRls(window_weeks, forgetting)
+    arx.advance(df)
+    return forecast_exog_from_arx(base, arx, float(s.iloc[-1]), len(s), params)
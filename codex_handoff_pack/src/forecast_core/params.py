@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, fields
+
+RECENCY_SHRINK = 0.35
+# Weight of the ARX(1) approval prediction in the ssm_exog blend.
+EXOG_WEIGHT = 0.35
+# Local-level parameter grid, as multiples of the series variance.
+R_GRID = [0.05, 0.1, 0.2, 0.4, 0.8, 1.2]
+Q_GRID = [0.001, 0.003, 0.01, 0.03, 0.07, 0.15, 0.3]
+# Regime guard: recent / baseline diff windows (weeks) and the volatility z that triggers it.
+RECENT_W = 4
+BASE_W = 12
+Z_TRIGGER = 2.0
+
+
+@dataclass(frozen=True)
+class ModelParams:
+    """
+    Model constants that `forecast_tune.py` searches over. The defaults are the
+    module constants above, so a default instance reproduces the untuned
+    forecasts and backtest exactly. The grid scales multiply `R_GRID`/`Q_GRID`.
+    """
+
+    recency_shrink: float = RECENCY_SHRINK
+    exog_weight: float = EXOG_WEIGHT
+    q_grid_scale: float = 1.0
+    r_grid_scale: float = 1.0
+    regime_recent_w: int = RECENT_W
+    regime_base_w: int = BASE_W
+    regime_z: float = Z_TRIGGER
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "ModelParams":
+        names = {f.name: f.type for f in fields(cls)}
+        unknown = set(d) - set(names)
+        if unknown:
+            raise ValueError(f"Unknown model params: {sorted(unknown)}")
+        return cls(**{k: (int(v) if names[k] == "int" else float(v)) for k, v in d.items()})
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+DEFAULT_PARAMS = ModelParams()
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .params import BASE_W, DEFAULT_PARAMS, RECENT_W, Z_TRIGGER, ModelParams
+
+FOCUS_PARTIES = ["더불어민주당", "국민의힘", "지지정당\n없음"]
+
+
+def _party_z(s: pd.Series, recent_w: int = RECENT_W, base_w: int = BASE_W) -> np.ndarray:
+    """
+    z at every row of `s`: the volatility z that `detect_regime_shift` gives for
+    the prefix ending at that row, NaN where the prefix is too short. Windows
+    run over the diffs of the non-missing values, as on `s.dropna()`.
+    """
+    z = np.full(len(s), np.nan)
+    ok = s.notna().to_numpy()
+    v = s.to_numpy(dtype=float)[ok]
+    if len(v) < recent_w + base_w + 1:
+        return z
+    d = v[1:] - v[:-1]
+    # Diff windows ending at diff k cover the prefix of the first k + 2 values.
+    recent = sliding_window_view(d, recent_w)[base_w:]
+    base = sliding_window_view(d, base_w)[: len(d) - base_w - recent_w + 1]
+    recent_abs = np.abs(recent).sum(axis=1) / recent_w
+    avg = base.sum(axis=1) / base_w
+    base_std = np.sqrt(((avg[:, None] - base) ** 2).sum(axis=1) / base_w)
+    zk = recent_abs / np.maximum(base_std, 1e-6)
+    rows = np.flatnonzero(ok)[recent_w + base_w:]
+    z[rows] = zk
+    # Rows after a missing value keep the last prefix's z.
+    return pd.Series(z).where(pd.Series(ok).cumsum() > recent_w + base_w).ffill().to_numpy()
+
+
+def regime_timeline(weekly: pd.DataFrame, params: ModelParams = DEFAULT_PARAMS) -> pd.DataFrame:
+    """
+    Regime statistics for every prefix `weekly.iloc[:i + 1]` in one pass:
+    per focus party the volatility z (recent mean |diff| over the baseline
+    diff std), plus `score` (max z) and `triggered` (any z >= 2). Row i
+    matches `detect_regime_shift(weekly.iloc[:i + 1])`. Window lengths and
+    the trigger come from `params` (defaults 4, 12 and 2.0).
+    """
+    focus = [c for c in FOCUS_PARTIES if c in weekly.columns]
+    zs = pd.DataFrame(
+        {p: _party_z(weekly[p], params.regime_recent_w, params.regime_base_w) for p in focus},
+        index=weekly.index,
+        columns=focus,
+    )
+    out = zs.copy()
+    out["score"] = zs.max(axis=1, skipna=True)
+    out["triggered"] = (zs >= params.regime_z).any(axis=1)
+    return out
+
+
+def regime_at(timeline: pd.DataFrame, i: int, params: ModelParams = DEFAULT_PARAMS) -> dict:
+    """`detect_regime_shift` payload for row `i` of a `regime_timeline` built with the same `params`."""
+    focus = [c for c in timeline.columns if c not in ("score", "triggered")]
+    if not focus:
+        return {"triggered": False, "reasons": ["focus_parties_missing"], "score": 0.0}
+    row = timeline.iloc[i]
+    zs = [(p, float(row[p])) for p in focus if pd.notna(row[p])]
+    if not zs:
+        return {"triggered": False, "reasons": ["insufficient_history"], "score": 0.0}
+    reasons = [f"{p}:volatility_z={z:.2f}" for p, z in zs if z >= params.regime_z]
+    return {"triggered": bool(reasons), "reasons": reasons if reasons else ["normal"], "score": float(max(z for _, z in zs))}
+
+
+def write_regime_timeline(outputs_dir: Path, timeline: pd.DataFrame) -> Path:
+    outputs_dir.mkdir(parents=True, exist_ok=True)
+    out = outputs_dir / "regime_timeline.csv"
+    t = timeline.copy()
+    t.columns = [" ".join(str(c).split()) for c in t.columns]
+    t.to_csv(out, index=True)
+    return out
@@ -1,20 +1,28 @@
 from __future__ import annotations
 
 from pathlib import Path
+from typing import Optional
 
 import numpy as np
 import pandas as pd
 
+from .arx_state import load_arx_state, resume_arx_states, save_arx_state
+from .cache import ForecastCache, forecast_cache_key
 from .config import ForecastConfig, Z80
-from .features import detect_regime_shift, load_approval_weekly, to_weekly
-from .io import load_blended_input, write_forecast_outputs
-from .models import forecast_next, forecast_next_ssm, forecast_next_ssm_with_exog
+from .distribution import forecast_distribution, write_distribution_outputs
+from .features import load_approval_weekly
+from .io import load_weekly_input, write_forecast_outputs
+from .models import ArxRls, forecast_next, forecast_next_ssm, forecast_next_ssm_batch, forecast_next_ssm_with_exog
+from .regime import regime_at, regime_timeline, write_regime_timeline
+from .ssm_state import forecast_ssm_incremental, load_ssm_state, save_ssm_state
 def build_forecast_row(
     party: str,
     series: pd.Series,
     cfg: ForecastConfig,
     q_scale: float,
     approval_weekly: pd.Series,
+    ssm_base: Optional[tuple[float, float, float]] = None,
+    arx: Optional[ArxRls] = None,
 ) -> dict:
     if cfg.model == "legacy":
         pred, sigma = forecast_next(series, horizon_weeks=cfg.horizon_weeks, window_weeks=cfg.window_weeks)
@@ -27,10 +35,17 @@ def build_forecast_row(
                 horizon_weeks=cfg.horizon_weeks,
                 window_weeks=cfg.window_weeks,
                 q_scale=q_scale,
+                base=ssm_base,
+                engine=cfg.exog_engine,
+                forgetting=cfg.exog_forgetting,
+                arx=arx,
+                params=cfg.params,
             )
+        elif ssm_base is not None:
+            pred, pred_sd, sigma = ssm_base
         else:
             pred, pred_sd, sigma = forecast_next_ssm(
-                series, horizon_weeks=cfg.horizon_weeks, window_weeks=cfg.window_weeks, q_scale=q_scale
+                series, horizon_weeks=cfg.horizon_weeks, window_weeks=cfg.window_weeks, q_scale=q_scale, params=cfg.params
             )
         row = {"party": party, "next_week_pred": pred, "rmse": sigma, "pred_sd": pred_sd}
     if pd.notna(row["pred_sd"]):
@@ -44,25 +59,98 @@ def build_forecast_row(
     return row
 
 
+def write_distribution(outputs_dir: Path, weekly: pd.DataFrame, out: pd.DataFrame, cfg: ForecastConfig, q_scale: float) -> None:
+    if cfg.dist_draws <= 0:
+        return
+    dist, gaps = forecast_distribution(
+        weekly,
+        out,
+        window_weeks=cfg.window_weeks,
+        q_scale=q_scale,
+        draws=cfg.dist_draws,
+        seed=cfg.dist_seed,
+        params=cfg.params,
+    )
+    for p in write_distribution_outputs(outputs_dir, dist, gaps):
+        print("Wrote:", p)
+
+
 def run_forecast(cfg: ForecastConfig) -> tuple[pd.DataFrame, dict]:
     outputs_dir = Path("outputs")
-    blended = load_blended_input(outputs_dir)
-    weekly = to_weekly(blended)
-    regime = (
-        detect_regime_shift(weekly)
-        if cfg.regime_guard == "on"
-        else {"triggered": False, "reasons": ["disabled"], "score": 0.0}
-    )
-    q_scale = cfg.regime_q_scale if regime.get("triggered", False) else 1.0
+    weekly = load_weekly_input(outputs_dir)
     approval_weekly = (
         load_approval_weekly(Path(cfg.approval_weekly_csv))
         if cfg.exog_approval == "on"
         else pd.Series(dtype=float)
     )
+    timeline = regime_timeline(weekly, cfg.params) if cfg.regime_guard == "on" else None
+    if timeline is not None:
+        print("Wrote:", write_regime_timeline(outputs_dir, timeline))
+    cache = key = None
+    if cfg.cache == "on":
+        cache = ForecastCache(Path(cfg.cache_dir), int(cfg.cache_max_mb * 1024 * 1024))
+        key = forecast_cache_key(weekly, approval_weekly, cfg)
+        hit = cache.get(key)
+        print(f"Forecast cache {'hit' if hit is not None else 'miss'}: {key[:12]}")
+        if hit is not None:
+            out, regime_payload = hit
+            regime_out = write_forecast_outputs(outputs_dir, out, regime_payload)
+            write_distribution(outputs_dir, weekly, out, cfg, float(regime_payload.get("q_scale_applied", 1.0)))
+            print("Wrote:", regime_out)
+            print(out.sort_values("rmse").head(10))
+            return out, regime_payload
+
+    regime = (
+        regime_at(timeline, -1, cfg.params)
+        if timeline is not None
+        else {"triggered": False, "reasons": ["disabled"], "score": 0.0}
+    )
+    q_scale = cfg.regime_q_scale if regime.get("triggered", False) else 1.0
+    ssm_bases = [None] * len(weekly.columns)
+    if cfg.model != "legacy" and cfg.ssm_state != "off":
+        state_path = Path(cfg.ssm_state_path)
+        ssm_bases, states, modes = forecast_ssm_incremental(
+            weekly,
+            load_ssm_state(state_path, cfg.window_weeks, cfg.horizon_weeks, cfg.params),
+            window_weeks=cfg.window_weeks,
+            horizon_weeks=cfg.horizon_weeks,
+            q_scale=q_scale,
+            refit_weeks=cfg.ssm_refit_weeks,
+            drift_nats=cfg.ssm_drift_nats,
+            verify=cfg.ssm_state == "verify",
+            params=cfg.params,
+        )
+        save_ssm_state(state_path, states, cfg.window_weeks, cfg.horizon_weeks, cfg.params)
+        for party, mode in modes.items():
+            print(f"SSM {' '.join(str(party).split())}: {mode}")
+    elif cfg.model != "legacy":
+        # One batched (q, r) fit for all parties.
+        ssm_bases = forecast_next_ssm_batch(
+            [weekly[col] for col in weekly.columns],
+            horizon_weeks=cfg.horizon_weeks,
+            window_weeks=cfg.window_weeks,
+            q_scale=q_scale,
+            params=cfg.params,
+        )
+    arx_states: dict = {}
+    use_arx_state = cfg.model != "legacy" and cfg.exog_approval == "on" and cfg.exog_engine == "rls" and cfg.ssm_state != "off"
+    if use_arx_state:
+        arx_states, arx_modes = resume_arx_states(
+            weekly,
+            approval_weekly,
+            load_arx_state(Path(cfg.arx_state_path), cfg.window_weeks, cfg.exog_forgetting),
+            window_weeks=cfg.window_weeks,
+            forgetting=cfg.exog_forgetting,
+            verify=cfg.ssm_state == "verify",
+        )
+        for party, mode in arx_modes.items():
+            print(f"ARX {' '.join(str(party).split())}: {mode}")
     forecast_rows = [
-        build_forecast_row(col, weekly[col], cfg, q_scale, approval_weekly)
-        for col in weekly.columns
+        build_forecast_row(col, weekly[col], cfg, q_scale, approval_weekly, ssm_base=base, arx=arx_states.get(col))
+        for col, base in zip(weekly.columns, ssm_bases)
     ]
+    if use_arx_state:
+        save_arx_state(Path(cfg.arx_state_path), arx_states, cfg.window_weeks, cfg.exog_forgetting)
     out = pd.DataFrame(forecast_rows)
     regime_payload = {
         "triggered": bool(regime.get("triggered", False)),
@@ -73,7 +161,10 @@ def run_forecast(cfg: ForecastConfig) -> tuple[pd.DataFrame, dict]:
         "exog_approval": cfg.exog_approval,
         "approval_rows": int(len(approval_weekly)),
     }
+    if cache is not None:
+        cache.put(key, out, regime_payload)
     regime_out = write_forecast_outputs(outputs_dir, out, regime_payload)
+    write_distribution(outputs_dir, weekly, out, cfg, q_scale)
     print("Wrote:", regime_out)
     print(out.sort_values("rmse").head(10))
     return out, regime_payload
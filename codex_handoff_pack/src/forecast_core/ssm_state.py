@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .models import (
+    _fit_local_level_params_batch,
+    _local_level_filter,
+    _ssm_forecast,
+    forecast_next,
+)
+from .params import DEFAULT_PARAMS, ModelParams
+
+STATE_VERSION = 1
+MIN_SSM_OBS = 8
+
+
+@dataclass
+class PartyFilterState:
+    """
+    Local-level filter checkpoint for one party's weekly series.
+
+    `origin` is the first week of the window the parameters were fitted on;
+    (mu0, p0) is the filter's start there and (mu, p) its state after `last`.
+    `errors` keeps the most recent one-step errors (one window's worth) for
+    the reported RMSE. `prefix_sha` covers the observations from `origin`
+    through `last`, so a revised history is detected.
+    """
+
+    q: float
+    r: float
+    q_scale: float
+    origin: str
+    last: str
+    mu0: float
+    p0: float
+    mu: float
+    p: float
+    errors: List[float] = field(default_factory=list)
+    fit_nll_mean: float = 0.0
+    nll_since_fit: float = 0.0
+    steps_since_fit: int = 0
+    prefix_sha: str = ""
+
+
+def _prefix_sha(y: pd.Series) -> str:
+    h = hashlib.sha256()
+    h.update(np.asarray(y.index.asi8, dtype=np.int64).tobytes())
+    h.update(np.asarray(y.to_numpy(dtype=float)).tobytes())
+    return h.hexdigest()
+
+
+def load_ssm_state(
+    path: Path, window_weeks: int, horizon_weeks: int, params: ModelParams = DEFAULT_PARAMS
+) -> Dict[str, PartyFilterState]:
+    path = Path(path)
+    if not path.exists():
+        return {}
+    try:
+        d = json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+    if d.get("version") != STATE_VERSION or d.get("window_weeks") != window_weeks or d.get("horizon_weeks") != horizon_weeks:
+        return {}
+    # Checkpoints written before the params were recorded used the defaults.
+    if d.get("params", DEFAULT_PARAMS.to_dict()) != params.to_dict():
+        return {}
+    return {p: PartyFilterState(**v) for p, v in d.get("parties", {}).items()}
+
+
+def save_ssm_state(
+    path: Path,
+    states: Dict[str, PartyFilterState],
+    window_weeks: int,
+    horizon_weeks: int,
+    params: ModelParams = DEFAULT_PARAMS,
+) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "version": STATE_VERSION,
+        "window_weeks": window_weeks,
+        "horizon_weeks": horizon_weeks,
+        "params": params.to_dict(),
+        "parties": {p: asdict(s) for p, s in states.items()},
+    }
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(payload, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    tmp.replace(path)
+
+
+def _refit_reason(
+    st: Optional[PartyFilterState],
+    s: pd.Series,
+    q_scale: float,
+    refit_weeks: int,
+) -> Optional[str]:
+    """Why this party needs a full refit, or None when its checkpoint can be advanced."""
+    if st is None:
+        return "no_checkpoint"
+    if float(st.q_scale) != float(q_scale):
+        return "q_scale_changed"
+    origin, last = pd.Timestamp(st.origin), pd.Timestamp(st.last)
+    if last not in s.index or origin not in s.index:
+        return "window_missing"
+    if _prefix_sha(s[origin:last]) != st.prefix_sha:
+        return "history_revised"
+    if st.steps_since_fit + int((s.index > last).sum()) > refit_weeks:
+        return "scheduled"
+    return None
+
+
+def _refit(
+    s: pd.Series,
+    q: float,
+    r: float,
+    q_scale: float,
+    window_weeks: int,
+    horizon_weeks: int,
+    params: ModelParams = DEFAULT_PARAMS,
+) -> Tuple[tuple, PartyFilterState]:
+    # Same arithmetic as forecast_next_ssm on the trailing window.
+    w = s.iloc[-window_weeks:] if len(s) > window_weeks else s
+    y = w.to_numpy(dtype=float)
+    q = max(q * float(q_scale), 1e-9)
+    mu0, p0 = float(y[0]), max(float(np.var(y)), 1.0)
+    mu, p, errors, nll = _local_level_filter(y[1:], mu0, p0, q, r)
+    result = _ssm_forecast(mu, p, q, r, y[-1], horizon_weeks, errors, params.recency_shrink)
+    st = PartyFilterState(
+        q=q,
+        r=r,
+        q_scale=float(q_scale),
+        origin=str(w.index[0].date()),
+        last=str(w.index[-1].date()),
+        mu0=mu0,
+        p0=p0,
+        mu=float(mu),
+        p=float(p),
+        errors=[float(e) for e in errors][-(window_weeks - 1):],
+        fit_nll_mean=nll / max(len(errors), 1),
+        prefix_sha=_prefix_sha(w),
+    )
+    return result, st
+
+
+def forecast_ssm_incremental(
+    weekly: pd.DataFrame,
+    states: Dict[str, PartyFilterState],
+    window_weeks: int = 24,
+    horizon_weeks: int = 1,
+    q_scale: float = 1.0,
+    refit_weeks: int = 4,
+    drift_nats: float = 0.5,
+    verify: bool = False,
+    params: ModelParams = DEFAULT_PARAMS,
+) -> Tuple[List[tuple], Dict[str, PartyFilterState], Dict[str, str]]:
+    """
+    `forecast_next_ssm` for every column of `weekly`, resumed from `states`.
+
+    A party whose checkpoint is current advances its filter over the weeks
+    after `last` with the stored (q, r). It is refitted on the trailing
+    window, exactly as `forecast_next_ssm` does, when there is no
+    checkpoint, `q_scale` or the filtered history changed, `refit_weeks`
+    weeks passed since the fit, or the mean one-step NLL since the fit
+    exceeds the fit's own by more than `drift_nats`.
+
+    With `verify=True`, each advanced state is re-filtered from its origin
+    and must match; the gap to a full refit is reported in the modes.
+    Returns (results per column, new states, mode per party).
+    """
+    results: List[Optional[tuple]] = [None] * len(weekly.columns)
+    new_states: Dict[str, PartyFilterState] = {}
+    modes: Dict[str, str] = {}
+    refit: List[Tuple[int, str, pd.Series]] = []
+
+    for i, party in enumerate(weekly.columns):
+        s = weekly[party].dropna()
+        if len(s) < MIN_SSM_OBS:
+            pred, rmse = forecast_next(s, horizon_weeks=horizon_weeks, window_weeks=window_weeks)
+            results[i] = (pred, float("nan"), rmse)
+            modes[party] = "short_series"
+            continue
+        st = states.get(party)
+        reason = _refit_reason(st, s, q_scale, refit_weeks)
+        if reason is None:
+            new = s[s.index > pd.Timestamp(st.last)]
+            mu, p, errors, nll = _local_level_filter(new.to_numpy(dtype=float), st.mu, st.p, st.q, st.r)
+            steps = st.steps_since_fit + len(new)
+            nll_since = st.nll_since_fit + nll
+            if steps and nll_since / steps > st.fit_nll_mean + drift_nats:
+                reason = "likelihood_drift"
+            else:
+                st = PartyFilterState(
+                    **{
+                        **asdict(st),
+                        "last": str(s.index[-1].date()),
+                        "mu": float(mu),
+                        "p": float(p),
+                        "errors": (st.errors + [float(e) for e in errors])[-(window_weeks - 1):],
+                        "nll_since_fit": nll_since,
+                        "steps_since_fit": steps,
+                        "prefix_sha": _prefix_sha(s[pd.Timestamp(st.origin):]),
+                    }
+                )
+                results[i] = _ssm_forecast(st.mu, st.p, st.q, st.r, s.iloc[-1], horizon_weeks, st.errors, params.recency_shrink)
+                new_states[party] = st
+                modes[party] = f"warm:+{len(new)}"
+                continue
+        refit.append((i, reason, s))
+
+    fitted = _fit_local_level_params_batch(
+        [(s.iloc[-window_weeks:] if len(s) > window_weeks else s).to_numpy(dtype=float) for _, _, s in refit], params
+    )
+    for (i, reason, s), (q, r) in zip(refit, fitted):
+        party = weekly.columns[i]
+        results[i], new_states[party] = _refit(s, q, r, q_scale, window_weeks, horizon_weeks, params)
+        modes[party] = f"refit:{reason}"
+
+    if verify:
+        _verify(weekly, new_states, modes, results, window_weeks, horizon_weeks, q_scale, params)
+    return results, new_states, modes
+
+
+def _verify(
+    weekly: pd.DataFrame,
+    states: Dict[str, PartyFilterState],
+    modes: Dict[str, str],
+    results: List[Optional[tuple]],
+    window_weeks: int,
+    horizon_weeks: int,
+    q_scale: float,
+    params: ModelParams = DEFAULT_PARAMS,
+) -> None:
+    warm = [(i, p) for i, p in enumerate(weekly.columns) if modes.get(p, "").startswith("warm")]
+    if not warm:
+        return
+    series = {p: weekly[p].dropna() for _, p in warm}
+    windows = [(series[p].iloc[-window_weeks:] if len(series[p]) > window_weeks else series[p]).to_numpy(dtype=float) for _, p in warm]
+    fresh = _fit_local_level_params_batch(windows, params)
+    for (i, p), (q, r) in zip(warm, fresh):
+        st, s = states[p], series[p]
+        y = s[pd.Timestamp(st.origin):].to_numpy(dtype=float)
+        mu, var, _, _ = _local_level_filter(y[1:], st.mu0, st.p0, st.q, st.r)
+        if not (np.isclose(mu, st.mu, rtol=1e-9, atol=1e-9) and np.isclose(var, st.p, rtol=1e-9, atol=1e-9)):
+            raise AssertionError(
+                f"SSM checkpoint for {p} disagrees with a re-filter from {st.origin}: "
+                f"mu {st.mu} vs {mu}, p {st.p} vs {var}"
+            )
+        full, _ = _refit(s, q, r, q_scale, window_weeks, horizon_weeks, params)
+        modes[p] += f" (verified; full-refit pred diff {results[i][0] - full[0]:+.4f})"
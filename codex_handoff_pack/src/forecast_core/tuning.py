@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .backtest_engine import run_backtest_walk
+from .cache import _frame_digest
+from .config import TUNED_CONFIG_VERSION, TUNED_FIELDS
+from .params import DEFAULT_PARAMS, ModelParams
+
+TUNE_VERSION = 1
+# Candidate values per knob; each axis includes the current default.
+SEARCH_SPACE: Dict[str, tuple] = {
+    "window_weeks": (12, 16, 24, 36),
+    "regime_q_scale": (1.0, 1.5, 2.0, 3.0),
+    "recency_shrink": (0.2, 0.35, 0.5),
+    "exog_weight": (0.2, 0.35, 0.5),
+    "q_grid_scale": (0.5, 1.0, 2.0),
+    "r_grid_scale": (0.5, 1.0, 2.0),
+    "regime_recent_w": (3, 4, 6),
+    "regime_base_w": (8, 12, 16),
+    "regime_z": (1.5, 2.0, 2.5),
+}
+# `forecast.py` / `backtest_report.py` defaults of the tuned ForecastConfig fields.
+DEFAULT_FIELDS = {"window_weeks": 24, "regime_q_scale": 2.0}
+REGIME_KNOBS = ("regime_q_scale", "regime_recent_w", "regime_base_w", "regime_z")
+LEADERBOARD_COLUMNS = ["rung", "origins", "rank", "candidate_id", "mae", "rmse", "n", "cached", "seconds"] + list(SEARCH_SPACE)
+
+
+@dataclass(frozen=True)
+class TuneSetup:
+    """Backtest options shared by every candidate; part of each evaluation's cache key."""
+
+    min_train_weeks: int = 20
+    horizon_weeks: int = 1
+    regime_guard: bool = True
+    exog_approval: bool = False
+    exog_engine: str = "closed"
+    exog_forgetting: float = 1.0
+    model: str = "ssm"
+
+
+def default_candidate() -> dict:
+    """The untuned settings: `forecast.py` defaults for `TUNED_FIELDS` and `DEFAULT_PARAMS`."""
+    return {**DEFAULT_FIELDS, **DEFAULT_PARAMS.to_dict()}
+
+
+def search_space(setup: TuneSetup) -> Dict[str, tuple]:
+    """`SEARCH_SPACE` with the knobs this setup never uses pinned to their defaults."""
+    base = default_candidate()
+    space = dict(SEARCH_SPACE)
+    if not setup.exog_approval:
+        space["exog_weight"] = (base["exog_weight"],)
+    if not setup.regime_guard:
+        space.update({k: (base[k],) for k in REGIME_KNOBS})
+    return space
+
+
+def candidate_id(cand: dict) -> str:
+    return hashlib.sha256(json.dumps(cand, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+def sample_candidates(space: Dict[str, tuple], n: int, seed: int = 0) -> List[dict]:
+    """The default candidate, then up to `n - 1` distinct random draws from `space`."""
+    out = [default_candidate()]
+    seen = {candidate_id(out[0])}
+    total = math.prod(len(v) for v in space.values())
+    rng = np.random.default_rng(seed)
+    while len(out) < min(n, total):
+        cand = {k: v[int(rng.integers(len(v)))] for k, v in space.items()}
+        cand = {k: (int(x) if isinstance(x, (int, np.integer)) else float(x)) for k, x in cand.items()}
+        cid = candidate_id(cand)
+        if cid not in seen:
+            seen.add(cid)
+            out.append(cand)
+    return out
+
+
+def rung_budgets(n_origins: int, min_origins: int = 8, eta: int = 3) -> List[int]:
+    """Origins per rung, growing by `eta` up to the full backtest: e.g. 37 -> [12, 37]."""
+    budgets = [n_origins]
+    while budgets[0] // eta >= min_origins:
+        budgets.insert(0, budgets[0] // eta)
+    return budgets
+
+
+def split_candidate(cand: dict) -> tuple[dict, ModelParams]:
+    return {k: cand[k] for k in TUNED_FIELDS}, ModelParams.from_dict({k: v for k, v in cand.items() if k not in TUNED_FIELDS})
+
+
+class TuneCache:
+    """One JSON file per evaluated (data, setup, candidate, origins) under `cache_dir`; re-runs resume from it."""
+
+    def __init__(self, cache_dir: Path):
+        self.dir = Path(cache_dir)
+
+    def key(self, data_digest: str, setup: TuneSetup, cand: dict, origins: int) -> str:
+        payload = {"version": TUNE_VERSION, "data": data_digest, "setup": asdict(setup), "candidate": cand, "origins": origins}
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        p = self.dir / f"{key}.json"
+        if not p.exists():
+            return None
+        try:
+            return json.loads(p.read_text(encoding="utf-8"))
+        except Exception:
+            return None
+
+    def put(self, key: str, result: dict) -> None:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.dir / f"{key}.json.tmp"
+        tmp.write_text(json.dumps(result) + "\n", encoding="utf-8")
+        tmp.replace(self.dir / f"{key}.json")
+
+
+def data_digest(weekly: pd.DataFrame, approval_weekly: pd.Series) -> str:
+    h = hashlib.sha256()
+    _frame_digest(h, weekly)
+    _frame_digest(h, approval_weekly)
+    return h.hexdigest()
+
+
+def n_origins(weekly: pd.DataFrame, setup: TuneSetup) -> int:
+    return max(len(weekly) - setup.horizon_weeks + 1 - setup.min_train_weeks, 0)
+
+
+def evaluate(
+    weekly: pd.DataFrame,
+    approval_weekly: pd.Series,
+    cand: dict,
+    origins: int,
+    setup: TuneSetup,
+    jobs: Optional[int] = 1,
+) -> dict:
+    """Backtest `cand` on the last `origins` forecast origins; error metrics of `setup.model`."""
+    fields, params = split_candidate(cand)
+    t0 = time.perf_counter()
+    preds = run_backtest_walk(
+        weekly=weekly,
+        approval_weekly=approval_weekly,
+        min_train_weeks=len(weekly) - setup.horizon_weeks + 1 - origins,
+        window_weeks=int(fields["window_weeks"]),
+        horizon_weeks=setup.horizon_weeks,
+        regime_guard=setup.regime_guard,
+        regime_q_scale=float(fields["regime_q_scale"]),
+        exog_approval=setup.exog_approval,
+        exog_engine=setup.exog_engine,
+        exog_forgetting=setup.exog_forgetting,
+        jobs=jobs,
+        params=params,
+    )
+    err = preds.loc[preds["model"] == setup.model, "error"].to_numpy(dtype=float) if len(preds) else np.empty(0)
+    return {
+        "candidate_id": candidate_id(cand),
+        "origins": int(origins),
+        "n": int(len(err)),
+        "mae": float(np.mean(np.abs(err))) if len(err) else float("inf"),
+        "rmse": float(np.sqrt(np.mean(err * err))) if len(err) else float("inf"),
+        "seconds": time.perf_counter() - t0,
+    }
+
+
+def evaluate_cached(
+    weekly: pd.DataFrame,
+    approval_weekly: pd.Series,
+    cand: dict,
+    origins: int,
+    setup: TuneSetup,
+    cache: TuneCache,
+    digest: str,
+    jobs: Optional[int] = 1,
+) -> dict:
+    """`evaluate`, read from / stored to `cache`; the result's `cached` says which."""
+    key = cache.key(digest, setup, cand, origins)
+    res = cache.get(key)
+    if res is not None:
+        return {**res, "cached": True}
+    res = evaluate(weekly, approval_weekly, cand, origins, setup, jobs=jobs)
+    cache.put(key, res)
+    return {**res, "cached": False}
+
+
+def successive_halving(
+    weekly: pd.DataFrame,
+    approval_weekly: pd.Series,
+    candidates: List[dict],
+    setup: TuneSetup,
+    cache: TuneCache,
+    eta: int = 3,
+    min_origins: int = 8,
+    jobs: Optional[int] = 1,
+    log: Callable[[str], None] = print,
+) -> pd.DataFrame:
+    """
+    Evaluate every candidate on the most recent origins, keep the best 1/eta
+    by MAE, and re-evaluate the survivors on `eta` times as many origins,
+    until the last rung covers the full backtest. Ties keep the earlier
+    candidate (the default comes first). Returns one leaderboard row per
+    (rung, candidate).
+    """
+    digest = data_digest(weekly, approval_weekly)
+    budgets = rung_budgets(n_origins(weekly, setup), min_origins, eta)
+    survivors = list(candidates)
+    rows: List[dict] = []
+    for rung, origins in enumerate(budgets):
+        results = [
+            evaluate_cached(weekly, approval_weekly, cand, origins, setup, cache, digest, jobs=jobs) for cand in survivors
+        ]
+        hits = sum(r["cached"] for r in results)
+        order = sorted(range(len(survivors)), key=lambda i: results[i]["mae"])
+        for rank, i in enumerate(order, start=1):
+            rows.append({**results[i], "rung": rung, "rank": rank, **survivors[i]})
+        log(f"Rung {rung}: {len(survivors)} candidates x {origins} origins ({hits} cached), best MAE {results[order[0]]['mae']:.4f}")
+        survivors = [survivors[i] for i in order[: max(1, math.ceil(len(survivors) / eta))]]
+    board = pd.DataFrame(rows)
+    return board.sort_values(["rung", "rank"], ascending=[False, True], kind="mergesort")[LEADERBOARD_COLUMNS].reset_index(drop=True)
+
+
+def write_tuned_config(
+    path: Path,
+    cand: dict,
+    best: dict,
+    baseline: dict,
+    setup: TuneSetup,
+    digest: str,
+    holdout: dict,
+    holdout_baseline: dict,
+) -> Path:
+    """
+    Recommended config in the format `forecast_core.config.load_tuned_config` reads.
+    `best`/`baseline` are the candidate and the default on the search origins,
+    `holdout`/`holdout_baseline` the same on the held-out most recent origins.
+    """
+    fields, params = split_candidate(cand)
+    payload = {
+        "version": TUNED_CONFIG_VERSION,
+        **fields,
+        "params": params.to_dict(),
+        "tuning": {
+            "candidate_id": candidate_id(cand),
+            "setup": asdict(setup),
+            "data_digest": digest,
+            "origins": int(best["origins"]),
+            "n": int(best["n"]),
+            "mae": float(best["mae"]),
+            "rmse": float(best["rmse"]),
+            "default_mae": float(baseline["mae"]),
+            "default_rmse": float(baseline["rmse"]),
+            "holdout_origins": int(holdout["origins"]),
+            "holdout_n": int(holdout["n"]),
+            "holdout_mae": float(holdout["mae"]),
+            "holdout_rmse": float(holdout["rmse"]),
+            "holdout_default_mae": float(holdout_baseline["mae"]),
+            "holdout_default_rmse": float(holdout_baseline["rmse"]),
+        },
+    }
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    return path
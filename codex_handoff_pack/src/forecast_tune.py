@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from forecast import load_approval_weekly, load_weekly_series
+from forecast_core.tuning import (
+    LEADERBOARD_COLUMNS,
+    TuneCache,
+    TuneSetup,
+    candidate_id,
+    data_digest,
+    default_candidate,
+    evaluate_cached,
+    n_origins,
+    sample_candidates,
+    search_space,
+    successive_halving,
+    write_tuned_config,
+)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Tune forecast knobs on the rolling backtest with successive halving.")
+    ap.add_argument("--blended-xlsx", default="outputs/weighted_time_series.xlsx")
+    ap.add_argument("--min-train-weeks", type=int, default=20)
+    ap.add_argument("--horizon-weeks", type=int, default=1)
+    ap.add_argument("--regime-guard", choices=["on", "off"], default="on")
+    ap.add_argument("--exog-approval", choices=["off", "on"], default="off")
+    ap.add_argument("--approval-weekly-csv", default="outputs/president_approval_weekly.csv")
+    ap.add_argument("--exog-engine", choices=["closed", "rls"], default="closed")
+    ap.add_argument("--exog-forgetting", type=float, default=1.0)
+    ap.add_argument(
+        "--objective-model",
+        choices=["ssm", "ssm_exog"],
+        default=None,
+        help="Model whose MAE is minimized (default: ssm_exog with --exog-approval on, else ssm)",
+    )
+    ap.add_argument("--candidates", type=int, default=27, help="Configurations in the first rung, the defaults included")
+    ap.add_argument("--seed", type=int, default=0, help="Seed for sampling candidates")
+    ap.add_argument("--eta", type=int, default=3, help="Keep 1/eta per rung; each rung has eta times the origins")
+    ap.add_argument("--min-origins", type=int, default=8, help="Fewest backtest origins in the first rung")
+    ap.add_argument(
+        "--holdout-origins",
+        type=int,
+        default=12,
+        help="Most recent origins kept out of the search; the winner must beat the default on them to be recommended",
+    )
+    ap.add_argument("--jobs", type=int, default=1, help="Worker processes per backtest (0 = CPU count)")
+    ap.add_argument("--cache-dir", default="outputs/.tune_cache", help="Evaluated configurations, one JSON per hash")
+    ap.add_argument("--out-leaderboard", default="outputs/tuning_leaderboard.csv")
+    ap.add_argument("--out-config", default="outputs/forecast_tuned_config.json")
+    args = ap.parse_args()
+
+    blended_path = Path(args.blended_xlsx)
+    if not blended_path.exists():
+        raise FileNotFoundError(f"Blended file not found: {blended_path}")
+    weekly = load_weekly_series(blended_path)
+    approval_weekly = (
+        load_approval_weekly(Path(args.approval_weekly_csv))
+        if args.exog_approval == "on"
+        else pd.Series(dtype=float)
+    )
+    exog = args.exog_approval == "on" and not approval_weekly.empty
+    setup = TuneSetup(
+        min_train_weeks=args.min_train_weeks,
+        horizon_weeks=args.horizon_weeks,
+        regime_guard=args.regime_guard == "on",
+        exog_approval=exog,
+        exog_engine=args.exog_engine,
+        exog_forgetting=args.exog_forgetting,
+        model=args.objective_model or ("ssm_exog" if exog else "ssm"),
+    )
+    if setup.model == "ssm_exog" and not exog:
+        raise SystemExit("--objective-model ssm_exog needs --exog-approval on and approval data")
+    # Search on the earlier origins only: the holdout targets never enter selection.
+    holdout = args.holdout_origins
+    search_weekly = weekly.iloc[: len(weekly) - holdout]
+    if holdout < 1 or n_origins(search_weekly, setup) < 1:
+        raise SystemExit(
+            f"Not enough weeks to tune with {holdout} holdout origins: {len(weekly)} "
+            f"(min train {setup.min_train_weeks}, {n_origins(weekly, setup)} origins in all)"
+        )
+
+    cache = TuneCache(Path(args.cache_dir))
+    candidates = sample_candidates(search_space(setup), args.candidates, seed=args.seed)
+    t0 = time.perf_counter()
+    board = successive_halving(
+        search_weekly, approval_weekly, candidates, setup, cache, eta=args.eta, min_origins=args.min_origins, jobs=args.jobs
+    )
+    print(f"Tuned {len(candidates)} candidates in {time.perf_counter() - t0:.2f}s")
+
+    out_board = Path(args.out_leaderboard)
+    out_board.parent.mkdir(parents=True, exist_ok=True)
+    board.to_csv(out_board, index=False)
+    print("Wrote:", out_board)
+
+    best_row = board.iloc[0]
+    best = next(c for c in candidates if candidate_id(c) == best_row["candidate_id"])
+    search_digest = data_digest(search_weekly, approval_weekly)
+    baseline = evaluate_cached(
+        search_weekly, approval_weekly, default_candidate(), int(best_row["origins"]), setup, cache, search_digest, jobs=args.jobs
+    )
+    print(f"{setup.model} MAE default {baseline['mae']:.4f} -> tuned {best_row['mae']:.4f} over {int(best_row['n'])} rows (search)")
+
+    digest = data_digest(weekly, approval_weekly)
+    held = evaluate_cached(weekly, approval_weekly, best, holdout, setup, cache, digest, jobs=args.jobs)
+    held_default = evaluate_cached(weekly, approval_weekly, default_candidate(), holdout, setup, cache, digest, jobs=args.jobs)
+    print(f"{setup.model} MAE default {held_default['mae']:.4f} -> tuned {held['mae']:.4f} over {held['n']} rows (holdout, last {holdout} origins)")
+
+    out_config = Path(args.out_config)
+    if candidate_id(best) != candidate_id(default_candidate()) and held["mae"] < held_default["mae"]:
+        write_tuned_config(out_config, best, best_row.to_dict(), baseline, setup, digest, held, held_default)
+        print("Wrote:", out_config)
+    else:
+        # A stale recommendation from an earlier run would still be picked up by --tuned-config.
+        out_config.unlink(missing_ok=True)
+        print(f"No candidate beat the default on the holdout; no config recommended ({out_config} not written).")
+    print(board[board["rung"] == board["rung"].max()][LEADERBOARD_COLUMNS].head(5).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,427 @@
+"""
+Micro-benchmarks for hot paths in the pipeline.
+
+Each subcommand times the reference implementation against the optimized one
+on synthetic data, checks that both produce the same output, and prints the speedup.
+
+  python src/perf_bench.py parse-range --rows 100000
+  python src/perf_bench.py blend --years 3 --parties 32
+  python src/perf_bench.py house-effect --years 3 --parties 12
+  python src/perf_bench.py load --data-dir data
+  python src/perf_bench.py kalman-fit --series 600
+  python src/perf_bench.py arx --weeks 520
+  python src/perf_bench.py weekly --years 10 --parties 12
+  python src/perf_bench.py regime --weeks 520
+  python src/perf_bench.py backtest --years 10 --parties 8 --jobs 8
+  python src/perf_bench.py summary --rows 3000000
+"""
+from __future__ import annotations
+
+import argparse
+import multiprocessing as mp
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from backtest_report import _build_summary_reference, _run_backtest_reference, build_summary, run_backtest
+from forecast_core.features import _detect_regime_shift_reference, _to_weekly_reference, to_weekly
+from forecast_core.models import (
+    ArxRls,
+    _arx_closed_form,
+    _fit_local_level_params_batch,
+    _fit_local_level_params_reference,
+)
+from forecast_core.regime import FOCUS_PARTIES, regime_at, regime_timeline
+from pipeline_core.blending import (
+    _apply_time_varying_house_effect_reference,
+    _blend_time_series_reference,
+    apply_time_varying_house_effect,
+    blend_time_series,
+    house_effect_recursion,
+    prepare_house_effect,
+)
+from pipeline_core.constants import POLLSTERS, SHEETS
+from pipeline_core.input_resolution import find_raw_poll_xlsx
+from pipeline_core.resources import current_rss_mb, peak_rss_mb
+from pipeline_core.sheet_loading import (
+    PIPELINE_BASE_COLS,
+    get_party_cols,
+    load_sheet,
+    normalize_poll_frame,
+    parse_range,
+    parse_range_series,
+    stream_sheet,
+)
+
+
+def _timeit(fn: Callable[[], object], repeat: int) -> tuple[float, object]:
+    best = float("inf")
+    out = None
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def _report(name: str, t_ref: float, t_new: float, same: bool) -> None:
+    speedup = t_ref / t_new if t_new > 0 else float("inf")
+    print(f"{name}: reference {t_ref * 1000:.1f} ms, optimized {t_new * 1000:.1f} ms, speedup x{speedup:.1f}, match={same}")
+    if not same:
+        raise SystemExit(f"{name}: optimized output differs from reference")
+
+
+def synthetic_survey_dates(rows: int, seed: int = 0) -> pd.Series:
+    """조사일자 strings covering every format parse_range accepts, plus blanks and junk."""
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2023-10-30") + pd.to_timedelta(rng.integers(0, 900, rows), unit="D")
+    end = start + pd.to_timedelta(rng.integers(0, 4, rows), unit="D")
+    kind = rng.integers(0, 6, rows)
+    out = []
+    for s, e, k in zip(start, end, kind):
+        a = f"{s.year % 100:02d}.{s.month:02d}.{s.day:02d}."
+        if k == 0:
+            out.append(f"{a}~{e.day:02d}.")
+        elif k == 1:
+            out.append(f"{a[:-1]}~{e.day:02d}.")
+        elif k == 2:
+            out.append(f"{a}~{e.year % 100:02d}.{e.month:02d}.{e.day:02d}.")
+        elif k == 3:
+            out.append(f"{a}/{e.year % 100:02d}.{e.month:02d}.{e.day:02d}.")
+        elif k == 4:
+            out.append(f"{a}~{e.month:02d}.{e.day:02d}.")
+        else:
+            out.append(None if s.day % 2 else "")
+    return pd.Series(out, dtype=object, name="조사일자")
+
+
+def synthetic_poll_frame(years: int, parties: int, polls_per_day: float = 1.5, seed: int = 0) -> pd.DataFrame:
+    """Raw-poll rows shaped like load_poll_sheets output, with gaps, junk cells and off-list pollsters."""
+    rng = np.random.default_rng(seed)
+    days = pd.date_range("2020-01-01", periods=365 * years, freq="D")
+    n = int(len(days) * polls_per_day)
+    pollsters = np.array(POLLSTERS + ["기타리서치"])
+    df = pd.DataFrame(
+        {
+            "등록번호": np.arange(n, dtype=float),
+            "조사기관": rng.choice(pollsters, n),
+            "표본수(명)": rng.choice([500.0, 1000.0, 1002.0, 1500.0, np.nan], n),
+            "date_end": rng.choice(days, n),
+        }
+    )
+    level = rng.dirichlet(np.ones(parties), n) * 100.0
+    for j in range(parties):
+        col = np.round(level[:, j], 1).astype(object)
+        col[rng.random(n) < 0.15] = np.nan
+        col[rng.random(n) < 0.01] = "-"
+        df[f"party_{j:02d}"] = col
+    df.loc[rng.random(n) < 0.01, "date_end"] = pd.NaT
+    return df
+
+
+def _frames_match(a: pd.DataFrame, b: pd.DataFrame, rtol: float = 1e-12) -> bool:
+    if list(a.columns) != list(b.columns) or len(a) != len(b):
+        return False
+    a = a.reset_index(drop=True)
+    b = b.reset_index(drop=True)
+    for c in a.columns:
+        x, y = a[c].to_numpy(), b[c].to_numpy()
+        if np.issubdtype(x.dtype, np.number) and np.issubdtype(y.dtype, np.number):
+            if not np.allclose(x.astype(float), y.astype(float), rtol=rtol, atol=0.0, equal_nan=True):
+                return False
+        elif not a[c].equals(b[c]):
+            return False
+    return True
+
+
+def bench_blend(args: argparse.Namespace) -> None:
+    df = synthetic_poll_frame(args.years, args.parties, seed=args.seed)
+    weights = {p: 1.0 / (i + 1) for i, p in enumerate(POLLSTERS)}
+    for sample_w in (False, True):
+        t_ref, ref = _timeit(
+            lambda: _blend_time_series_reference(df, weights, sample_size_weight=sample_w), args.repeat
+        )
+        t_new, new = _timeit(lambda: blend_time_series(df, weights, sample_size_weight=sample_w), args.repeat)
+        _report(
+            f"blend years={args.years} parties={args.parties} rows={len(df)} sample_w={sample_w}",
+            t_ref,
+            t_new,
+            _frames_match(ref, new),
+        )
+
+
+def bench_house_effect(args: argparse.Namespace) -> None:
+    df = synthetic_poll_frame(args.years, args.parties, seed=args.seed)
+    weights = {p: 1.0 / (i + 1) for i, p in enumerate(POLLSTERS)}
+    kw = dict(ewma_lambda=0.8, bias_clip=6.0, min_obs=3, sample_size_weight=True)
+    t_ref, ref = _timeit(lambda: _apply_time_varying_house_effect_reference(df, weights, **kw), args.repeat)
+    t_new, new = _timeit(lambda: apply_time_varying_house_effect(df, weights, **kw), args.repeat)
+    same = ref[0].equals(new[0]) and ref[1].equals(new[1])
+    _report(f"house-effect years={args.years} parties={args.parties} rows={len(df)}", t_ref, t_new, same)
+
+    # Tuning sweep: baseline prepared once, whole grid in one recursion pass.
+    inputs = prepare_house_effect(df, weights, sample_size_weight=True)
+    lam, clip, mobs = (a.ravel() for a in np.meshgrid([0.5, 0.6, 0.7, 0.8, 0.9], [2.0, 4.0, 6.0, 8.0], [0, 1, 3, 5], indexing="ij"))
+    segs = (inputs.raw, inputs.base, inputs.seg_starts, inputs.seg_lens)
+
+    def one_by_one() -> list:
+        return [house_effect_recursion(*segs, a, b, c)[0] for a, b, c in zip(lam, clip, mobs)]
+
+    t_ref, ref_adj = _timeit(one_by_one, args.repeat)
+    t_new, grid = _timeit(lambda: house_effect_recursion(*segs, lam, clip, mobs), args.repeat)
+    same = all(np.array_equal(a, b, equal_nan=True) for a, b in zip(ref_adj, grid[0]))
+    _report(f"house-effect grid={len(lam)} (per-config vs batched)", t_ref, t_new, same)
+
+
+def bench_kalman_fit(args: argparse.Namespace) -> None:
+    # Random-walk-plus-noise windows of mixed length, like per-party backtest training windows.
+    rng = np.random.default_rng(args.seed)
+    ys = []
+    for _ in range(args.series):
+        n = int(rng.integers(8, args.window + 1))
+        level = 30.0 + np.cumsum(rng.normal(0.0, rng.uniform(0.05, 1.0), n))
+        ys.append(level + rng.normal(0.0, rng.uniform(0.1, 2.0), n))
+    t_ref, ref = _timeit(lambda: [_fit_local_level_params_reference(y) for y in ys], args.repeat)
+    t_new, new = _timeit(lambda: _fit_local_level_params_batch(ys), args.repeat)
+    _report(f"kalman-fit series={args.series} grid=42 (per-point loop vs batched)", t_ref, t_new, ref == new)
+
+
+def bench_arx(args: argparse.Namespace) -> None:
+    # One party's weekly series and approval, forecast at every origin as in the backtest.
+    rng = np.random.default_rng(args.seed)
+    idx = pd.date_range("2015-01-05", periods=args.weeks, freq="W-MON")
+    x = 45.0 + np.cumsum(rng.normal(0.0, 0.8, args.weeks))
+    y = 30.0 + 0.2 * (x - 45.0) + np.cumsum(rng.normal(0.0, 0.5, args.weeks)) + rng.normal(0.0, 1.0, args.weeks)
+    frame = pd.DataFrame({"y": y, "x": x}, index=idx)
+    origins = range(12, args.weeks + 1)
+
+    def closed() -> np.ndarray:
+        return np.array([_arx_closed_form(frame.iloc[:t], args.window, args.forgetting) for t in origins])
+
+    def rls() -> np.ndarray:
+        st, out = ArxRls(args.window, args.forgetting), []
+        for t in origins:
+            st.advance(frame, until=idx[t - 1])
+            out.append(st.predict())
+        return np.array(out)
+
+    t_ref, ref = _timeit(closed, args.repeat)
+    t_new, new = _timeit(rls, args.repeat)
+    # RLS tracks the ridge solve up to rounding (resynced every `window` pushes), not bit for bit.
+    ok = ~np.isnan(ref.astype(float))
+    diff = float(np.abs(ref[ok].astype(float) - new[ok].astype(float)).max()) if ok.any() else 0.0
+    same = bool(np.array_equal(np.isnan(new.astype(float)), ~ok)) and diff <= 1e-8
+    _report(f"arx weeks={args.weeks} forgetting={args.forgetting} (ridge solve per origin vs RLS, max diff {diff:.1e})", t_ref, t_new, same)
+
+
+def bench_weekly(args: argparse.Namespace) -> None:
+    # Blended-like daily series: irregular poll dates, parties entering late.
+    rng = np.random.default_rng(args.seed)
+    days = args.years * 365
+    dates = pd.Timestamp("2015-01-01") + pd.to_timedelta(np.sort(rng.choice(days, days // 2, replace=False)), unit="D")
+    blended = pd.DataFrame({"date_end": dates, "n_polls": 1})
+    for j in range(args.parties):
+        v = 20.0 + np.cumsum(rng.normal(0.0, 0.3, len(dates)))
+        v[: int(rng.integers(0, len(dates) // 3))] = np.nan
+        blended[f"party_{j}"] = v
+    t_ref, ref = _timeit(lambda: _to_weekly_reference(blended), args.repeat)
+    t_new, new = _timeit(lambda: to_weekly(blended), args.repeat)
+    _report(f"weekly years={args.years} parties={args.parties} (daily grid vs Monday grid)", t_ref, t_new, ref.equals(new))
+
+
+def bench_regime(args: argparse.Namespace) -> None:
+    # Regime check at every expanding backtest origin.
+    rng = np.random.default_rng(args.seed)
+    weekly = pd.DataFrame(
+        30.0 + np.cumsum(rng.normal(0.0, 0.8, (args.weeks, len(FOCUS_PARTIES))), axis=0),
+        index=pd.date_range("2015-01-05", periods=args.weeks, freq="W-MON"),
+        columns=FOCUS_PARTIES,
+    )
+    t_ref, ref = _timeit(lambda: [_detect_regime_shift_reference(weekly.iloc[:t]) for t in range(1, args.weeks + 1)], args.repeat)
+
+    def timeline() -> list:
+        tl = regime_timeline(weekly)
+        return [regime_at(tl, t - 1) for t in range(1, args.weeks + 1)]
+
+    t_new, new = _timeit(timeline, args.repeat)
+    _report(f"regime weeks={args.weeks} (per-prefix recompute vs one rolling pass)", t_ref, t_new, ref == new)
+
+
+def bench_backtest(args: argparse.Namespace) -> None:
+    # Weekly party series (focus parties first) and approval over `years` years.
+    rng = np.random.default_rng(args.seed)
+    weeks = args.years * 52
+    idx = pd.date_range("2015-01-05", periods=weeks, freq="W-MON", name="week_monday")
+    approval = pd.Series(45.0 + np.cumsum(rng.normal(0.0, 0.8, weeks)), index=idx, name="approve")
+    cols = (FOCUS_PARTIES + [f"party_{j}" for j in range(args.parties)])[: args.parties]
+    weekly = pd.DataFrame(
+        {c: 20.0 + np.cumsum(rng.normal(0.0, rng.uniform(0.2, 1.0), weeks)) + rng.normal(0.0, 0.5, weeks) for c in cols},
+        index=idx,
+    )
+    kw = dict(exog_approval=True, window_weeks=args.window)
+    # The original loop solves the ARX closed form; compare against the same engine.
+    t_ref, ref = _timeit(lambda: _run_backtest_reference(weekly, approval, **kw), args.repeat)
+    t_new, new = _timeit(lambda: run_backtest(weekly, approval, jobs=args.jobs, exog_engine="closed", **kw), args.repeat)
+    _report(
+        f"backtest years={args.years} parties={len(cols)} rows={len(new)} jobs={args.jobs} (per-origin loop vs one walk)",
+        t_ref,
+        t_new,
+        ref.to_csv(index=False) == new.to_csv(index=False),
+    )
+
+
+def bench_summary(args: argparse.Namespace) -> None:
+    # Prediction rows for `parties` x 3 models; errors are heavy-tailed so hit rates vary.
+    rng = np.random.default_rng(args.seed)
+    n = args.rows
+    models = np.array(["legacy", "ssm", "ssm_exog"], dtype=object)
+    err = rng.standard_t(4, n)
+    preds = pd.DataFrame(
+        {
+            "party": np.array([f"party_{j}" for j in range(args.parties)], dtype=object)[rng.integers(args.parties, size=n)],
+            "model": models[rng.integers(3, size=n)],
+            "error": err,
+            "abs_error": np.abs(err),
+            "sq_error": err * err,
+            "pred_sd": rng.uniform(0.5, 2.0, n),
+            "horizon": 1,
+        }
+    )
+    t_ref, ref = _timeit(lambda: _build_summary_reference(preds), args.repeat)
+    t_new, new = _timeit(lambda: build_summary(preds), args.repeat)
+    # MAE and RMSE may differ in the last bits: bincount sums sequentially, np.mean pairwise.
+    same = (
+        ref[["level", "party", "model", "n", "hit_rate"]].equals(new[["level", "party", "model", "n", "hit_rate"]])
+        and np.allclose(ref["mae"], new["mae"], rtol=1e-12, atol=0.0)
+        and np.allclose(ref["rmse"], new["rmse"], rtol=1e-12, atol=0.0)
+    )
+    _report(f"summary rows={n} parties={args.parties} (lambda groupby vs vectorized reductions)", t_ref, t_new, same)
+
+
+def bench_parse_range(args: argparse.Namespace) -> None:
+    col = synthetic_survey_dates(args.rows, seed=args.seed)
+
+    def reference() -> tuple[pd.Series, pd.Series]:
+        ranges = col.apply(parse_range)
+        return ranges.apply(lambda x: x[0]), ranges.apply(lambda x: x[1])
+
+    t_ref, (s_ref, e_ref) = _timeit(reference, args.repeat)
+    t_new, (s_new, e_new) = _timeit(lambda: parse_range_series(col), args.repeat)
+    same = s_ref.astype("datetime64[ns]").equals(s_new) and e_ref.astype("datetime64[ns]").equals(e_new)
+    _report(f"parse-range rows={args.rows}", t_ref, t_new, same)
+
+
+def _load_in_child(loader: str, xlsx: str, sheets: list[str]) -> tuple[float, Optional[float], pd.DataFrame]:
+    # Runs in a fresh process so ru_maxrss reflects this loader alone; the
+    # import footprint measured before loading is subtracted.
+    import openpyxl  # noqa: F401
+
+    before = current_rss_mb()
+    fn = load_sheet if loader == "read_excel" else stream_sheet
+    t0 = time.perf_counter()
+    df = normalize_poll_frame(pd.concat([fn(Path(xlsx), s) for s in sheets], ignore_index=True))
+    elapsed = time.perf_counter() - t0
+    peak = peak_rss_mb()
+    return elapsed, None if peak is None or before is None else peak - before, df
+
+
+def bench_load(args: argparse.Namespace) -> None:
+    xlsx = Path(args.xlsx) if args.xlsx else find_raw_poll_xlsx(Path(args.data_dir))
+    if xlsx is None:
+        raise SystemExit(f"No raw polling workbook found in {args.data_dir}")
+    ctx = mp.get_context("spawn")
+    with ctx.Pool(1, maxtasksperchild=1) as pool:
+        t_ref, rss_ref, ref = pool.apply(_load_in_child, ("read_excel", str(xlsx), SHEETS))
+    with ctx.Pool(1, maxtasksperchild=1) as pool:
+        t_new, rss_new, new = pool.apply(_load_in_child, ("stream", str(xlsx), SHEETS))
+
+    # The streaming loader drops metadata columns the pipeline never reads.
+    kept = [c for c in ref.columns if c in PIPELINE_BASE_COLS or c in get_party_cols(ref) or c.startswith("date_")]
+    same = list(new.columns) == kept and _frames_match(ref[kept], new, rtol=0.0)
+    fmt = lambda mb: "n/a" if mb is None else f"{mb:.1f} MiB"
+    print(f"load {xlsx.name}: peak RSS above imports: read_excel {fmt(rss_ref)}, streaming {fmt(rss_new)}")
+    _report(f"load rows={len(new)} columns {len(ref.columns)} -> {len(new.columns)}", t_ref, t_new, same)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark optimized pipeline paths against their reference versions.")
+    sub = ap.add_subparsers(dest="bench", required=True)
+
+    p = sub.add_parser("parse-range", help="조사일자 range parsing (apply vs vectorized)")
+    p.add_argument("--rows", type=int, default=100_000)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--repeat", type=int, default=1)
+    p.set_defaults(func=bench_parse_range)
+
+    p = sub.add_parser("blend", help="blend_time_series (per-date loop vs matrix reduce)")
+    p.add_argument("--years", type=int, default=3)
+    p.add_argument("--parties", type=int, default=32)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--repeat", type=int, default=1)
+    p.set_defaults(func=bench_blend)
+
+    p = sub.add_parser("house-effect", help="apply_time_varying_house_effect (row loop vs segment arrays)")
+    p.add_argument("--years", type=int, default=3)
+    p.add_argument("--parties", type=int, default=12)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--repeat", type=int, default=1)
+    p.set_defaults(func=bench_house_effect)
+
+    p = sub.add_parser("kalman-fit", help="local-level (q, r) grid search (scalar filter per point vs batched tensor)")
+    p.add_argument("--series", type=int, default=600)
+    p.add_argument("--window", type=int, default=24)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--repeat", type=int, default=1)
+    p.set_defaults(func=bench_kalman_fit)
+
+    p = sub.add_parser("arx", help="ARX(1) approval model at every origin (closed-form ridge vs recursive least squares)")
+    p.add_argument("--weeks", type=int, default=520)
+    p.add_argument("--window", type=int, default=24)
+    p.add_argument("--forgetting", type=float, default=1.0)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--repeat", type=int, default=1)
+    p.set_defaults(func=bench_arx)
+
+    p = sub.add_parser("weekly", help="to_weekly (daily reindex + interpolate vs direct Monday-grid interpolation)")
+    p.add_argument("--years", type=int, default=10)
+    p.add_argument("--parties", type=int, default=12)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--repeat", type=int, default=3)
+    p.set_defaults(func=bench_weekly)
+
+    p = sub.add_parser("regime", help="detect_regime_shift at every origin (per-prefix vs precomputed timeline)")
+    p.add_argument("--weeks", type=int, default=520)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--repeat", type=int, default=1)
+    p.set_defaults(func=bench_regime)
+
+    p = sub.add_parser("backtest", help="run_backtest with approval ARX (per-origin loop vs one walk)")
+    p.add_argument("--years", type=int, default=10)
+    p.add_argument("--parties", type=int, default=8)
+    p.add_argument("--window", type=int, default=24)
+    p.add_argument("--jobs", type=int, default=1, help="Worker processes for the walk (0 = CPU count)")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--repeat", type=int, default=1)
+    p.set_defaults(func=bench_backtest)
+
+    p = sub.add_parser("summary", help="build_summary (per-group lambdas vs vectorized group reductions)")
+    p.add_argument("--rows", type=int, default=3_000_000)
+    p.add_argument("--parties", type=int, default=12)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--repeat", type=int, default=1)
+    p.set_defaults(func=bench_summary)
+
+    p = sub.add_parser("load", help="party-support sheets (pd.read_excel vs openpyxl streaming), with peak RSS")
+    p.add_argument("--xlsx", default=None, help="Raw polling workbook (default: newest under --data-dir)")
+    p.add_argument("--data-dir", default="data")
+    p.set_defaults(func=bench_load)
+
+    args = ap.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
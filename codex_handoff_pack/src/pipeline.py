@@ -1,11 +1,21 @@
 from __future__ import annotations
 
-from pipeline_core.config import parse_args
+from pathlib import Path
+
+from pipeline_core.config import parse_args, vintage_config
+from pipeline_core.poll_store import PollStore, vintage_dates
 from pipeline_core.runner import run_pipeline
 
 
 def main() -> None:
     cfg = parse_args()
+    if cfg.as_of and cfg.poll_store:
+        if cfg.pollster_weights != "static":
+            print(f"--pollster-weights {cfg.pollster_weights} ignored for replays (look-ahead); using static weights.")
+        # One replay per vintage date; each writes under outputs/vintages/<date>/.
+        for d in vintage_dates(PollStore(Path(cfg.poll_store)), cfg.as_of):
+            run_pipeline(vintage_config(cfg, d))
+        return
     run_pipeline(cfg)
 
 
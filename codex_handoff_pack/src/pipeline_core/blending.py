@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from typing import Dict, List, Tuple
 
 import numpy as np
@@ -16,7 +17,72 @@ def blend_time_series(
     """
     Group by date_end and compute weighted mean per party column.
     Missing values are ignored per-party.
+
+    Works on a (polls x parties) value matrix sorted by date_end and reduces
+    each date block with grouped sums. If every sample-size-adjusted
+    weight in a cell is zero, the cell falls back to pollster weights only.
     """
+    df = df[df["조사기관"].isin(POLLSTERS)]
+    party_cols = get_party_cols(df)
+    df = df[df["date_end"].notna()]
+    if df.empty:
+        return pd.DataFrame(columns=["date_end", "n_polls"] + party_cols)
+
+    # Stable sort keeps the original row order inside each date, as groupby does.
+    order = np.argsort(df["date_end"].to_numpy(), kind="mergesort")
+    df = df.iloc[order]
+    dates = df["date_end"].to_numpy()
+    starts = np.flatnonzero(np.r_[True, dates[1:] != dates[:-1]])
+    n_polls = np.diff(np.r_[starts, len(dates)])
+
+    values = np.empty((len(df), len(party_cols)), dtype=float)
+    for j, c in enumerate(party_cols):
+        values[:, j] = pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=float)
+    valid = ~np.isnan(values)
+    base_w = df["조사기관"].map(weights).fillna(0.0).to_numpy(dtype=float)[:, None]
+
+    w = np.broadcast_to(base_w, values.shape)
+    if sample_size_weight and "표본수(명)" in df.columns:
+        n = _parse_sample_size_col(df["표본수(명)"]).to_numpy(dtype=float)[:, None]
+        p = np.clip(values / 100.0, sample_eps, 1.0 - sample_eps)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            var_obs = p * (1.0 - p) / np.maximum(n, 1.0)
+            obs_w = 1.0 / np.maximum(var_obs, 1e-9)
+        obs_w = np.where(np.isfinite(obs_w), obs_w, 0.0)
+        w = w * obs_w
+
+    group_id = np.repeat(np.arange(len(starts)), n_polls)
+
+    def grouped_sum(x: np.ndarray) -> np.ndarray:
+        # np.add.at accumulates row by row, the same operand order np.sum uses on
+        # a short per-date slice, so small date blocks match the loop bit for bit.
+        out = np.zeros((len(starts), x.shape[1]), dtype=float)
+        np.add.at(out, group_id, np.where(valid, x, 0.0))
+        return out
+
+    def grouped_mean(wm: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        sw = grouped_sum(wm)
+        swv = grouped_sum(wm * values)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return sw, swv / sw
+
+    sw, mean_w = grouped_mean(w)
+    sw0, mean_0 = grouped_mean(np.broadcast_to(base_w, values.shape))
+    blended = np.where(sw > 0, mean_w, np.where(sw0 > 0, mean_0, np.nan))
+
+    out = pd.DataFrame(blended, columns=party_cols)
+    out.insert(0, "n_polls", n_polls)
+    out.insert(0, "date_end", dates[starts])
+    return out
+
+
+def _blend_time_series_reference(
+    df: pd.DataFrame,
+    weights: Dict[str, float],
+    sample_size_weight: bool = False,
+    sample_eps: float = 0.01,
+) -> pd.DataFrame:
+    """Original per-date, per-party loop; kept for parity checks against blend_time_series."""
     df = df[df["조사기관"].isin(POLLSTERS)].copy()
     party_cols = get_party_cols(df)
 
@@ -57,6 +123,180 @@ def blend_time_series(
     return pd.DataFrame(rows).sort_values("date_end")
 
 
+HOUSE_DIAG_COLUMNS = [
+    "date_end", "pollster", "party", "raw_value", "baseline_value", "residual", "house_bias", "adj_value", "obs_count"
+]
+
+
+@dataclass
+class HouseEffectInputs:
+    """
+    Parameter-independent part of the house-effect estimate.
+    Rows of `work` are sorted by (조사기관, date_end, 등록번호), so each pollster
+    is one contiguous segment `[seg_starts[i], seg_starts[i] + seg_lens[i])`.
+    """
+
+    work: pd.DataFrame
+    party_cols: List[str]
+    raw: np.ndarray
+    base: np.ndarray
+    seg_starts: np.ndarray
+    seg_lens: np.ndarray
+
+
+def prepare_house_effect(
+    df: pd.DataFrame,
+    weights: Dict[str, float],
+    sample_size_weight: bool = False,
+    sample_eps: float = 0.01,
+) -> HouseEffectInputs:
+    work = df[df["조사기관"].isin(POLLSTERS)].copy()
+    party_cols = get_party_cols(work)
+    if work.empty or not party_cols:
+        empty = np.empty((len(work), len(party_cols)), dtype=float)
+        return HouseEffectInputs(work, party_cols, empty, empty, np.empty(0, dtype=int), np.empty(0, dtype=int))
+
+    for c in party_cols:
+        work[c] = pd.to_numeric(work[c], errors="coerce")
+
+    baseline = blend_time_series(
+        work,
+        weights,
+        sample_size_weight=sample_size_weight,
+        sample_eps=sample_eps,
+    )
+    # Same row order and index as a left merge on date_end.
+    work = work.reset_index(drop=True)
+    base_pos = pd.Index(baseline["date_end"]).get_indexer(work["date_end"])
+    base_vals = baseline[party_cols].to_numpy(dtype=float)
+    base_vals = np.vstack([base_vals, np.full((1, len(party_cols)), np.nan)])[base_pos]
+
+    order = work.sort_values(["조사기관", "date_end", "등록번호"], na_position="last").index.to_numpy()
+    work = work.loc[order].copy()
+    raw = work[party_cols].to_numpy(dtype=float)
+    base = base_vals[order]
+
+    pollsters = work["조사기관"].astype(str).to_numpy()
+    seg_starts = np.flatnonzero(np.r_[True, pollsters[1:] != pollsters[:-1]])
+    seg_lens = np.diff(np.r_[seg_starts, len(pollsters)])
+    return HouseEffectInputs(work, party_cols, raw, base, seg_starts, seg_lens)
+
+
+def house_effect_recursion(
+    raw: np.ndarray,
+    base: np.ndarray,
+    seg_starts: np.ndarray,
+    seg_lens: np.ndarray,
+    ewma_lambda: float | np.ndarray,
+    bias_clip: float | np.ndarray,
+    min_obs: int | np.ndarray,
+    init_state: np.ndarray | None = None,
+    init_count: np.ndarray | None = None,
+    return_state: bool = False,
+) -> tuple:
+    """
+    Lagged EWMA house-bias recursion on (rows x parties) arrays.
+
+    All pollster segments advance together one observation at a time, so the
+    loop runs max(seg_lens) times. Parameters may be 1-D arrays of equal length
+    G to evaluate a grid in one pass; outputs then carry a leading G axis.
+    Returns (adjusted, house_bias, residual, obs_count); cells with a missing
+    raw or baseline value keep raw, NaN, NaN and 0.
+
+    `init_state`/`init_count` (segments x parties) resume each segment from a
+    checkpoint; with `return_state=True` the (state, count) after every row are
+    appended, so any row can serve as a later resume point.
+    """
+    lam = np.asarray(ewma_lambda, dtype=float)
+    grid = lam.ndim > 0
+    lam = np.atleast_1d(lam)[:, None, None]
+    clip = np.atleast_1d(np.asarray(bias_clip, dtype=float))[:, None, None]
+    mobs = np.atleast_1d(np.asarray(min_obs))[:, None, None]
+    g = max(lam.shape[0], clip.shape[0], mobs.shape[0])
+    n, n_party = raw.shape
+
+    valid = ~(np.isnan(raw) | np.isnan(base))
+    residual_all = raw - base
+    adjusted = np.broadcast_to(raw, (g, n, n_party)).copy()
+    house_bias = np.full((g, n, n_party), np.nan)
+    residual = np.full((g, n, n_party), np.nan)
+    obs_count = np.zeros((g, n, n_party), dtype=int)
+    if return_state:
+        state_trace = np.zeros((g, n, n_party))
+        count_trace = np.zeros((g, n, n_party), dtype=int)
+
+    state = np.zeros((g, len(seg_starts), n_party))
+    count = np.zeros((g, len(seg_starts), n_party), dtype=int)
+    if init_state is not None:
+        state[:] = init_state
+    if init_count is not None:
+        count[:] = init_count
+    for k in range(int(seg_lens.max()) if len(seg_lens) else 0):
+        active = np.flatnonzero(seg_lens > k)
+        rows = seg_starts[active] + k
+        v = valid[rows]
+        prev_state = state[:, active]
+        prev_count = count[:, active]
+        r = residual_all[rows]
+
+        used = np.where(prev_count >= mobs, np.clip(prev_state, -clip, clip), 0.0)
+        adjusted[:, rows] = np.where(v, raw[rows] - used, raw[rows])
+        house_bias[:, rows] = np.where(v, used, np.nan)
+        residual[:, rows] = np.where(v, r, np.nan)
+        obs_count[:, rows] = np.where(v, prev_count + 1, 0)
+
+        state[:, active] = np.where(v, lam * prev_state + (1.0 - lam) * r, prev_state)
+        count[:, active] = prev_count + v
+        if return_state:
+            state_trace[:, rows] = state[:, active]
+            count_trace[:, rows] = count[:, active]
+
+    out = (adjusted, house_bias, residual, obs_count)
+    if return_state:
+        out += (state_trace, count_trace)
+    if not grid and np.ndim(bias_clip) == 0 and np.ndim(min_obs) == 0:
+        return tuple(a[0] for a in out)
+    return out
+
+
+def house_effect_outputs(
+    inputs: HouseEffectInputs,
+    adjusted: np.ndarray,
+    house_bias: np.ndarray,
+    residual: np.ndarray,
+    obs_count: np.ndarray,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Assemble the adjusted frame and the diagnostics table from recursion arrays."""
+    work = inputs.work.copy()
+    party_cols = inputs.party_cols
+    extra: Dict[str, np.ndarray] = {}
+    for j, party in enumerate(party_cols):
+        work[party] = adjusted[:, j]
+        extra[f"__house_bias__{party}"] = house_bias[:, j]
+        extra[f"__residual__{party}"] = residual[:, j]
+        extra[f"__obs_count__{party}"] = obs_count[:, j]
+    work = pd.concat([work, pd.DataFrame(extra, index=work.index)], axis=1)
+
+    # Party-major, then row order: the order the per-row loop emitted diagnostics in.
+    valid = ~(np.isnan(inputs.raw) | np.isnan(inputs.base))
+    p_idx, r_idx = np.nonzero(valid.T)
+    diag_df = pd.DataFrame(
+        {
+            "date_end": work["date_end"].to_numpy()[r_idx],
+            "pollster": work["조사기관"].astype(str).to_numpy()[r_idx],
+            "party": np.asarray(party_cols, dtype=object)[p_idx],
+            "raw_value": inputs.raw[r_idx, p_idx],
+            "baseline_value": inputs.base[r_idx, p_idx],
+            "residual": residual[r_idx, p_idx],
+            "house_bias": house_bias[r_idx, p_idx],
+            "adj_value": adjusted[r_idx, p_idx],
+            "obs_count": obs_count[r_idx, p_idx],
+        },
+        columns=HOUSE_DIAG_COLUMNS,
+    ).sort_values(["date_end", "pollster", "party"])
+    return work, diag_df
+
+
 def apply_time_varying_house_effect(
     df: pd.DataFrame,
     weights: Dict[str, float],
@@ -77,6 +317,37 @@ def apply_time_varying_house_effect(
     if min_obs < 0:
         raise ValueError("min_obs must be >= 0.")
 
+    inputs = prepare_house_effect(df, weights, sample_size_weight=sample_size_weight, sample_eps=sample_eps)
+    if inputs.work.empty or not inputs.party_cols:
+        return inputs.work, pd.DataFrame(columns=HOUSE_DIAG_COLUMNS)
+
+    arrays = house_effect_recursion(
+        inputs.raw,
+        inputs.base,
+        inputs.seg_starts,
+        inputs.seg_lens,
+        ewma_lambda=ewma_lambda,
+        bias_clip=bias_clip,
+        min_obs=min_obs,
+    )
+    return house_effect_outputs(inputs, *arrays)
+
+
+def _apply_time_varying_house_effect_reference(
+    df: pd.DataFrame,
+    weights: Dict[str, float],
+    ewma_lambda: float = 0.8,
+    bias_clip: float = 6.0,
+    min_obs: int = 3,
+    sample_size_weight: bool = False,
+    sample_eps: float = 0.01,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Original per-row loop; kept for parity checks against apply_time_varying_house_effect."""
+    if not (0.0 <= ewma_lambda < 1.0):
+        raise ValueError("ewma_lambda must be in [0, 1).")
+    if min_obs < 0:
+        raise ValueError("min_obs must be >= 0.")
+
     work = df[df["조사기관"].isin(POLLSTERS)].copy()
     party_cols = get_party_cols(work)
     if work.empty or not party_cols:
@@ -159,5 +430,3 @@ def apply_time_varying_house_effect(
     work = work.drop(columns=drop_cols, errors="ignore")
     diag_df = pd.DataFrame(diag_rows).sort_values(["date_end", "pollster", "party"])
     return work, diag_df
-
-
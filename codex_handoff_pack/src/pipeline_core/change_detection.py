@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .constants import POLLSTERS
+from .parse_cache import normalize_for_storage, _parquet_available
+from .sheet_loading import get_party_cols
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_DIRNAME = ".pipeline_state"
+KEY = "등록번호"
+
+
+@dataclass
+class RowDiff:
+    """Row-level difference between two parsed poll frames, keyed by 등록번호."""
+
+    added: List[int] = field(default_factory=list)
+    modified: List[int] = field(default_factory=list)
+    removed: List[int] = field(default_factory=list)
+    affected_dates: List[pd.Timestamp] = field(default_factory=list)
+    columns_added: List[str] = field(default_factory=list)
+    columns_removed: List[str] = field(default_factory=list)
+    unkeyed_rows: int = 0
+
+    @property
+    def empty(self) -> bool:
+        return not (self.added or self.modified or self.removed or self.columns_added or self.columns_removed)
+
+
+def _keyed(df: pd.DataFrame) -> pd.DataFrame:
+    out = df[df[KEY].notna()]
+    return out[~out[KEY].duplicated(keep="last")].set_index(KEY)
+
+
+def _cells_differ(a: pd.DataFrame, b: pd.DataFrame) -> np.ndarray:
+    """Per-row flag: any cell differs, with NaN == NaN."""
+    if a.empty:
+        return np.zeros(len(a), dtype=bool)
+    same = (a.to_numpy(dtype=object) == b.to_numpy(dtype=object)) | (a.isna().to_numpy() & b.isna().to_numpy())
+    return ~same.all(axis=1)
+
+
+def diff_poll_rows(prev: pd.DataFrame, cur: pd.DataFrame) -> RowDiff:
+    """
+    Classify rows of `cur` against `prev` as added, modified or removed by 등록번호.
+    Rows without a 등록번호 cannot be matched and are only counted. Duplicated
+    numbers keep their last row, as a later sheet supersedes an earlier one.
+    """
+    prev = normalize_for_storage(prev)
+    cur = normalize_for_storage(cur)
+    common = [c for c in cur.columns if c in prev.columns and c != KEY]
+    p, c = _keyed(prev), _keyed(cur)
+
+    added = c.index.difference(p.index)
+    removed = p.index.difference(c.index)
+    both = c.index.intersection(p.index)
+    changed = both[_cells_differ(c.loc[both, common], p.loc[both, common])]
+
+    dates = pd.concat(
+        [c.loc[added.union(changed), "date_end"], p.loc[removed.union(changed), "date_end"]]
+    ).dropna()
+    unkeyed = int(cur[KEY].isna().sum())
+    return RowDiff(
+        added=sorted(int(x) for x in added),
+        modified=sorted(int(x) for x in changed),
+        removed=sorted(int(x) for x in removed),
+        affected_dates=sorted(pd.Timestamp(d) for d in dates.unique()),
+        columns_added=[x for x in cur.columns if x not in prev.columns],
+        columns_removed=[x for x in prev.columns if x not in cur.columns],
+        unkeyed_rows=unkeyed,
+    )
+
+
+def _date_signature(df: pd.DataFrame) -> Dict[pd.Timestamp, tuple]:
+    """Ordered 등록번호 sequence per date_end: the row order blend_time_series sums in."""
+    order = np.argsort(df["date_end"].to_numpy(), kind="mergesort")
+    s = df.iloc[order]
+    return {d: tuple(g[KEY].tolist()) for d, g in s.groupby("date_end", sort=False)}
+
+
+def dirty_blend_dates(prev_input: pd.DataFrame, cur_input: pd.DataFrame) -> Optional[List[pd.Timestamp]]:
+    """
+    date_end groups whose blend_time_series result can differ between the two
+    blend inputs: a row added, removed, edited or reordered within the date.
+    Returns None when rows cannot be matched by 등록번호.
+    """
+    if cur_input[KEY].isna().any() or cur_input[KEY].duplicated().any():
+        return None
+    if prev_input[KEY].isna().any() or prev_input[KEY].duplicated().any():
+        return None
+    sig_prev, sig_cur = _date_signature(prev_input), _date_signature(cur_input)
+    dirty = {d for d in sig_prev.keys() | sig_cur.keys() if sig_prev.get(d) != sig_cur.get(d)}
+
+    p, c = prev_input.set_index(KEY), cur_input.set_index(KEY)
+    both = c.index.intersection(p.index)
+    cols = list(c.columns)
+    changed = both[_cells_differ(c.loc[both, cols], p.loc[both, cols])]
+    dirty.update(c.loc[changed, "date_end"])
+    dirty.update(p.loc[changed, "date_end"])
+    return sorted(dirty)
+
+
+def _blend_input(df: pd.DataFrame) -> pd.DataFrame:
+    # Only the columns and rows blend_time_series reads.
+    rows = df[df["조사기관"].isin(POLLSTERS) & df["date_end"].notna()]
+    cols = [KEY, "조사기관", "date_end"] + (["표본수(명)"] if "표본수(명)" in df.columns else []) + get_party_cols(df)
+    return normalize_for_storage(rows[cols])
+
+
+class PipelineSnapshot:
+    """
+    Parsed rows, blend input and blended series of the previous pipeline run,
+    stored as Parquet under `<out dir>/.pipeline_state/`. Unavailable (every run
+    is a full run) when pyarrow is not installed.
+    """
+
+    def __init__(self, out_dir: Path):
+        self.dir = Path(out_dir) / SNAPSHOT_DIRNAME
+        self.meta: dict = {}
+        meta = self.dir / "meta.json"
+        if meta.exists():
+            try:
+                self.meta = json.loads(meta.read_text(encoding="utf-8"))
+            except Exception:
+                self.meta = {}
+        if self.meta.get("version") != SNAPSHOT_VERSION:
+            self.meta = {}
+
+    def frame(self, name: str) -> Optional[pd.DataFrame]:
+        p = self.dir / f"{name}.parquet"
+        if not self.meta or not _parquet_available() or not p.exists():
+            return None
+        try:
+            return pd.read_parquet(p)
+        except Exception:
+            return None
+
+    def save(self, meta: dict, frames: Dict[str, pd.DataFrame]) -> None:
+        if not _parquet_available():
+            return
+        try:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            for name, df in frames.items():
+                tmp = self.dir / f"{name}.parquet.tmp"
+                df.to_parquet(tmp, index=False)
+                tmp.replace(self.dir / f"{name}.parquet")
+            (self.dir / "meta.json").write_text(
+                json.dumps({"version": SNAPSHOT_VERSION, **meta}, ensure_ascii=False, indent=2) + "\n", encoding="utf-8"
+            )
+        except Exception as e:
+            print(f"Pipeline snapshot write skipped ({self.dir}): {e}")
+
+
+def blend_fingerprint(
+    weights: Dict[str, float], party_cols: List[str], sample_size_weight: bool, sample_eps: float, frozen: bool = False
+) -> str:
+    """
+    Blend settings a snapshot was built with. With `frozen` the weights are
+    left out: published dates keep their weights, so a weight change alone
+    does not invalidate the snapshot.
+    """
+    payload = {
+        "weights": [] if frozen else sorted((str(k), float(v)) for k, v in weights.items()),
+        "party_cols": list(party_cols),
+        "sample_size_weight": bool(sample_size_weight),
+        "sample_eps": float(sample_eps),
+    }
+    if frozen:
+        payload["frozen"] = True
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def reblend(
+    df: pd.DataFrame,
+    blend: Callable[[pd.DataFrame], pd.DataFrame],
+    snapshot: PipelineSnapshot,
+    fingerprint: str,
+    partial: bool,
+    frozen_dirty: Optional[List[pd.Timestamp]] = None,
+) -> tuple[pd.DataFrame, pd.DataFrame, str, List[pd.Timestamp]]:
+    """
+    Blend `df`, recomputing only the dirty date_end groups when the snapshot
+    matches `fingerprint`. Each date's blend depends only on that date's rows,
+    so splicing fresh groups into the previous series equals a full blend.
+    `frozen_dirty` (the dates whose raw rows changed) replaces the blend-input
+    comparison, so dates published before keep their values even though the
+    weights or house adjustments behind them moved; new dates are always blended.
+    Returns (blended, blend_input, mode, dirty_dates).
+    """
+    cur_input = _blend_input(df)
+    prev_input = prev_blended = None
+    reason = "disabled"
+    if partial:
+        reason = "no_snapshot"
+        if snapshot.meta.get("blend_fingerprint") not in (None, fingerprint):
+            reason = "config_changed"
+        else:
+            prev_input, prev_blended = snapshot.frame("blend_input"), snapshot.frame("blended")
+
+    dirty = None
+    if prev_input is not None and prev_blended is not None and frozen_dirty is not None:
+        unpublished = set(cur_input["date_end"]) - set(prev_blended["date_end"])
+        dirty = sorted(set(frozen_dirty) | unpublished)
+    elif prev_input is not None and prev_blended is not None:
+        dirty = dirty_blend_dates(prev_input, cur_input)
+        if dirty is None:
+            reason = "registration_numbers_not_unique"
+    if dirty is None:
+        return blend(df), cur_input, f"full:{reason}", []
+
+    kept = prev_blended[~prev_blended["date_end"].isin(dirty)]
+    fresh = blend(df[df["date_end"].isin(dirty)]) if dirty else kept.iloc[:0]
+    blended = pd.concat([kept, fresh], ignore_index=True) if len(fresh) else kept.copy()
+    blended = blended.iloc[np.argsort(blended["date_end"].to_numpy(), kind="mergesort")].reset_index(drop=True)
+    blended["n_polls"] = blended["n_polls"].astype(int)
+    return blended, cur_input, f"partial:{len(dirty)}/{len(blended)} dates", dirty
+
+
+def series_changes(prev: Optional[pd.DataFrame], cur: pd.DataFrame) -> tuple[bool, Optional[pd.Timestamp]]:
+    """Whether the blended series changed and the earliest date_end that did."""
+    if prev is None:
+        return True, (cur["date_end"].min() if len(cur) else None)
+    if list(prev.columns) != list(cur.columns):
+        return True, (cur["date_end"].min() if len(cur) else None)
+    p = prev.set_index("date_end")
+    c = cur.set_index("date_end")
+    dates = p.index.union(c.index)
+    p, c = p.reindex(dates), c.reindex(dates)
+    differ = _cells_differ(c, p)
+    if not differ.any():
+        return False, None
+    return True, dates[differ].min()
+
+
+def frame_sha256(df: pd.DataFrame) -> str:
+    """Content hash of a frame (columns, dtypes and values; not the index)."""
+    h = hashlib.sha256(json.dumps([[str(c), str(t)] for c, t in df.dtypes.items()], ensure_ascii=False).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def write_change_report(path: Path, report: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, ensure_ascii=False, indent=2, default=str) + "\n", encoding="utf-8")
+
+
+def load_change_report(path: Path) -> Optional[dict]:
+    path = Path(path)
+    if not path.exists():
+        return None
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return None
+
+
+def series_changed(report: Optional[dict]) -> bool:
+    """True unless a change report says the blended party series is unchanged."""
+    return report is None or bool(report.get("series_changed", True))
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 import argparse
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Optional, Sequence
 
 
 @dataclass(frozen=True)
@@ -18,10 +19,29 @@ class PipelineConfig:
     house_out: str
     sample_size_weight: str
     sample_eps: float
+    incremental: str = "off"
+    changes_out: str = "outputs/poll_changes.json"
+    sheets: str = "default"
+    archive_dir: Optional[str] = None
+    load_jobs: int = 0
+    pollster_weights: str = "static"
+    accuracy_state: str = "outputs/pollster_accuracy.json"
+    accuracy_half_life: float = 180.0
+    poll_store: Optional[str] = None
+    as_of: Optional[str] = None
 
 
-def parse_args() -> PipelineConfig:
-    parser = argparse.ArgumentParser(description="Build weighted blended poll time series.")
+# Outputs a replay (`--as-of`) writes under outputs/vintages/<date>/ unless given explicitly.
+VINTAGE_DIR = "outputs/vintages"
+_VINTAGE_OUTPUTS = {
+    "out": "outputs/weighted_time_series.xlsx",
+    "house_out": "outputs/house_effect_timeseries.csv",
+    "changes_out": "outputs/poll_changes.json",
+}
+
+
+def build_parser(description: str = "Build weighted blended poll time series.") -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=description)
     parser.add_argument("--input-xlsx", default=None, help="Raw polling workbook path or filename under --data-dir")
     parser.add_argument("--mae-xlsx", default=None, help="Pollster MAE workbook path or filename under --data-dir")
     parser.add_argument("--data-dir", default="data", help="Directory to search for input files")
@@ -33,7 +53,46 @@ def parse_args() -> PipelineConfig:
     parser.add_argument("--house-out", default="outputs/house_effect_timeseries.csv", help="House-effect diagnostic CSV path")
     parser.add_argument("--sample-size-weight", choices=["on", "off"], default="on", help="Enable sample-size-aware observation weighting")
     parser.add_argument("--sample-eps", type=float, default=0.01, help="Probability clip epsilon for variance weighting")
-    ns = parser.parse_args()
+    parser.add_argument(
+        "--incremental",
+        choices=["on", "off"],
+        default="off",
+        help="Re-blend only the dates whose rows changed since the previous run (the house effect is always recomputed in full)",
+    )
+    parser.add_argument(
+        "--changes-out",
+        default="outputs/poll_changes.json",
+        help="Row-level change report vs the previous run (read by downstream stages)",
+    )
+    parser.add_argument(
+        "--sheets",
+        choices=["default", "all"],
+        default="default",
+        help="Party-support sheets to load: the configured yearly sheets, or every 정당지지도 sheet",
+    )
+    parser.add_argument("--archive-dir", default=None, help="Extra NESDC workbooks to merge (e.g. data/nesdc_downloads), deduplicated by 등록번호")
+    parser.add_argument("--load-jobs", type=int, default=0, help="Worker processes for parsing uncached sheets (0 = CPU count)")
+    parser.add_argument(
+        "--pollster-weights",
+        choices=["static", "rolling", "optimized"],
+        default="static",
+        help="static: --mae-xlsx every run; rolling: time-decayed leave-one-out MAE kept in --accuracy-state; "
+        "optimized: outputs/optimized_weights.csv from weekly_run.py "
+        "(rolling/optimized: already published dates keep the weights they were blended with)",
+    )
+    parser.add_argument("--accuracy-state", default="outputs/pollster_accuracy.json", help="Rolling pollster-accuracy state path")
+    parser.add_argument("--accuracy-half-life", type=float, default=180.0, help="Half-life in days of residuals in the rolling MAE")
+    parser.add_argument("--poll-store", default=None, help="Bitemporal raw-poll store directory (see src/poll_store.py)")
+    parser.add_argument(
+        "--as-of",
+        default=None,
+        help="Replay: blend the poll rows the --poll-store knew on this date instead of reading workbooks "
+        "(comma list or 'all' for every vintage; outputs go under outputs/vintages/<date>/)",
+    )
+    return parser
+
+
+def config_from_namespace(ns: argparse.Namespace) -> PipelineConfig:
     return PipelineConfig(
         input_xlsx=ns.input_xlsx,
         mae_xlsx=ns.mae_xlsx,
@@ -46,4 +105,32 @@ def parse_args() -> PipelineConfig:
         house_out=ns.house_out,
         sample_size_weight=ns.sample_size_weight,
         sample_eps=ns.sample_eps,
+        incremental=ns.incremental,
+        changes_out=ns.changes_out,
+        sheets=ns.sheets,
+        archive_dir=ns.archive_dir,
+        load_jobs=ns.load_jobs,
+        pollster_weights=ns.pollster_weights,
+        accuracy_state=ns.accuracy_state,
+        accuracy_half_life=ns.accuracy_half_life,
+        poll_store=ns.poll_store,
+        as_of=ns.as_of,
     )
+
+
+def vintage_config(cfg: PipelineConfig, as_of: str) -> PipelineConfig:
+    """
+    `cfg` replaying one vintage; default output paths move to outputs/vintages/<as_of>/.
+    Replays always use the static MAE-workbook weights: the rolling and optimized
+    weights on disk were learned from polls published after `as_of`.
+    """
+    moved = {
+        f: str(Path(VINTAGE_DIR) / str(as_of) / Path(default).name)
+        for f, default in _VINTAGE_OUTPUTS.items()
+        if getattr(cfg, f) == default
+    }
+    return replace(cfg, as_of=str(as_of), pollster_weights="static", **moved)
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> PipelineConfig:
+    return config_from_namespace(build_parser().parse_args(argv))
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from .input_resolution import probe_sheet_names
+from .parse_cache import lookup_cached_frame
+from .sheet_loading import load_poll_sheets, normalize_poll_frame
+
+PARTY_SHEET_PREFIX = "정당지지도"
+CACHE_NAMESPACE = "party_support"
+
+SheetTask = Tuple[Path, str]
+
+
+def is_party_sheet(name: str) -> bool:
+    return str(name).strip().startswith(PARTY_SHEET_PREFIX)
+
+
+def archive_workbooks(archive_dir: Optional[Path]) -> List[Path]:
+    """Archived NESDC workbooks, newest first (by mtime, then name)."""
+    if archive_dir is None or not Path(archive_dir).is_dir():
+        return []
+    found = [p for p in Path(archive_dir).glob("*.xlsx") if not p.name.startswith("~$")]
+    return sorted(found, key=lambda p: (p.stat().st_mtime, p.name), reverse=True)
+
+
+def discover_party_sheets(workbooks: Iterable[Path], sheets: Optional[Sequence[str]] = None) -> List[SheetTask]:
+    """
+    (workbook, sheet) pairs to load, in workbook order and then sheet order.
+    With `sheets=None` every 정당지지도 sheet is taken; otherwise only the listed
+    sheets that the workbook actually has. Unreadable workbooks are skipped.
+    """
+    tasks: List[SheetTask] = []
+    seen = set()
+    for wb in workbooks:
+        wb = Path(wb)
+        key = wb.resolve()
+        if key in seen:
+            continue
+        seen.add(key)
+        names = probe_sheet_names(wb)
+        if names is None:
+            print(f"Skipping unreadable workbook: {wb}")
+            continue
+        wanted = [n for n in names if is_party_sheet(n)] if sheets is None else [n for n in sheets if n in names]
+        tasks.extend((wb, n) for n in wanted)
+    return tasks
+
+
+def _load_task(task: SheetTask) -> pd.DataFrame:
+    # One sheet per cache entry, so a new sheet or workbook does not invalidate the others.
+    path, sheet = task
+    return load_poll_sheets(path, [sheet])
+
+
+def _dedupe(frames: List[pd.DataFrame], tasks: List[SheetTask]) -> pd.DataFrame:
+    """
+    Concatenate in task order and keep one row per 등록번호. The first workbook
+    wins (the primary input is passed first); within a workbook the later sheet
+    wins, as in diff_poll_rows. Rows without a 등록번호 are all kept.
+    """
+    ranks = {}
+    for path, _ in tasks:
+        ranks.setdefault(path, len(ranks))
+    parts = []
+    for i, (df, (path, _)) in enumerate(zip(frames, tasks)):
+        parts.append(df.assign(__wb=ranks[path], __sheet=i))
+    df = pd.concat(parts, ignore_index=True)
+    keyed = df["등록번호"].notna()
+    # Lowest workbook rank, then highest sheet position, per 등록번호.
+    order = df[keyed].sort_values(["__wb", "__sheet"], ascending=[True, False], kind="mergesort")
+    winners = order.drop_duplicates("등록번호", keep="first").index
+    keep = ~keyed.to_numpy()
+    keep[winners] = True
+    return df[keep].drop(columns=["__wb", "__sheet"])
+
+
+def load_party_history(
+    workbooks: Sequence[Path],
+    sheets: Optional[Sequence[str]] = None,
+    jobs: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Load party-support sheets from one or more workbooks and merge them with
+    등록번호 deduplication. Sheets already in the parse cache are read in this
+    process; the rest are parsed in a process pool of `jobs` workers
+    (default: CPU count; 1 parses serially).
+    """
+    tasks = discover_party_sheets(workbooks, sheets)
+    if not tasks:
+        raise FileNotFoundError("No 정당지지도 sheets found in: " + ", ".join(str(w) for w in workbooks))
+
+    frames: List[Optional[pd.DataFrame]] = [lookup_cached_frame(p, CACHE_NAMESPACE, variant=s) for p, s in tasks]
+    misses = [i for i, f in enumerate(frames) if f is None]
+    workers = min(len(misses), jobs if jobs is not None else (os.cpu_count() or 1))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for i, df in zip(misses, pool.map(_load_task, [tasks[i] for i in misses])):
+                frames[i] = df
+    else:
+        for i in misses:
+            frames[i] = _load_task(tasks[i])
+
+    merged = _dedupe(frames, tasks) if len(tasks) > 1 else frames[0]
+    return normalize_poll_frame(merged)
+
+
+def history_workbooks(primary: Path, archive_dir: Optional[Path]) -> List[Path]:
+    """Primary input first, then archived workbooks newest first."""
+    return [Path(primary)] + [p for p in archive_workbooks(archive_dir) if p.resolve() != Path(primary).resolve()]
+
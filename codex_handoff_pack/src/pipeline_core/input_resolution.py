@@ -1,11 +1,17 @@
 from __future__ import annotations
 
+import json
+import xml.etree.ElementTree as ET
+import zipfile
 from pathlib import Path
-from typing import Optional, Tuple
-
-import pandas as pd
+from typing import Dict, List, Optional, Tuple
 
 from .constants import SHEETS
+from .parse_cache import CACHE_DIRNAME
+
+MANIFEST_NAME = "input_manifest.json"
+
+
 def _normalize_path(data_dir: Path, explicit: Optional[str]) -> Optional[Path]:
     if explicit is None:
         return None
@@ -17,56 +23,145 @@ def _normalize_path(data_dir: Path, explicit: Optional[str]) -> Optional[Path]:
     return p
 
 
-def _looks_like_raw_poll_xlsx(path: Path) -> bool:
+def probe_sheet_names(path: Path) -> Optional[List[str]]:
+    """
+    Read the sheet list from xl/workbook.xml without loading any worksheet.
+    Returns None when the file is not a readable xlsx package.
+    """
     try:
-        x = pd.ExcelFile(path)
-        return all(s in x.sheet_names for s in SHEETS)
+        with zipfile.ZipFile(path) as z:
+            root = ET.fromstring(z.read("xl/workbook.xml"))
     except Exception:
-        return False
+        return None
+    return [el.get("name", "") for el in root.iter() if el.tag.rsplit("}", 1)[-1] == "sheet"]
 
 
-def _looks_like_mae_xlsx(path: Path) -> bool:
+def probe_first_row(path: Path) -> Optional[List[str]]:
+    """Header cells of the first worksheet, read in openpyxl read-only mode."""
     try:
-        df = pd.read_excel(path, sheet_name=0, nrows=5)
+        from openpyxl import load_workbook
+
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            ws = wb.worksheets[0]
+            row = next(ws.iter_rows(max_row=1, values_only=True), ())
+        finally:
+            wb.close()
     except Exception:
-        return False
-    cols = [str(c) for c in df.columns]
-    has_pollster = "조사기관" in cols
-    has_mae = any("MAE" in c.upper() for c in cols)
-    return has_pollster and has_mae
+        return None
+    return [str(v) for v in row if v is not None]
+
+
+class InputManifest:
+    """
+    Probe results per workbook in a data dir, keyed by file name and
+    invalidated by (size, mtime_ns). Persisted under the parse-cache dir so
+    repeated resolution only probes new or changed files.
+    """
+
+    def __init__(self, data_dir: Path):
+        self.path = data_dir / CACHE_DIRNAME / MANIFEST_NAME
+        self.entries: Dict[str, dict] = {}
+        self.dirty = False
+        if self.path.exists():
+            try:
+                self.entries = json.loads(self.path.read_text(encoding="utf-8"))
+            except Exception:
+                self.entries = {}
+
+    def _entry(self, path: Path) -> dict:
+        st = path.stat()
+        key = path.name
+        e = self.entries.get(key)
+        if e is None or e.get("size") != st.st_size or e.get("mtime_ns") != st.st_mtime_ns:
+            e = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sheets": probe_sheet_names(path)}
+            self.entries[key] = e
+            self.dirty = True
+        return e
+
+    def is_raw_poll(self, path: Path) -> bool:
+        sheets = self._entry(path).get("sheets")
+        return sheets is not None and all(s in sheets for s in SHEETS)
 
+    def is_mae(self, path: Path) -> bool:
+        e = self._entry(path)
+        if e.get("sheets") is None:
+            return False
+        if "mae_header" not in e:
+            cols = probe_first_row(path) or []
+            e["mae_header"] = "조사기관" in cols and any("MAE" in c.upper() for c in cols)
+            self.dirty = True
+        return bool(e["mae_header"])
 
-def resolve_inputs(input_xlsx: Optional[str], mae_xlsx: Optional[str], data_dir: str) -> Tuple[Path, Path]:
+    def save(self, present: List[Path]) -> None:
+        names = {p.name for p in present}
+        stale = [k for k in self.entries if k not in names]
+        for k in stale:
+            del self.entries[k]
+        if not (self.dirty or stale):
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".json.tmp")
+            tmp.write_text(json.dumps(self.entries, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+            tmp.replace(self.path)
+        except OSError as e:
+            print(f"Input manifest write skipped ({self.path}): {e}")
+        self.dirty = False
+
+
+def _candidates(d: Path) -> List[Path]:
+    return sorted(d.glob("*.xlsx"), key=lambda x: x.stat().st_mtime, reverse=True)
+
+
+def find_raw_poll_xlsx(data_dir: Path) -> Optional[Path]:
+    d = Path(data_dir)
+    candidates = _candidates(d)
+    manifest = InputManifest(d)
+    found = next((c for c in candidates if manifest.is_raw_poll(c)), None)
+    manifest.save(candidates)
+    return found
+
+
+def resolve_inputs(
+    input_xlsx: Optional[str],
+    mae_xlsx: Optional[str],
+    data_dir: str,
+    require_mae: bool = True,
+    require_input: bool = True,
+) -> Tuple[Optional[Path], Optional[Path]]:
     d = Path(data_dir)
     d.mkdir(parents=True, exist_ok=True)
     input_path = _normalize_path(d, input_xlsx)
     mae_path = _normalize_path(d, mae_xlsx)
 
-    candidates = sorted(d.glob("*.xlsx"), key=lambda x: x.stat().st_mtime, reverse=True)
+    candidates = _candidates(d)
+    manifest = InputManifest(d)
 
-    if input_path is None:
-        for c in candidates:
-            if _looks_like_raw_poll_xlsx(c):
-                input_path = c
-                break
+    try:
         if input_path is None:
-            raise FileNotFoundError(f"No raw polling workbook found in: {d}")
-
-    if mae_path is None:
-        for c in candidates:
-            if c == input_path:
-                continue
-            if _looks_like_mae_xlsx(c):
-                mae_path = c
-                break
+            for c in candidates:
+                if manifest.is_raw_poll(c):
+                    input_path = c
+                    break
+            if input_path is None and require_input:
+                raise FileNotFoundError(f"No raw polling workbook found in: {d}")
+
         if mae_path is None:
-            raise FileNotFoundError(f"No MAE workbook found in: {d}")
+            for c in candidates:
+                if c == input_path:
+                    continue
+                if manifest.is_mae(c):
+                    mae_path = c
+                    break
+            if mae_path is None and require_mae:
+                raise FileNotFoundError(f"No MAE workbook found in: {d}")
+    finally:
+        manifest.save(candidates)
 
-    if input_path == mae_path:
+    if input_path is not None and input_path == mae_path:
         raise ValueError(
             "Input and MAE paths resolved to the same file. "
             "Pass explicit --input-xlsx and --mae-xlsx values."
         )
     return input_path, mae_path
-
-
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import datetime as dt
+import hashlib
+import importlib.util
+import math
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+# Bump when a cached loader changes its output so old entries are not reused.
+CACHE_VERSION = 3
+CACHE_DIRNAME = ".parse_cache"
+# Companion column holding one type tag per cell of a mixed object column.
+TYPE_TAG_PREFIX = "__type__:"
+
+
+def sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        while True:
+            b = f.read(1024 * 1024)
+            if not b:
+                break
+            h.update(b)
+    return h.hexdigest()
+
+
+def _parquet_available() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def normalize_for_storage(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Make object columns single-typed so they round-trip through Parquet:
+    all-numeric columns become float, anything else becomes str (nulls kept).
+    """
+    out = df.reset_index(drop=True).copy()
+    for c in out.columns:
+        if out[c].dtype != object:
+            continue
+        s = out[c]
+        nonnull = s.dropna()
+        num = pd.to_numeric(nonnull, errors="coerce")
+        if len(nonnull) and num.notna().all() and not nonnull.map(lambda v: isinstance(v, str)).any():
+            out[c] = pd.to_numeric(s, errors="coerce").astype(float)
+        else:
+            out[c] = s.map(lambda v: v if pd.isna(v) else str(v)).astype(object)
+    return out
+
+
+def _cell_tag(v: object) -> str:
+    if v is None:
+        return "N"
+    if v is pd.NaT:
+        return "T"
+    if isinstance(v, str):
+        return "s"
+    if isinstance(v, (bool, np.bool_)):
+        return "b"
+    if isinstance(v, (int, np.integer)):
+        return "i"
+    if isinstance(v, (float, np.floating)):
+        return "n" if math.isnan(v) else "f"
+    if isinstance(v, (pd.Timestamp, dt.datetime)):
+        return "t"
+    if isinstance(v, dt.date):
+        return "d"
+    return "s"
+
+
+def _encode_cell(v: object, tag: str) -> Optional[str]:
+    if tag in ("N", "T", "n"):
+        return None
+    if tag == "f":
+        return repr(float(v))
+    if tag in ("t", "d"):
+        return v.isoformat()
+    return str(v)
+
+
+_DECODERS: dict = {
+    "N": lambda v: None,
+    "T": lambda v: pd.NaT,
+    "n": lambda v: np.nan,
+    "s": lambda v: v,
+    "b": lambda v: v == "True",
+    "i": int,
+    "f": float,
+    "t": pd.Timestamp,
+    "d": dt.date.fromisoformat,
+}
+
+
+def _encode_for_cache(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Parquet-safe copy of `df` that `_decode_from_cache` turns back into the
+    same frame. Object columns holding only strings (and nulls) are stored
+    as they are; any other object column is stored as text next to a
+    `TYPE_TAG_PREFIX` column with one type tag per cell.
+    """
+    out = df.reset_index(drop=True).copy()
+    for c in list(out.columns):
+        if out[c].dtype != object:
+            continue
+        tags = out[c].map(_cell_tag)
+        if tags.isin(["s", "N"]).all():
+            continue
+        out[c] = pd.Series([_encode_cell(v, t) for v, t in zip(out[c], tags)], dtype=object)
+        out[f"{TYPE_TAG_PREFIX}{c}"] = tags.astype(object)
+    return out
+
+
+def _decode_from_cache(df: pd.DataFrame) -> pd.DataFrame:
+    tagged = [c for c in df.columns if str(c).startswith(TYPE_TAG_PREFIX)]
+    for t in tagged:
+        c = t[len(TYPE_TAG_PREFIX):]
+        df[c] = pd.Series([_DECODERS[tag](v) for v, tag in zip(df[c], df[t])], index=df.index, dtype=object)
+    return df.drop(columns=tagged)
+
+
+def cache_path_for(xlsx_path: Path, namespace: str, digest: str, variant: str = "") -> Path:
+    key = hashlib.sha256(f"{namespace}|{variant}|v{CACHE_VERSION}|{digest}".encode("utf-8")).hexdigest()[:24]
+    return xlsx_path.parent / CACHE_DIRNAME / f"{namespace}-{key}.parquet"
+
+
+def _source_marker(xlsx_path: Path, variant: str) -> str:
+    return f"{xlsx_path.name}|{variant}"
+
+
+def _drop_stale(cache_file: Path, namespace: str, marker: str) -> None:
+    # One live entry per (namespace, source workbook, variant); older digests are removed.
+    prefix = f"{namespace}-"
+    for p in cache_file.parent.glob(f"{prefix}*.parquet"):
+        if p == cache_file:
+            continue
+        src = p.with_suffix(".source")
+        if src.exists() and src.read_text(encoding="utf-8").strip() == marker:
+            p.unlink(missing_ok=True)
+            src.unlink(missing_ok=True)
+
+
+def lookup_cached_frame(
+    xlsx_path: Path, namespace: str, variant: str = "", digest: Optional[str] = None
+) -> Optional[pd.DataFrame]:
+    """The cached frame for the workbook's current content, or None on a miss (`digest`: its sha256, if known)."""
+    xlsx_path = Path(xlsx_path)
+    if not _parquet_available() or not xlsx_path.exists():
+        return None
+    cache_file = cache_path_for(xlsx_path, namespace, digest or sha256(xlsx_path), variant)
+    if not cache_file.exists():
+        return None
+    try:
+        return _decode_from_cache(pd.read_parquet(cache_file))
+    except Exception:
+        cache_file.unlink(missing_ok=True)
+        return None
+
+
+def cached_frame(
+    xlsx_path: Path,
+    namespace: str,
+    build: Callable[[], pd.DataFrame],
+    variant: str = "",
+) -> pd.DataFrame:
+    """
+    Return `build()` for the workbook, reusing a Parquet copy keyed by the workbook sha256.
+    A changed workbook hashes to a new key, so stale entries are never read.
+    A hit has the same dtypes and cell types as the fresh `build()` result.
+    Falls back to calling `build()` directly when pyarrow is not installed.
+    """
+    xlsx_path = Path(xlsx_path)
+    if not _parquet_available() or not xlsx_path.exists():
+        return build()
+
+    digest = sha256(xlsx_path)
+    hit = lookup_cached_frame(xlsx_path, namespace, variant, digest)
+    if hit is not None:
+        return hit
+
+    cache_file = cache_path_for(xlsx_path, namespace, digest, variant)
+    df = build().reset_index(drop=True)
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache_file.with_suffix(".parquet.tmp")
+        _encode_for_cache(df).to_parquet(tmp, index=False)
+        tmp.replace(cache_file)
+        marker = _source_marker(xlsx_path, variant)
+        cache_file.with_suffix(".source").write_text(marker + "\n", encoding="utf-8")
+        _drop_stale(cache_file, namespace, marker)
+    except Exception as e:
+        print(f"Parse cache write skipped ({cache_file}): {e}")
+    return df
@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .history_loading import load_party_history
+from .parse_cache import normalize_for_storage, _parquet_available, sha256
+
+STORE_VERSION = 1
+KEY = "등록번호"
+# Bookkeeping columns of a stored row version; every other column is a poll value.
+META_COLS = ["__key", "__hash", "__known_from", "__effective", "__deleted", "__vintage"]
+_POSTED_NAME_RE = re.compile(r"^(\d{4}-\d{2}-\d{2})_ntt\d+_")
+
+
+def row_keys(df: pd.DataFrame, hashes: np.ndarray) -> np.ndarray:
+    """
+    Store key per row: the 등록번호, or for unnumbered rows the content hash
+    plus an occurrence count, so identical unnumbered rows stay distinct.
+    """
+    reg = pd.to_numeric(df[KEY], errors="coerce") if KEY in df.columns else pd.Series(np.nan, index=df.index)
+    h = pd.Series(hashes.astype(str), index=df.index)
+    occ = h.groupby(h, sort=False).cumcount().astype(str)
+    unkeyed = "h:" + h + ":" + occ
+    keyed = reg.map(lambda v: None if pd.isna(v) else str(int(v)))
+    return keyed.where(reg.notna(), unkeyed).to_numpy(dtype=object)
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """
+    Content hash per row over its non-null cells. A column that is null in a
+    row does not count, so a party column added in a later workbook leaves
+    the hashes of older rows unchanged.
+    """
+    total = np.zeros(len(df), dtype=np.uint64)
+    for c in df.columns:
+        s = df[c]
+        salt = np.uint64(int(hashlib.sha256(str(c).encode("utf-8")).hexdigest()[:16], 16) | 1)
+        vals = pd.util.hash_array(s.astype(str).to_numpy(dtype=object))
+        with np.errstate(over="ignore"):
+            total += np.where(s.notna().to_numpy(), (vals ^ salt) * salt, np.uint64(0))
+    return total
+
+
+class PollStore:
+    """
+    Append-only bitemporal store of raw poll rows under `root`.
+
+    Each ingest is one vintage: the parsed rows of a NESDC workbook as first
+    seen on its posted date (`known_from`). Only rows that are new or changed
+    since the previous vintage are appended as row versions, and rows that
+    disappeared get a tombstone; nothing is rewritten. Row versions carry the
+    poll's effective date (`date_end`) next to `known_from`.
+
+    Segments are written in `known_from` order, so the row versions form one
+    array sorted by transaction time: `as_of(X)` takes the prefix known by X
+    with a binary search, keeps the last version per key, and lays the rows
+    out in the key order of the vintage's own workbook. The result is the
+    frame the pipeline parsed from that workbook. Needs pyarrow.
+    """
+
+    def __init__(self, root: Path):
+        if not _parquet_available():
+            raise RuntimeError("The poll store needs pyarrow for its Parquet segments.")
+        self.root = Path(root)
+        self.meta: dict = {"version": STORE_VERSION, "vintages": []}
+        meta = self.root / "store.json"
+        if meta.exists():
+            self.meta = json.loads(meta.read_text(encoding="utf-8"))
+            if self.meta.get("version") != STORE_VERSION:
+                raise ValueError(f"Poll store version {self.meta.get('version')} != {STORE_VERSION}: {self.root}")
+        self._versions: Optional[pd.DataFrame] = None
+
+    @property
+    def vintages(self) -> List[dict]:
+        return list(self.meta["vintages"])
+
+    def known_dates(self) -> List[pd.Timestamp]:
+        return [pd.Timestamp(v["known_from"]) for v in self.meta["vintages"]]
+
+    def _segment(self, seq: int, kind: str) -> Path:
+        return self.root / "segments" / f"{seq:06d}.{kind}.parquet"
+
+    def versions(self) -> pd.DataFrame:
+        """Every stored row version in transaction-time order (cached after the first read)."""
+        if self._versions is None:
+            parts = [pd.read_parquet(self._segment(v["seq"], "rows")) for v in self.meta["vintages"]]
+            parts = [p for p in parts if len(p)]
+            self._versions = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=META_COLS)
+        return self._versions
+
+    def _vintage_at(self, known_at: pd.Timestamp) -> Optional[int]:
+        dates = np.array([np.datetime64(d, "ns") for d in self.known_dates()], dtype="datetime64[ns]")
+        i = int(np.searchsorted(dates, np.datetime64(pd.Timestamp(known_at), "ns"), side="right")) - 1
+        return None if i < 0 else i
+
+    def vintage_at(self, known_at) -> Optional[dict]:
+        """The latest vintage first seen on or before `known_at`, or None."""
+        i = self._vintage_at(pd.Timestamp(known_at))
+        return None if i is None else self.meta["vintages"][i]
+
+    def as_of(self, known_at, effective_until=None) -> pd.DataFrame:
+        """
+        Poll rows as published on `known_at`, in their workbook order; with
+        `effective_until`, only polls whose `date_end` is on or before it.
+        """
+        i = self._vintage_at(pd.Timestamp(known_at))
+        if i is None:
+            raise ValueError(f"No vintage known on {pd.Timestamp(known_at).date()} in {self.root}")
+        vint = self.meta["vintages"][i]
+        versions = self.versions()
+        n = int(np.searchsorted(versions["__vintage"].to_numpy(), i, side="right"))
+        prefix = versions.iloc[:n]
+        last = prefix.drop_duplicates("__key", keep="last").set_index("__key")
+        order = pd.read_parquet(self._segment(vint["seq"], "order"))["__key"]
+        rows = last.loc[order.to_numpy()]
+        out = rows[vint["columns"]].reset_index(drop=True)
+        if effective_until is not None:
+            out = out[~(out["date_end"] > pd.Timestamp(effective_until))].reset_index(drop=True)
+        return out
+
+    def first_seen(self) -> pd.DataFrame:
+        """Per key: the 등록번호, effective date and the vintage date it first appeared in."""
+        v = self.versions()
+        first = v[~v["__deleted"].astype(bool)].drop_duplicates("__key", keep="first")
+        return pd.DataFrame(
+            {
+                "key": first["__key"].to_numpy(),
+                KEY: first[KEY].to_numpy() if KEY in first.columns else np.nan,
+                "effective": first["__effective"].to_numpy(),
+                "first_seen": first["__known_from"].to_numpy(),
+            }
+        )
+
+    def ingest(self, df: pd.DataFrame, known_from, source: str = "", source_sha256: str = "") -> dict:
+        """
+        Append the workbook rows `df` as the vintage first seen on `known_from`.
+        A workbook already stored (same sha256) is skipped; vintages must be
+        ingested in posted-date order. Returns counts of the appended versions.
+        """
+        known_from = pd.Timestamp(known_from).normalize()
+        if source_sha256 and any(v["source_sha256"] == source_sha256 for v in self.meta["vintages"]):
+            return {"known_from": str(known_from.date()), "source": source, "skipped": "already stored"}
+        dates = self.known_dates()
+        if dates and known_from < dates[-1]:
+            raise ValueError(
+                f"Append-only store: vintage {known_from.date()} is older than the latest {dates[-1].date()}"
+            )
+
+        cur = normalize_for_storage(df)
+        hashes = row_hashes(cur)
+        keys = row_keys(cur, hashes)
+        # A repeated 등록번호 keeps its last row, as in diff_poll_rows.
+        last = ~pd.Series(keys).duplicated(keep="last").to_numpy()
+        cur, hashes, keys = cur[last].reset_index(drop=True), hashes[last], keys[last]
+
+        versions = self.versions()
+        live = versions.drop_duplicates("__key", keep="last")
+        live = live[~live["__deleted"].astype(bool)]
+        prev_hash = dict(zip(live["__key"], live["__hash"]))
+        is_new = np.array([k not in prev_hash for k in keys], dtype=bool)
+        changed = np.array([k in prev_hash and prev_hash[k] != h for k, h in zip(keys, hashes)], dtype=bool)
+        removed = sorted(set(prev_hash) - set(keys))
+
+        seq = len(self.meta["vintages"])
+        add = cur[is_new | changed].copy()
+        add["__key"] = keys[is_new | changed]
+        add["__hash"] = hashes[is_new | changed]
+        add["__deleted"] = False
+        tomb = pd.DataFrame({"__key": removed, "__hash": np.zeros(len(removed), dtype=np.uint64), "__deleted": True})
+        if removed:
+            gone = live.set_index("__key").loc[removed]
+            tomb[KEY] = gone[KEY].to_numpy() if KEY in gone.columns else np.nan
+            tomb["date_end"] = gone["date_end"].to_numpy()
+        seg = pd.concat([add, tomb], ignore_index=True) if len(tomb) else add
+        seg["__known_from"] = known_from
+        seg["__effective"] = pd.to_datetime(seg["date_end"]) if "date_end" in seg.columns else pd.NaT
+        seg["__vintage"] = seq
+        seg["__deleted"] = seg["__deleted"].astype(bool)
+        seg["__hash"] = seg["__hash"].astype(np.uint64)
+
+        (self.root / "segments").mkdir(parents=True, exist_ok=True)
+        for kind, frame in (("rows", seg), ("order", pd.DataFrame({"__key": keys.astype(str)}))):
+            tmp = self._segment(seq, kind).with_suffix(".tmp")
+            frame.to_parquet(tmp, index=False)
+            tmp.replace(self._segment(seq, kind))
+        info = {
+            "seq": seq,
+            "known_from": str(known_from.date()),
+            "source": source,
+            "source_sha256": source_sha256,
+            "columns": [str(c) for c in cur.columns],
+            "rows": int(len(cur)),
+            "added": int(is_new.sum()),
+            "modified": int(changed.sum()),
+            "removed": len(removed),
+        }
+        self.meta["vintages"].append(info)
+        self._write_meta()
+        self._versions = None
+        return info
+
+    def _write_meta(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / "store.json.tmp"
+        tmp.write_text(json.dumps(self.meta, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        tmp.replace(self.root / "store.json")
+
+
+def posted_date_from_name(path: Path) -> Optional[pd.Timestamp]:
+    """Posted date of a `fetch_nesdc_weekly.py` download, named '<YYYY-MM-DD>_ntt<id>_<file>'."""
+    m = _POSTED_NAME_RE.match(Path(path).name)
+    return pd.Timestamp(m.group(1)) if m else None
+
+
+def manifest_workbooks(manifest: Path, base: Path = Path(".")) -> List[tuple[pd.Timestamp, Path]]:
+    """(posted date, xlsx path) of the manifest attachments that exist, oldest post first."""
+    df = pd.read_csv(manifest)
+    df = df[df["is_xlsx"] == True].copy()
+    df["posted_date"] = pd.to_datetime(df["posted_date"], errors="coerce")
+    df = df[df["posted_date"].notna()].sort_values(["posted_date", "ntt_id"], kind="mergesort")
+    out = []
+    for d, p in zip(df["posted_date"], df["local_path"]):
+        path = Path(str(p))
+        path = path if path.is_absolute() else Path(base) / path
+        if path.exists():
+            out.append((pd.Timestamp(d), path))
+    return out
+
+
+def archive_dated_workbooks(archive_dir: Path) -> List[tuple[pd.Timestamp, Path]]:
+    """(posted date, xlsx path) of downloads in `archive_dir` whose name carries the posted date."""
+    found = []
+    for p in sorted(Path(archive_dir).glob("*.xlsx")):
+        d = posted_date_from_name(p)
+        if d is not None and not p.name.startswith("~$"):
+            found.append((d, p))
+    return sorted(found, key=lambda t: (t[0], t[1].name))
+
+
+def ingest_workbooks(
+    store: PollStore,
+    workbooks: Sequence[tuple[pd.Timestamp, Path]],
+    sheets: Optional[Sequence[str]] = None,
+    jobs: Optional[int] = None,
+) -> List[dict]:
+    """Ingest (posted date, workbook) pairs in date order; parses go through the parse cache."""
+    out = []
+    for posted, path in sorted(workbooks, key=lambda t: t[0]):
+        digest = sha256(path)
+        if any(v["source_sha256"] == digest for v in store.vintages):
+            out.append({"known_from": str(pd.Timestamp(posted).date()), "source": path.name, "skipped": "already stored"})
+            continue
+        df = load_party_history([path], sheets=sheets, jobs=jobs)
+        out.append(store.ingest(df, posted, source=path.name, source_sha256=digest))
+    return out
+
+
+def store_summary(store: PollStore) -> pd.DataFrame:
+    cols = ["seq", "known_from", "source", "rows", "added", "modified", "removed"]
+    return pd.DataFrame([{c: v.get(c) for c in cols} for v in store.vintages], columns=cols)
+
+
+def vintage_dates(store: PollStore, spec: str) -> List[str]:
+    """'all' -> every vintage date; otherwise a comma list of dates, resolved to the vintage in force."""
+    if spec == "all":
+        return [v["known_from"] for v in store.vintages]
+    out: Dict[str, None] = {}
+    for d in spec.split(","):
+        d = d.strip()
+        if not d:
+            continue
+        v = store.vintage_at(d)
+        if v is None:
+            raise ValueError(f"No vintage known on {d} in {store.root}")
+        out[str(pd.Timestamp(d).date())] = None
+    return list(out)
@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .poll_store import row_hashes
+from .sheet_loading import get_party_cols
+from .weights import weights_from_mae
+
+ACCURACY_VERSION = 2
+WEIGHTS_COLUMNS = ["조사기관", "mae", "weight", "weight_pct"]
+DEFAULT_STATE = "outputs/pollster_accuracy.json"
+# Written by weekly_run.py, read by `--pollster-weights optimized`.
+OPTIMIZED_WEIGHTS = "optimized_weights.csv"
+SEED_OBS = 30.0  # residual cells the workbook MAE counts as, before decay
+
+
+def leave_one_out_residuals(polls: pd.DataFrame, weights: Dict[str, float], party_cols: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Per poll and party: the poll's value minus the weighted mean of the other
+    pollsters' polls on the same date_end, with the blend's pollster weights.
+    A poll is never scored against a consensus that contains its own
+    pollster. NaN where no other pollster has a value that day. Indexed like
+    the polls with a date_end.
+    """
+    rows = polls[polls["date_end"].notna()]
+    party_cols = party_cols if party_cols is not None else get_party_cols(rows)
+    vals = rows[party_cols].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+    valid = ~np.isnan(vals)
+    w = rows["조사기관"].map(weights).fillna(0.0).to_numpy(dtype=float)[:, None] * valid
+    wdf = pd.DataFrame(w, index=rows.index)
+    vdf = pd.DataFrame(w * np.where(valid, vals, 0.0), index=rows.index)
+    by_date = rows["date_end"]
+    by_own = [rows["date_end"], rows["조사기관"]]
+    other_w = (wdf.groupby(by_date).transform("sum") - wdf.groupby(by_own).transform("sum")).to_numpy()
+    other_v = (vdf.groupby(by_date).transform("sum") - vdf.groupby(by_own).transform("sum")).to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        consensus = np.where(other_w > 1e-12, other_v / other_w, np.nan)
+    return pd.DataFrame(vals - consensus, index=rows.index, columns=party_cols)
+
+
+class PollsterAccuracy:
+    """
+    Time-decayed MAE per pollster of poll values against the other pollsters.
+
+    Each pollster starts from the accuracy-workbook MAE, worth `seed_obs`
+    residual cells. Every (poll, party) leave-one-out residual (see
+    `leave_one_out_residuals`) then adds |residual| with weight
+    0.5 ** (age_days / half_life_days), ages measured from the newest poll
+    seen; older sums decay as that reference date moves forward. Each poll's
+    contribution is kept by 등록번호 with its row content hash, so a revised
+    or removed row is taken back out, and an update refolds only the dates
+    whose rows changed. Weight = 1/MAE, normalized, as with the static workbook.
+    """
+
+    def __init__(self, half_life_days: float, pollsters: Dict[str, dict], reference_date: Optional[str] = None, polls: Optional[Dict[str, dict]] = None, seed_source: str = ""):
+        self.half_life_days = float(half_life_days)
+        self.pollsters = pollsters
+        self.reference_date = reference_date
+        self.polls = dict(polls or {})
+        self.seed_source = seed_source
+
+    @classmethod
+    def seed(cls, mae: Dict[str, float], half_life_days: float, seed_obs: float = SEED_OBS, source: str = "") -> "PollsterAccuracy":
+        pollsters = {
+            str(p): {"seed_mae": float(m), "seed_weight": float(seed_obs), "abs_sum": 0.0, "weight_sum": 0.0, "n": 0}
+            for p, m in mae.items()
+        }
+        return cls(half_life_days, pollsters, seed_source=source)
+
+    @classmethod
+    def load(cls, path: Path, half_life_days: float) -> Optional["PollsterAccuracy"]:
+        """Saved state, or None when missing, unreadable or built with another half-life."""
+        path = Path(path)
+        if not path.exists():
+            return None
+        try:
+            d = json.loads(path.read_text(encoding="utf-8"))
+        except Exception:
+            return None
+        return cls.from_payload(d, half_life_days)
+
+    @classmethod
+    def from_payload(cls, d: dict, half_life_days: Optional[float] = None) -> Optional["PollsterAccuracy"]:
+        """State from a parsed state file; None when built by another version or half-life (None: any)."""
+        if d.get("version") != ACCURACY_VERSION:
+            return None
+        saved = float(d.get("half_life_days", -1))
+        if half_life_days is not None and saved != float(half_life_days):
+            return None
+        try:
+            return cls(saved, d["pollsters"], d.get("reference_date"), d.get("polls"), d.get("seed_source", ""))
+        except KeyError:
+            return None
+
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "version": ACCURACY_VERSION,
+            "half_life_days": self.half_life_days,
+            "seed_source": self.seed_source,
+            "reference_date": self.reference_date,
+            "pollsters": self.pollsters,
+            "polls": self.polls,
+        }
+        tmp = path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(payload, ensure_ascii=False) + "\n", encoding="utf-8")
+        tmp.replace(path)
+
+    def mae(self) -> Dict[str, float]:
+        out = {}
+        for p, s in self.pollsters.items():
+            if s["weight_sum"] <= 0:
+                out[p] = s["seed_mae"]
+            else:
+                out[p] = (s["seed_weight"] * s["seed_mae"] + s["abs_sum"]) / (s["seed_weight"] + s["weight_sum"])
+        return out
+
+    def weights(self) -> Dict[str, float]:
+        return weights_from_mae(self.mae())
+
+    def table(self) -> pd.DataFrame:
+        mae = self.mae()
+        weights = weights_from_mae(mae)
+        out = pd.DataFrame({"조사기관": list(mae), "mae": list(mae.values())})
+        out["weight"] = out["조사기관"].map(weights).fillna(0.0)
+        out["weight_pct"] = out["weight"] * 100.0
+        return out.sort_values("weight", ascending=False).reset_index(drop=True)
+
+    def _decay(self, days: np.ndarray) -> np.ndarray:
+        return 0.5 ** (np.asarray(days, dtype=float) / self.half_life_days)
+
+    def _add(self, entry: dict, ref: pd.Timestamp, sign: float) -> None:
+        s = self.pollsters[entry["pollster"]]
+        w = float(self._decay((ref - pd.Timestamp(entry["date"])).days))
+        s["abs_sum"] = max(0.0, s["abs_sum"] + sign * w * entry["abs"])
+        s["weight_sum"] = max(0.0, s["weight_sum"] + sign * w * entry["cells"])
+        s["n"] = max(0, s["n"] + int(sign) * entry["cells"])
+
+    def update(self, polls: pd.DataFrame, weights: Dict[str, float]) -> int:
+        """
+        Fold the leave-one-out residuals of new and revised polls, scored with
+        the blend `weights`. A date that gained, lost or changed a row has all
+        its polls refolded, as their consensus moved. Returns the polls folded.
+        """
+        polls = polls.reset_index(drop=True)
+        rows = polls[
+            polls["조사기관"].isin(list(self.pollsters))
+            & polls["등록번호"].notna()
+            & polls["date_end"].notna()
+        ]
+        rows = rows[~rows["등록번호"].astype(int).duplicated(keep="last")]
+        keys = rows["등록번호"].astype(int).astype(str).to_numpy()
+        hashes = np.char.mod("%016x", row_hashes(rows)) if len(rows) else np.array([], dtype=str)
+        dates = pd.DatetimeIndex(rows["date_end"])
+
+        fresh = np.array([self.polls.get(k, {}).get("hash") != h for k, h in zip(keys, hashes)], dtype=bool)
+        removed = set(self.polls) - set(keys)
+        dirty = set(dates[fresh]) | {pd.Timestamp(self.polls[k]["date"]) for k in removed}
+        dirty |= {pd.Timestamp(self.polls[k]["date"]) for k in keys[fresh] if k in self.polls}
+        refold = dates.isin(list(dirty))
+        if not refold.any() and not removed:
+            return 0
+
+        ref_old = None if self.reference_date is None else pd.Timestamp(self.reference_date)
+        ref = dates[refold].max() if refold.any() else ref_old
+        if ref_old is not None:
+            ref = max(ref, ref_old)
+            shift = float(self._decay((ref - ref_old).days))
+            for s in self.pollsters.values():
+                s["seed_weight"] *= shift
+                s["abs_sum"] *= shift
+                s["weight_sum"] *= shift
+
+        for k in list(removed) + [k for k in keys[refold] if k in self.polls]:
+            self._add(self.polls.pop(k), ref, -1.0)
+
+        scored = polls[polls["date_end"].isin(list(dirty)) & polls["조사기관"].isin(list(weights))]
+        resid = leave_one_out_residuals(scored, weights).reindex(rows.index[refold])
+        abs_resid = resid.abs().to_numpy(dtype=float)
+        valid = ~np.isnan(abs_resid)
+        abs_sum = np.where(valid, abs_resid, 0.0).sum(axis=1)
+        cells = valid.sum(axis=1)
+        for k, h, p, d, a, c in zip(
+            keys[refold], hashes[refold], rows["조사기관"].astype(str).to_numpy()[refold], dates[refold], abs_sum, cells
+        ):
+            entry = {"hash": str(h), "pollster": p, "date": str(d.date()), "abs": float(a), "cells": int(c)}
+            self.polls[k] = entry
+            self._add(entry, ref, 1.0)
+        self.reference_date = str(ref.date())
+        return int(refold.sum())
+
+
+def read_optimized_weights(path: Path) -> Optional[pd.DataFrame]:
+    """The weekly optimizer's weights table, or None when missing or malformed."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    w = pd.read_csv(path, float_precision="round_trip")
+    if not set(WEIGHTS_COLUMNS).issubset(w.columns) or w.empty:
+        return None
+    return w[WEIGHTS_COLUMNS].sort_values("weight", ascending=False).reset_index(drop=True)
+
+
+def read_weights_table(outputs: Path, state_path: Optional[Path] = None) -> pd.DataFrame:
+    """
+    The shared pollster-weights artifact: `weights.csv` as written by the
+    pipeline, else the table derived from the accuracy state, else empty.
+    """
+    outputs = Path(outputs)
+    weights_csv = outputs / "weights.csv"
+    if weights_csv.exists():
+        w = pd.read_csv(weights_csv, float_precision="round_trip")
+        if set(WEIGHTS_COLUMNS).issubset(w.columns):
+            return w.sort_values("weight", ascending=False).reset_index(drop=True)
+    state_path = Path(state_path) if state_path is not None else outputs / Path(DEFAULT_STATE).name
+    if state_path.exists():
+        try:
+            acc = PollsterAccuracy.from_payload(json.loads(state_path.read_text(encoding="utf-8")))
+        except Exception:
+            acc = None
+        if acc is not None:
+            return acc.table()
+    return pd.DataFrame(columns=WEIGHTS_COLUMNS)
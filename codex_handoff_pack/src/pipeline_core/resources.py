@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import sys
+from typing import Optional
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MiB, or None where `resource` is unavailable."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and KiB on Linux.
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+
+def current_rss_mb() -> Optional[float]:
+    """Current resident set size in MiB (Linux /proc only), or None."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    import os
+
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024.0 * 1024.0)
+
+
+def format_peak_rss() -> str:
+    mb = peak_rss_mb()
+    return "Peak RSS: n/a" if mb is None else f"Peak RSS: {mb:.1f} MiB"
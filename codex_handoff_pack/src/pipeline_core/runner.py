@@ -1,32 +1,132 @@
 from __future__ import annotations
 
 from pathlib import Path
+from typing import Optional
 
 import pandas as pd
 
 from .blending import apply_time_varying_house_effect, blend_time_series
 from .config import PipelineConfig
+from .change_detection import (
+    PipelineSnapshot,
+    blend_fingerprint,
+    diff_poll_rows,
+    frame_sha256,
+    reblend,
+    series_changes,
+    write_change_report,
+)
 from .constants import SHEETS
+from .history_loading import history_workbooks, load_party_history
 from .input_resolution import resolve_inputs
-from .sheet_loading import load_sheet
-from .weights import build_weights_table, compute_weights_from_mae
-def run_pipeline(cfg: PipelineConfig) -> tuple[Path, Path]:
+from .parse_cache import normalize_for_storage, sha256
+from .poll_store import PollStore
+from .pollster_accuracy import OPTIMIZED_WEIGHTS, PollsterAccuracy, read_optimized_weights
+from .resources import format_peak_rss
+from .sheet_loading import get_party_cols
+from .weights import load_mae_seed
+def load_accuracy(cfg: PipelineConfig, mae_xlsx: Optional[Path]) -> Optional[PollsterAccuracy]:
+    """Rolling accuracy state, or a fresh one seeded from the MAE workbook (None: optimized weights only)."""
+    if cfg.pollster_weights == "optimized" and mae_xlsx is None:
+        return None
+    if cfg.pollster_weights == "rolling":
+        accuracy = PollsterAccuracy.load(Path(cfg.accuracy_state), cfg.accuracy_half_life)
+        if accuracy is not None:
+            return accuracy
+    if mae_xlsx is None:
+        raise SystemExit("No pollster-accuracy state and no MAE workbook to seed it from. Pass --mae-xlsx.")
+    return PollsterAccuracy.seed(load_mae_seed(mae_xlsx), cfg.accuracy_half_life, source=mae_xlsx.name)
+
+
+def load_vintage(cfg: PipelineConfig) -> tuple[dict, pd.DataFrame]:
+    """The `--poll-store` vintage in force on `cfg.as_of` and its rows: (vintage info, df)."""
+    if not cfg.poll_store:
+        raise SystemExit("--as-of replays a vintage of --poll-store; pass the store directory.")
+    store = PollStore(Path(cfg.poll_store))
+    vintage = store.vintage_at(cfg.as_of)
+    if vintage is None:
+        raise SystemExit(f"No vintage of {cfg.poll_store} was known on {cfg.as_of}.")
+    print(f"Replaying vintage:    {vintage['known_from']} ({vintage['source']}) as of {cfg.as_of}")
+    return vintage, store.as_of(cfg.as_of)
+
+
+def load_inputs(cfg: PipelineConfig) -> tuple[Path, str, pd.DataFrame, Optional[PollsterAccuracy]]:
+    """
+    Resolve and parse the poll history and the pollster accuracy:
+    (xlsx, xlsx sha256, df, accuracy). With `cfg.as_of` the rows come from the
+    `--poll-store` vintage instead, xlsx is the workbook that vintage was
+    ingested from, and no raw workbook under data/ is needed.
+    """
+    have_state = (cfg.pollster_weights == "rolling" and Path(cfg.accuracy_state).exists()) or (
+        cfg.pollster_weights == "optimized" and (Path(cfg.out).parent / OPTIMIZED_WEIGHTS).exists()
+    )
     try:
-        xlsx, mae_xlsx = resolve_inputs(cfg.input_xlsx, cfg.mae_xlsx, cfg.data_dir)
+        xlsx, mae_xlsx = resolve_inputs(
+            cfg.input_xlsx,
+            cfg.mae_xlsx,
+            cfg.data_dir,
+            require_mae=not have_state,
+            require_input=not cfg.as_of,
+        )
     except Exception as e:
         raise SystemExit(
             "Input resolution failed. Place two .xlsx files under data/ or pass --input-xlsx and --mae-xlsx.\n"
             f"Detail: {e}"
         )
-    print(f"Using input workbook: {xlsx}")
-    print(f"Using MAE workbook:   {mae_xlsx}")
+    if cfg.as_of:
+        vintage, df = load_vintage(cfg)
+        xlsx, input_sha = Path(cfg.poll_store) / vintage["source"], vintage["source_sha256"]
+    else:
+        print(f"Using input workbook: {xlsx}")
+        input_sha = sha256(xlsx)
+    accuracy = load_accuracy(cfg, mae_xlsx)
+    if accuracy is not None and accuracy.reference_date is None:
+        print(f"Using MAE workbook:   {mae_xlsx}")
+    elif accuracy is not None:
+        print(f"Pollster accuracy:    {cfg.accuracy_state} (through {accuracy.reference_date})")
+    if cfg.as_of:
+        return xlsx, input_sha, df, accuracy
+
+    workbooks = history_workbooks(xlsx, Path(cfg.archive_dir) if cfg.archive_dir else None)
+    if len(workbooks) > 1:
+        print(f"Archived workbooks: {len(workbooks) - 1} under {cfg.archive_dir}")
+    df = load_party_history(
+        workbooks,
+        sheets=None if cfg.sheets == "all" else SHEETS,
+        jobs=cfg.load_jobs or None,
+    )
+    return xlsx, input_sha, df, accuracy
+
 
-    df = pd.concat([load_sheet(xlsx, s) for s in SHEETS], ignore_index=True)
-    weights = compute_weights_from_mae(mae_xlsx)
+def select_weights(cfg: PipelineConfig, accuracy: Optional[PollsterAccuracy]) -> pd.DataFrame:
+    """The weights table to blend with: the optimizer's when asked for and present, else the accuracy table."""
+    if cfg.pollster_weights == "optimized":
+        path = Path(cfg.out).parent / OPTIMIZED_WEIGHTS
+        table = read_optimized_weights(path)
+        if table is not None:
+            print(f"Using optimized weights: {path}")
+            return table
+        print(f"No optimized weights at {path}; using the MAE workbook weights.")
+    if accuracy is None:
+        raise SystemExit("No usable optimized weights and no MAE workbook. Pass --mae-xlsx.")
+    return accuracy.table()
+
+
+def run_pipeline(cfg: PipelineConfig) -> tuple[Path, Path]:
+    xlsx, input_sha, df, accuracy = load_inputs(cfg)
+    weights_df = select_weights(cfg, accuracy)
+    weights = dict(zip(weights_df["조사기관"], weights_df["weight"].astype(float)))
     use_sample_w = cfg.sample_size_weight == "on"
+    out = Path(cfg.out)
+    snapshot = PipelineSnapshot(out.parent)
+    prev_rows = snapshot.frame("rows")
+    row_diff = diff_poll_rows(prev_rows, df) if prev_rows is not None else None
+
     house_diag_df = pd.DataFrame()
+    blend_src = df
     if cfg.house_effect == "on":
-        df_adj, house_diag_df = apply_time_varying_house_effect(
+        # One vectorized pass over the whole history (tens of ms); not checkpointed.
+        blend_src, house_diag_df = apply_time_varying_house_effect(
             df=df,
             weights=weights,
             ewma_lambda=cfg.house_lambda,
@@ -35,22 +135,47 @@ def run_pipeline(cfg: PipelineConfig) -> tuple[Path, Path]:
             sample_size_weight=use_sample_w,
             sample_eps=cfg.sample_eps,
         )
-        blended = blend_time_series(
-            df_adj,
-            weights,
-            sample_size_weight=use_sample_w,
-            sample_eps=cfg.sample_eps,
-        )
-    else:
-        blended = blend_time_series(
-            df,
-            weights,
-            sample_size_weight=use_sample_w,
-            sample_eps=cfg.sample_eps,
-        )
-    weights_df = build_weights_table(mae_xlsx, weights)
 
-    out = Path(cfg.out)
+    # Rolling and optimized weights move between runs; dates already published keep
+    # the weights they were blended with, and only dates whose rows changed are re-blended.
+    frozen = cfg.pollster_weights in ("rolling", "optimized") and not cfg.as_of
+    fingerprint = blend_fingerprint(weights, get_party_cols(blend_src), use_sample_w, cfg.sample_eps, frozen=frozen)
+    blended, blend_input, blend_mode, dirty_dates = reblend(
+        blend_src,
+        lambda d: blend_time_series(d, weights, sample_size_weight=use_sample_w, sample_eps=cfg.sample_eps),
+        snapshot,
+        fingerprint,
+        partial=cfg.incremental == "on" or frozen,
+        frozen_dirty=(row_diff.affected_dates if row_diff is not None else None) if frozen else None,
+    )
+    print(f"Blend: {blend_mode}")
+    changed, first_changed = series_changes(snapshot.frame("blended"), blended)
+
+    blended_sha = frame_sha256(blended)
+    report = {
+        "input": xlsx.name,
+        "input_sha256": input_sha,
+        "as_of": cfg.as_of,
+        "previous_input_sha256": snapshot.meta.get("input_sha256"),
+        "baseline": row_diff is None,
+        "rows": None
+        if row_diff is None
+        else {
+            "added": row_diff.added,
+            "modified": row_diff.modified,
+            "removed": row_diff.removed,
+            "unkeyed": row_diff.unkeyed_rows,
+            "affected_dates": [str(d.date()) for d in row_diff.affected_dates],
+            "columns_added": row_diff.columns_added,
+            "columns_removed": row_diff.columns_removed,
+        },
+        "house_effect": cfg.house_effect,
+        "blend": blend_mode,
+        "reblended_dates": [str(pd.Timestamp(d).date()) for d in dirty_dates],
+        "series_changed": changed,
+        "first_changed_date": None if first_changed is None else str(pd.Timestamp(first_changed).date()),
+        "blended_sha256": blended_sha,
+    }
     out.parent.mkdir(parents=True, exist_ok=True)
     with pd.ExcelWriter(out, engine="openpyxl") as writer:
         blended.to_excel(writer, sheet_name="weighted_time_series", index=False)
@@ -63,8 +188,27 @@ def run_pipeline(cfg: PipelineConfig) -> tuple[Path, Path]:
         house_out.parent.mkdir(parents=True, exist_ok=True)
         house_diag_df.to_csv(house_out, index=False)
         print("Wrote:", house_out)
+
+    # Report and snapshot only once every output is on disk: a run that dies
+    # earlier leaves the previous snapshot, so the next run diffs against it.
+    changes_out = Path(cfg.changes_out)
+    write_change_report(changes_out, report)
+    if row_diff is not None:
+        print(f"Rows vs previous run: +{len(row_diff.added)} ~{len(row_diff.modified)} -{len(row_diff.removed)}")
+    print(f"Series changed: {changed}" + (f" (from {report['first_changed_date']})" if changed and first_changed is not None else ""))
+    if cfg.pollster_weights == "rolling" and not cfg.as_of:
+        # Leave-one-out residuals of new or revised polls feed the weights of the next run.
+        n_new = accuracy.update(df, weights)
+        accuracy.save(Path(cfg.accuracy_state))
+        print(f"Pollster accuracy: +{n_new} polls (through {accuracy.reference_date})")
+    snapshot.save(
+        {"input": xlsx.name, "input_sha256": input_sha, "blend_fingerprint": fingerprint, "blended_sha256": blended_sha},
+        {"rows": normalize_for_storage(df), "blend_input": blend_input, "blended": blended},
+    )
     print("Wrote:", out)
     print("Wrote:", weights_csv)
+    print("Wrote:", changes_out)
+    print(format_peak_rss())
     return out, weights_csv
 
 
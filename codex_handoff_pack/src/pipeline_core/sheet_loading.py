@@ -3,12 +3,13 @@ from __future__ import annotations
 import re
 from datetime import datetime
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Sequence, Tuple
 
 import numpy as np
 import pandas as pd
 
-from .constants import BASE_COLS
+from .constants import BASE_COLS, SHEETS
+from .parse_cache import cached_frame
 def parse_range(s: str) -> Tuple[pd.Timestamp, pd.Timestamp]:
     """
     Parse '조사일자' like:
@@ -51,6 +52,59 @@ def parse_range(s: str) -> Tuple[pd.Timestamp, pd.Timestamp]:
     return (a_dt, b_dt)
 
 
+_DAY_ONLY_RE = r"^\d{1,2}\.?$"
+# Same fields strptime("20" + token, "%Y.%m.%d") accepts after rstrip(".").
+_FULL_DATE_RE = r"^(\d{2})\.(1[0-2]|0[1-9]|[1-9])\.(3[01]|[12]\d|0[1-9]|[1-9])$"
+
+
+def _full_dates(tokens: pd.Series) -> pd.Series:
+    parts = tokens.str.rstrip(".").str.extract(_FULL_DATE_RE)
+    ymd = pd.DataFrame(
+        {
+            "year": 2000 + pd.to_numeric(parts[0], errors="coerce"),
+            "month": pd.to_numeric(parts[1], errors="coerce"),
+            "day": pd.to_numeric(parts[2], errors="coerce"),
+        },
+        index=tokens.index,
+    )
+    # Invalid calendar dates (e.g. 02.30) coerce to NaT like the strptime failure path.
+    return pd.to_datetime(ymd, errors="coerce")
+
+
+def _parse_range_text(text: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    text = text.str.strip().str.replace(" ", "", regex=False)
+    a = text.str.extract(r"^([^~/]*)", expand=False).fillna("").str.strip()
+    b = text.str.extract(r"([^~/]*)$", expand=False).fillna("").str.strip()
+
+    a_day_only = a.str.match(_DAY_ONLY_RE)
+    start = _full_dates(a).where(~a_day_only & (a != ""), pd.NaT)
+
+    b_day_only = b.str.match(_DAY_ONLY_RE)
+    end_full = _full_dates(b)
+    day = pd.to_numeric(b.str.rstrip("."), errors="coerce").where(b_day_only)
+    end_day = pd.to_datetime(
+        pd.DataFrame({"year": start.dt.year, "month": start.dt.month, "day": day}, index=text.index),
+        errors="coerce",
+    )
+    end = end_full.where(~b_day_only, end_day).where(b != "", pd.NaT)
+    return start, end
+
+
+def parse_range_series(values: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """
+    Column-wise equivalent of `parse_range`: returns (start, end) datetime Series.
+    Only distinct strings are parsed, then broadcast back to the rows.
+    An end day that does not exist in the start month yields NaT instead of raising.
+    """
+    codes, uniques = pd.factorize(values)
+    start_u, end_u = _parse_range_text(pd.Series(uniques, dtype=object).astype(str))
+    nat = np.array([np.datetime64("NaT")], dtype="datetime64[ns]")
+    # factorize marks nulls with -1, which picks the trailing NaT.
+    start = np.concatenate([start_u.to_numpy(dtype="datetime64[ns]"), nat])[codes]
+    end = np.concatenate([end_u.to_numpy(dtype="datetime64[ns]"), nat])[codes]
+    return pd.Series(start, index=values.index), pd.Series(end, index=values.index)
+
+
 def load_sheet(xlsx_path: Path, sheet: str) -> pd.DataFrame:
     raw = pd.read_excel(xlsx_path, sheet_name=sheet, header=0)
     header_row = raw.iloc[0]
@@ -72,13 +126,145 @@ def load_sheet(xlsx_path: Path, sheet: str) -> pd.DataFrame:
         df = df.rename(columns={"정당지지율(%)": "더불어민주당"})
 
     # parse dates
-    ranges = df["조사일자"].apply(parse_range)
-    df["date_start"] = ranges.apply(lambda x: x[0])
-    df["date_end"] = ranges.apply(lambda x: x[1])
+    df["date_start"], df["date_end"] = parse_range_series(df["조사일자"])
+    df["date_mid"] = df[["date_start", "date_end"]].mean(axis=1)
+    return df
+
+
+# Base columns downstream stages read; the other survey metadata is skipped when streaming.
+PIPELINE_BASE_COLS: List[str] = ["등록번호", "조사기관", "조사일자", "표본수(명)"]
+PARTY_HEADER = "정당지지율(%)"
+
+_SAMPLE_SIZE_JUNK_RE = re.compile(r"[^\d.]")
+
+
+def _cell_float(v: object) -> float:
+    # pd.to_numeric(errors="coerce") on a single cell.
+    if v is None or isinstance(v, bool):
+        return np.nan
+    if isinstance(v, (int, float)):
+        return float(v)
+    try:
+        return float(str(v).strip())
+    except ValueError:
+        return np.nan
+
+
+def _cell_sample_size(v: object) -> float:
+    # _parse_sample_size_col on a single cell.
+    cleaned = _SAMPLE_SIZE_JUNK_RE.sub("", str(v).replace(",", ""))
+    return _cell_float(cleaned) if cleaned else np.nan
+
+
+def _cell_value(v: object) -> object:
+    # pd.read_excel hands integral floats back as int.
+    if isinstance(v, float) and v.is_integer():
+        return int(v)
+    return v
+
+
+def stream_sheet(xlsx_path: Path, sheet: str) -> pd.DataFrame:
+    """
+    Low-memory `load_sheet`: streams rows through openpyxl read-only mode and
+    keeps only PIPELINE_BASE_COLS plus the party columns, as typed arrays.
+    Party names come from the second header row, and the '정당지지율(%)'
+    column becomes 더불어민주당 as in `load_sheet`. Trailing empty rows and
+    columns are dropped the way pd.read_excel drops them.
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(xlsx_path, read_only=True, data_only=True)
+    try:
+        rows = wb[sheet].iter_rows(values_only=True)
+        top = list(next(rows, ()))
+        sub = list(next(rows, ()))
+        if PARTY_HEADER not in top:
+            raise ValueError(f"'{PARTY_HEADER}' header not found in sheet {sheet!r} of {xlsx_path}")
+        start = top.index(PARTY_HEADER)
+        base_idx = {c: top.index(c) for c in PIPELINE_BASE_COLS if c in top}
+
+        def used_width(row: Sequence[object]) -> int:
+            return max((i + 1 for i, v in enumerate(row) if v is not None), default=0)
+
+        width = max(used_width(top), used_width(sub))
+        base: dict = {c: [] for c in base_idx}
+        parties: List[List[float]] = []
+        n_rows = n_kept = 0
+        for row in rows:
+            while len(parties) < len(row) - start:
+                parties.append([np.nan] * n_rows)
+            for c, i in base_idx.items():
+                base[c].append(row[i] if i < len(row) else None)
+            for j, col in enumerate(parties):
+                col.append(_cell_float(row[start + j]) if start + j < len(row) else np.nan)
+            n_rows += 1
+            w = used_width(row)
+            if w:
+                width = max(width, w)
+                n_kept = n_rows
+    finally:
+        wb.close()
+
+    data: dict = {}
+    for c in PIPELINE_BASE_COLS:
+        if c not in base:
+            continue
+        vals = base[c][:n_kept]
+        if c == "등록번호":
+            data[c] = np.array([_cell_float(v) for v in vals], dtype=float)
+        elif c == "표본수(명)":
+            data[c] = np.array([_cell_sample_size(v) for v in vals], dtype=float)
+        else:
+            data[c] = pd.Series([np.nan if v is None else _cell_value(v) for v in vals], dtype=object)
+
+    names: List[str] = []
+    for k in range(start, width):
+        if k == start:
+            names.append(PARTY_HEADER)
+        elif k < len(sub) and sub[k] is not None:
+            names.append(str(_cell_value(sub[k])).strip())
+        else:
+            names.append(str(top[k]) if k < len(top) and top[k] is not None else f"Unnamed: {k}")
+    for j, name in enumerate(names):
+        data[name] = np.asarray(parties[j][:n_kept], dtype=float) if j < len(parties) else np.full(n_kept, np.nan)
+    df = pd.DataFrame(data)
+
+    if "국민의힘" in df.columns and "더불어민주당" not in df.columns:
+        df = df.rename(columns={PARTY_HEADER: "더불어민주당"})
+    df["date_start"], df["date_end"] = parse_range_series(df["조사일자"])
     df["date_mid"] = df[["date_start", "date_end"]].mean(axis=1)
     return df
 
 
+def normalize_poll_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Type the columns downstream stages coerce anyway: party columns and
+    '표본수(명)' become float, '등록번호' numeric. Non-numeric cells become NaN.
+    """
+    out = df.reset_index(drop=True).copy()
+    for c in get_party_cols(out):
+        out[c] = pd.to_numeric(out[c], errors="coerce").astype(float)
+    if "표본수(명)" in out.columns:
+        out["표본수(명)"] = _parse_sample_size_col(out["표본수(명)"]).astype(float)
+    if "등록번호" in out.columns:
+        out["등록번호"] = pd.to_numeric(out["등록번호"], errors="coerce")
+    return out
+
+
+def load_poll_sheets(xlsx_path: Path, sheets: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """
+    Concatenate `stream_sheet` over `sheets` (default: SHEETS) and normalize the result.
+    The parsed frame is cached per workbook sha256, so repeated loads skip openpyxl.
+    """
+    sheets = list(SHEETS if sheets is None else sheets)
+
+    def build() -> pd.DataFrame:
+        df = pd.concat([stream_sheet(xlsx_path, s) for s in sheets], ignore_index=True)
+        return normalize_poll_frame(df)
+
+    return cached_frame(Path(xlsx_path), "party_support", build, variant="|".join(sheets))
+
+
 def get_party_cols(df: pd.DataFrame) -> List[str]:
     return [c for c in df.columns if c not in BASE_COLS and not str(c).startswith("__")]
 
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import hashlib
+import itertools
+from dataclasses import asdict, replace
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .blending import blend_time_series, house_effect_recursion, prepare_house_effect
+from .config import PipelineConfig
+
+# PipelineConfig fields a sweep may vary; everything else is taken from the base config.
+SWEEP_FIELDS = ["house_effect", "house_lambda", "house_clip", "house_min_obs", "sample_size_weight", "sample_eps"]
+
+
+def expand_grid(base: PipelineConfig, axes: Dict[str, Sequence]) -> List[PipelineConfig]:
+    """Cartesian product of `axes` (field -> values) applied to `base`, in axis order."""
+    unknown = [k for k in axes if k not in SWEEP_FIELDS]
+    if unknown:
+        raise ValueError(f"Not sweepable: {unknown}. Choose from {SWEEP_FIELDS}.")
+    keys = list(axes)
+    out = []
+    for values in itertools.product(*(axes[k] for k in keys)):
+        cfg = replace(base, **dict(zip(keys, values)))
+        if cfg.house_effect == "off":
+            # House parameters are unused; collapse them so duplicates drop out below.
+            cfg = replace(cfg, house_lambda=base.house_lambda, house_clip=base.house_clip, house_min_obs=base.house_min_obs)
+        out.append(cfg)
+    return list(dict.fromkeys(out))
+
+
+def _validate(cfg: PipelineConfig) -> None:
+    if not (0.0 <= cfg.house_lambda < 1.0):
+        raise ValueError(f"house_lambda must be in [0, 1): {cfg.house_lambda}")
+    if cfg.house_min_obs < 0:
+        raise ValueError(f"house_min_obs must be >= 0: {cfg.house_min_obs}")
+
+
+def _blend_input_frame(work: pd.DataFrame, party_cols: List[str], values: np.ndarray) -> pd.DataFrame:
+    # Just the columns blend_time_series reads, with the adjusted party values.
+    base_cols = [c for c in ("조사기관", "date_end", "표본수(명)") if c in work.columns]
+    frame = work[base_cols].copy()
+    for j, c in enumerate(party_cols):
+        frame[c] = values[:, j]
+    return frame
+
+
+def sweep_blended(
+    df: pd.DataFrame, weights: Dict[str, float], configs: Iterable[PipelineConfig]
+) -> List[Tuple[PipelineConfig, pd.DataFrame]]:
+    """
+    Blended series for each config, sharing work across the grid: the house-effect
+    baseline is prepared once per (sample weighting, sample_eps), and all
+    (lambda, clip, min_obs) points of that group run in one batched recursion.
+    Each result equals what run_pipeline would blend for that config.
+    """
+    configs = list(configs)
+    for cfg in configs:
+        _validate(cfg)
+    results: Dict[int, pd.DataFrame] = {}
+    groups: Dict[Tuple[str, str, float], List[int]] = {}
+    for i, cfg in enumerate(configs):
+        groups.setdefault((cfg.house_effect, cfg.sample_size_weight, float(cfg.sample_eps)), []).append(i)
+
+    for (house, sample_w, eps), idx in groups.items():
+        use_sample_w = sample_w == "on"
+
+        def blend(frame: pd.DataFrame) -> pd.DataFrame:
+            return blend_time_series(frame, weights, sample_size_weight=use_sample_w, sample_eps=eps)
+
+        if house == "off":
+            blended = blend(df)
+            for i in idx:
+                results[i] = blended
+            continue
+
+        inputs = prepare_house_effect(df, weights, sample_size_weight=use_sample_w, sample_eps=eps)
+        if inputs.work.empty or not inputs.party_cols:
+            for i in idx:
+                results[i] = blend(inputs.work)
+            continue
+        grid = [configs[i] for i in idx]
+        adjusted = house_effect_recursion(
+            inputs.raw,
+            inputs.base,
+            inputs.seg_starts,
+            inputs.seg_lens,
+            ewma_lambda=np.array([c.house_lambda for c in grid], dtype=float),
+            bias_clip=np.array([c.house_clip for c in grid], dtype=float),
+            min_obs=np.array([c.house_min_obs for c in grid]),
+        )[0]
+        for g, i in enumerate(idx):
+            results[i] = blend(_blend_input_frame(inputs.work, inputs.party_cols, adjusted[g]))
+    return [(configs[i], results[i]) for i in range(len(configs))]
+
+
+def config_table(configs: Sequence[PipelineConfig]) -> pd.DataFrame:
+    rows = []
+    for k, cfg in enumerate(configs):
+        d = asdict(cfg)
+        rows.append({"config_id": k, **{f: d[f] for f in SWEEP_FIELDS}})
+    return pd.DataFrame(rows, columns=["config_id"] + SWEEP_FIELDS)
+
+
+def stack_series(results: Sequence[Tuple[PipelineConfig, pd.DataFrame]]) -> pd.DataFrame:
+    """One long table: config_id, date_end, n_polls and the party columns of every blended series."""
+    parts = [blended.assign(config_id=k) for k, (_, blended) in enumerate(results)]
+    out = pd.concat(parts, ignore_index=True)
+    return out[["config_id"] + [c for c in out.columns if c != "config_id"]]
+
+
+def series_digest(blended: pd.DataFrame) -> str:
+    """Content hash of a blended series, so identical series are evaluated once downstream."""
+    h = hashlib.sha256()
+    h.update("|".join(map(str, blended.columns)).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(blended, index=False).to_numpy().tobytes())
+    return h.hexdigest()
@@ -0,0 +1,209 @@
+"""
+Huber-scaled inverse-variance pollster weighting.
+
+Each pollster's leave-one-out errors give a robust scale: the mean Huber loss,
+which is half the squared error for small misses and grows linearly past
+`delta`. Treating pollster errors as independent, sum_p scale_p * w_p^2 is a
+proxy for the blend's error variance; on the simplex its minimum puts weights
+proportional to 1/scale_p. A proximal term keeps each update near the previous
+weights. This does not fit the blend residual under Huber loss; the loss only
+makes the per-pollster scale robust to outlying polls.
+"""
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+OPTIMIZER_VERSION = 2
+
+
+def huber_loss(x: np.ndarray, delta: float) -> np.ndarray:
+    a = np.abs(x)
+    return np.where(a <= delta, 0.5 * a * a, delta * (a - 0.5 * delta))
+
+
+def project_to_simplex(v: np.ndarray) -> np.ndarray:
+    """Euclidean projection onto {w >= 0, sum(w) = 1} (sort-based, O(n log n))."""
+    n = len(v)
+    if n == 0:
+        return v.copy()
+    u = np.sort(v)[::-1]
+    css = np.cumsum(u) - 1.0
+    rho = np.nonzero(u - css / np.arange(1, n + 1) > 0)[0][-1]
+    return np.maximum(v - css[rho] / (rho + 1.0), 0.0)
+
+
+@dataclass
+class WeightOptimizerState:
+    """
+    Running sufficient statistics of per-pollster errors: the summed Huber
+    loss, the summed absolute error and the number of observations. Each
+    poll's share is kept by 등록번호 with its row content hash, so a revised
+    or removed row is taken back out; a date that gained, lost or changed a
+    row has all its polls refolded, as their consensus moved. Updating touches
+    only those polls.
+    """
+
+    delta: float
+    loss_sum: Dict[str, float] = field(default_factory=dict)
+    abs_sum: Dict[str, float] = field(default_factory=dict)
+    count: Dict[str, int] = field(default_factory=dict)
+    last_date: Optional[str] = None
+    weights: Dict[str, float] = field(default_factory=dict)
+    polls: Dict[str, dict] = field(default_factory=dict)
+
+    def _add(self, entry: dict, sign: float) -> None:
+        p = entry["pollster"]
+        self.loss_sum[p] = max(0.0, self.loss_sum.get(p, 0.0) + sign * entry["loss"])
+        self.abs_sum[p] = max(0.0, self.abs_sum.get(p, 0.0) + sign * entry["abs"])
+        self.count[p] = max(0, self.count.get(p, 0) + int(sign) * entry["count"])
+
+    def accumulate(self, errors: pd.DataFrame) -> int:
+        """
+        Fold errors ([key, hash, date_end, pollster, error], one row per poll
+        and party) of new, revised and same-date polls; returns the error
+        cells folded.
+        """
+        if errors.empty:
+            per_poll = pd.DataFrame(columns=["hash", "date_end", "pollster", "loss", "abs", "count"])
+        else:
+            err = errors["error"].to_numpy(dtype=float)
+            valid = ~np.isnan(err)
+            cells = errors.assign(
+                loss=np.where(valid, huber_loss(np.nan_to_num(err), self.delta), 0.0),
+                abs=np.where(valid, np.abs(np.nan_to_num(err)), 0.0),
+                count=valid.astype(int),
+            )
+            per_poll = cells.groupby(cells["key"].astype(str), sort=False).agg(
+                hash=("hash", "last"), date_end=("date_end", "last"), pollster=("pollster", "last"),
+                loss=("loss", "sum"), abs=("abs", "sum"), count=("count", "sum"),
+            )
+        dates = pd.DatetimeIndex(pd.to_datetime(per_poll["date_end"]))
+        keys = per_poll.index.to_numpy()
+        fresh = np.array([self.polls.get(k, {}).get("hash") != h for k, h in zip(keys, per_poll["hash"])], dtype=bool)
+        removed = set(self.polls) - set(keys)
+        dirty = set(dates[fresh]) | {pd.Timestamp(self.polls[k]["date"]) for k in removed}
+        dirty |= {pd.Timestamp(self.polls[k]["date"]) for k in keys[fresh] if k in self.polls}
+        refold = dates.isin(list(dirty))
+        for k in list(removed) + [k for k in keys[refold] if k in self.polls]:
+            self._add(self.polls.pop(k), -1.0)
+        folded = 0
+        for k, r, d in zip(keys[refold], per_poll[refold].itertuples(index=False), dates[refold]):
+            entry = {"hash": str(r.hash), "pollster": str(r.pollster), "date": str(d.date()),
+                     "loss": float(r.loss), "abs": float(r.abs), "count": int(r.count)}
+            self.polls[k] = entry
+            self._add(entry, 1.0)
+            folded += entry["count"]
+        if refold.any():
+            newest = dates[refold].max()
+            self.last_date = str(max(newest, pd.Timestamp(self.last_date)).date() if self.last_date else newest.date())
+        return folded
+
+    def scales(self, pollsters: List[str], prior_obs: float) -> np.ndarray:
+        """Mean Huber loss per pollster, shrunk toward the pooled mean by `prior_obs` pseudo-observations."""
+        return self._shrunk(self.loss_sum, pollsters, prior_obs)
+
+    def mae(self, pollsters: List[str], prior_obs: float) -> np.ndarray:
+        """Mean absolute error per pollster, shrunk like `scales`."""
+        return self._shrunk(self.abs_sum, pollsters, prior_obs)
+
+    def _shrunk(self, sums: Dict[str, float], pollsters: List[str], prior_obs: float) -> np.ndarray:
+        total_n = sum(self.count.values())
+        pooled = sum(sums.values()) / total_n if total_n else 1.0
+        return np.array(
+            [(sums.get(p, 0.0) + prior_obs * pooled) / (self.count.get(p, 0) + prior_obs) for p in pollsters]
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "version": OPTIMIZER_VERSION,
+            "loss": "huber",
+            "delta": self.delta,
+            "loss_sum": self.loss_sum,
+            "abs_sum": self.abs_sum,
+            "count": self.count,
+            "last_date": self.last_date,
+            "weights": self.weights,
+            "polls": self.polls,
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "WeightOptimizerState":
+        return cls(
+            delta=float(d["delta"]),
+            loss_sum={str(k): float(v) for k, v in d.get("loss_sum", {}).items()},
+            abs_sum={str(k): float(v) for k, v in d.get("abs_sum", {}).items()},
+            count={str(k): int(v) for k, v in d.get("count", {}).items()},
+            last_date=d.get("last_date"),
+            weights={str(k): float(v) for k, v in d.get("weights", {}).items()},
+            polls={str(k): dict(v) for k, v in d.get("polls", {}).items()},
+        )
+
+
+def load_optimizer_state(path: Path, delta: float) -> WeightOptimizerState:
+    """Saved state, or a fresh one when missing, unreadable or built with another delta."""
+    path = Path(path)
+    if path.exists():
+        try:
+            d = json.loads(path.read_text(encoding="utf-8"))
+            if d.get("version") == OPTIMIZER_VERSION and float(d.get("delta", -1)) == float(delta):
+                return WeightOptimizerState.from_dict(d)
+        except Exception:
+            pass
+    return WeightOptimizerState(delta=delta)
+
+
+def save_optimizer_state(path: Path, state: WeightOptimizerState) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(state.to_dict(), ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    tmp.replace(path)
+
+
+def solve_simplex_weights(
+    scales: np.ndarray,
+    anchor: np.ndarray,
+    prox: float,
+    max_iter: int = 500,
+    tol: float = 1e-10,
+) -> tuple[np.ndarray, dict]:
+    """
+    Projected gradient descent for the Huber-scaled inverse-variance weights
+
+        minimize  sum_p scale_p * w_p^2 + (prox / 2) * ||w - anchor||^2
+        s.t.      w >= 0, sum(w) = 1
+
+    i.e. the blend's error-variance proxy under independent pollster errors,
+    kept near the previous weights. Starts from `anchor` with step 1/L, L the
+    gradient's Lipschitz constant. Returns (weights, diagnostics).
+    """
+    w = project_to_simplex(anchor.astype(float))
+    lip = 2.0 * float(scales.max()) + prox
+    step = 1.0 / lip if lip > 0 else 1.0
+
+    def variance_proxy(x: np.ndarray) -> float:
+        return float(np.sum(scales * x * x) + 0.5 * prox * np.sum((x - anchor) ** 2))
+
+    obj0 = variance_proxy(w)
+    delta = np.inf
+    it = 0
+    for it in range(1, max_iter + 1):
+        grad = 2.0 * scales * w + prox * (w - anchor)
+        w_next = project_to_simplex(w - step * grad)
+        delta = float(np.abs(w_next - w).sum())
+        w = w_next
+        if delta < tol:
+            break
+    return w, {
+        "iterations": it,
+        "converged": bool(delta < tol),
+        "step_l1": delta,
+        "objective_start": obj0,
+        "objective": variance_proxy(w),
+    }
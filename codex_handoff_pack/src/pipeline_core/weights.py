@@ -6,12 +6,14 @@ from typing import Dict
 import pandas as pd
 
 from .constants import POLLSTERS
-def compute_weights_from_mae(mae_xlsx: Path) -> Dict[str, float]:
+
+
+def load_mae_seed(mae_xlsx: Path) -> Dict[str, float]:
     """
-    Expects a sheet with at least columns:
+    Per-pollster MAE from the accuracy workbook, in sheet order. Expects a sheet
+    with at least columns:
       - 조사기관
       - MAE (or a column whose name contains 'MAE')
-    Weight = 1/MAE, normalized to sum to 1.
     """
     wdf = pd.read_excel(mae_xlsx, sheet_name=0)
     mae_col = _find_mae_column(wdf)
@@ -19,26 +21,16 @@ def compute_weights_from_mae(mae_xlsx: Path) -> Dict[str, float]:
     wdf = wdf[wdf["조사기관"].isin(POLLSTERS)].copy()
     wdf[mae_col] = pd.to_numeric(wdf[mae_col], errors="coerce")
     wdf = wdf.dropna(subset=[mae_col])
+    return wdf.set_index("조사기관")[mae_col].to_dict()
+
 
-    weights = (1.0 / wdf.set_index("조사기관")[mae_col]).to_dict()
+def weights_from_mae(mae: Dict[str, float]) -> Dict[str, float]:
+    """Weight = 1/MAE, normalized to sum to 1."""
+    weights = {k: 1.0 / v for k, v in mae.items()}
     s = sum(weights.values())
     return {k: v / s for k, v in weights.items()}
 
 
-def build_weights_table(mae_xlsx: Path, weights: Dict[str, float]) -> pd.DataFrame:
-    wdf = pd.read_excel(mae_xlsx, sheet_name=0)
-    mae_col = _find_mae_column(wdf)
-
-    wdf = wdf[wdf["조사기관"].isin(POLLSTERS)].copy()
-    wdf[mae_col] = pd.to_numeric(wdf[mae_col], errors="coerce")
-    wdf = wdf.dropna(subset=[mae_col])
-    out = wdf[["조사기관", mae_col]].copy()
-    out = out.rename(columns={mae_col: "mae"})
-    out["weight"] = out["조사기관"].map(weights).fillna(0.0)
-    out["weight_pct"] = out["weight"] * 100.0
-    return out.sort_values("weight", ascending=False).reset_index(drop=True)
-
-
 def _find_mae_column(df: pd.DataFrame):
     for c in df.columns:
         if "MAE" in str(c).upper():
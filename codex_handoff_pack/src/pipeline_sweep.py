@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import pandas as pd
+
+from backtest_report import build_summary, run_backtest
+from forecast import load_approval_weekly, to_weekly
+from pipeline_core.config import build_parser, config_from_namespace
+from pipeline_core.parse_cache import _parquet_available
+from pipeline_core.runner import load_inputs, select_weights
+from pipeline_core.sweep import SWEEP_FIELDS, config_table, expand_grid, series_digest, stack_series, sweep_blended
+
+
+def _parse_axis(spec: str, base) -> tuple[str, List]:
+    """'house_lambda=0.6,0.7,0.8' -> ('house_lambda', [0.6, 0.7, 0.8]), typed like the base field."""
+    if "=" not in spec:
+        raise SystemExit(f"--sweep expects FIELD=v1,v2,...: {spec}")
+    name, values = spec.split("=", 1)
+    name = name.strip().replace("-", "_")
+    if name not in SWEEP_FIELDS:
+        raise SystemExit(f"--sweep field must be one of {SWEEP_FIELDS}: {name}")
+    cast = type(getattr(base, name))
+    return name, [cast(v.strip()) for v in values.split(",") if v.strip()]
+
+
+def _write_table(df: pd.DataFrame, path: Path) -> Path:
+    if path.suffix == ".parquet" and not _parquet_available():
+        path = path.with_suffix(".csv")
+    if path.suffix == ".parquet":
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+    return path
+
+
+def main() -> None:
+    ap = build_parser("Evaluate a grid of blending configs on one load of the inputs.")
+    ap.add_argument(
+        "--sweep",
+        action="append",
+        default=[],
+        metavar="FIELD=V1,V2",
+        help=f"Grid axis (repeatable). FIELD is one of: {', '.join(SWEEP_FIELDS)}",
+    )
+    ap.add_argument("--sweep-out-dir", default="outputs/sweep", help="Directory for sweep tables")
+    ap.add_argument("--backtest", choices=["on", "off"], default="off", help="Run the rolling backtest on every distinct series")
+    ap.add_argument("--min-train-weeks", type=int, default=20)
+    ap.add_argument("--window-weeks", type=int, default=24)
+    ap.add_argument("--horizon-weeks", type=int, default=1)
+    ap.add_argument("--regime-guard", choices=["on", "off"], default="on")
+    ap.add_argument("--regime-q-scale", type=float, default=2.0)
+    ap.add_argument("--exog-approval", choices=["off", "on"], default="off")
+    ap.add_argument("--approval-weekly-csv", default="outputs/president_approval_weekly.csv")
+    ap.add_argument("--jobs", type=int, default=1, help="Worker processes per backtest (0 = CPU count)")
+    args = ap.parse_args()
+
+    base = config_from_namespace(args)
+    axes: Dict[str, List] = dict(_parse_axis(s, base) for s in args.sweep)
+    configs = expand_grid(base, axes)
+    _, _, df, accuracy = load_inputs(base)
+    weights_df = select_weights(base, accuracy)
+    weights = dict(zip(weights_df["조사기관"], weights_df["weight"].astype(float)))
+
+    t0 = time.perf_counter()
+    results = sweep_blended(df, weights, configs)
+    print(f"Blended {len(configs)} configs in {time.perf_counter() - t0:.2f}s")
+
+    out_dir = Path(args.sweep_out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    table = config_table(configs)
+    table["series_digest"] = [series_digest(blended) for _, blended in results]
+    configs_out = out_dir / "sweep_configs.csv"
+    table.to_csv(configs_out, index=False)
+    series_out = _write_table(stack_series(results), out_dir / "sweep_series.parquet")
+    print("Wrote:", configs_out)
+    print("Wrote:", series_out)
+    print(f"Distinct series: {table['series_digest'].nunique()}")
+
+    if args.backtest == "off":
+        return
+
+    approval_weekly = (
+        load_approval_weekly(Path(args.approval_weekly_csv))
+        if args.exog_approval == "on"
+        else pd.Series(dtype=float)
+    )
+    t0 = time.perf_counter()
+    by_digest: Dict[str, pd.DataFrame] = {}
+    for (_, blended), digest in zip(results, table["series_digest"]):
+        if digest in by_digest:
+            continue
+        preds = run_backtest(
+            weekly=to_weekly(blended),
+            approval_weekly=approval_weekly,
+            min_train_weeks=args.min_train_weeks,
+            window_weeks=args.window_weeks,
+            horizon_weeks=args.horizon_weeks,
+            regime_guard=(args.regime_guard == "on"),
+            regime_q_scale=args.regime_q_scale,
+            exog_approval=(args.exog_approval == "on"),
+            jobs=args.jobs,
+        )
+        summary = build_summary(preds)
+        by_digest[digest] = summary[summary["level"] == "overall"][["model", "n", "mae", "rmse"]]
+    print(f"Backtested {len(by_digest)} distinct series in {time.perf_counter() - t0:.2f}s")
+
+    scores = pd.concat(
+        [by_digest[d].assign(series_digest=d) for d in by_digest], ignore_index=True
+    )
+    board = table.merge(scores, on="series_digest", how="inner").sort_values(["model", "mae", "config_id"], kind="mergesort")
+    backtest_out = out_dir / "sweep_backtest.csv"
+    board.to_csv(backtest_out, index=False)
+    print("Wrote:", backtest_out)
+    best = board.groupby("model", sort=False).head(3)
+    print(best[["model", "config_id"] + list(axes) + ["n", "mae", "rmse"]].to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
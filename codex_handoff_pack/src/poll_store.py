@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+import pandas as pd
+
+from pipeline_core.constants import SHEETS
+from pipeline_core.poll_store import (
+    PollStore,
+    archive_dated_workbooks,
+    ingest_workbooks,
+    manifest_workbooks,
+    store_summary,
+)
+
+DEFAULT_STORE = "outputs/poll_store"
+
+
+def cmd_ingest(args: argparse.Namespace) -> None:
+    store = PollStore(Path(args.store))
+    workbooks = []
+    if args.manifest and Path(args.manifest).exists():
+        workbooks += manifest_workbooks(Path(args.manifest), Path(args.base))
+    if args.archive_dir:
+        workbooks += archive_dated_workbooks(Path(args.archive_dir))
+    if args.workbook:
+        if not args.posted_date:
+            raise SystemExit("--workbook needs --posted-date (the day NESDC published it)")
+        workbooks.append((pd.Timestamp(args.posted_date), Path(args.workbook)))
+    if not workbooks:
+        print("No workbooks to ingest.")
+        return
+    sheets = None if args.sheets == "all" else SHEETS
+    for info in ingest_workbooks(store, workbooks, sheets=sheets, jobs=args.load_jobs or None):
+        if "skipped" in info:
+            print(f"- {info['known_from']} {info['source']}: {info['skipped']}")
+        else:
+            print(
+                f"- {info['known_from']} {info['source']}: {info['rows']} rows "
+                f"(+{info['added']} ~{info['modified']} -{info['removed']})"
+            )
+    print(f"Vintages in {store.root}: {len(store.vintages)}")
+
+
+def cmd_list(args: argparse.Namespace) -> None:
+    print(store_summary(PollStore(Path(args.store))).to_string(index=False))
+
+
+def cmd_snapshot(args: argparse.Namespace) -> None:
+    store = PollStore(Path(args.store))
+    df = store.as_of(args.as_of, effective_until=args.effective_until)
+    vintage = store.vintage_at(args.as_of)
+    print(f"As of {args.as_of}: vintage {vintage['known_from']} ({vintage['source']}), {len(df)} rows")
+    if args.out:
+        out = Path(args.out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        if out.suffix == ".parquet":
+            df.to_parquet(out, index=False)
+        else:
+            df.to_csv(out, index=False)
+        print("Wrote:", out)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Append-only point-in-time store of raw NESDC poll rows.")
+    ap.add_argument("--store", default=DEFAULT_STORE, help="Store directory")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("ingest", help="Append workbooks as vintages first seen on their posted dates")
+    p.add_argument("--manifest", default="outputs/nesdc_fetch_manifest.csv", help="fetch_nesdc_weekly.py manifest")
+    p.add_argument("--base", default=".", help="Directory the manifest local_path values are relative to")
+    p.add_argument("--archive-dir", default=None, help="Downloads named <posted date>_ntt<id>_<file>.xlsx (e.g. data/nesdc_downloads)")
+    p.add_argument("--workbook", default=None, help="One more workbook to ingest, with --posted-date")
+    p.add_argument("--posted-date", default=None)
+    p.add_argument("--sheets", choices=["default", "all"], default="default")
+    p.add_argument("--load-jobs", type=int, default=0, help="Worker processes for parsing uncached sheets (0 = CPU count)")
+    p.set_defaults(func=cmd_ingest)
+
+    p = sub.add_parser("list", help="Vintages and the row versions each one appended")
+    p.set_defaults(func=cmd_list)
+
+    p = sub.add_parser("snapshot", help="Materialize the rows known on a date")
+    p.add_argument("--as-of", required=True, help="Transaction date: rows first seen on or before it")
+    p.add_argument("--effective-until", default=None, help="Only polls whose date_end is on or before this date")
+    p.add_argument("--out", default=None, help="CSV or .parquet path for the rows")
+    p.set_defaults(func=cmd_snapshot)
+
+    args = ap.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,8 @@ from pathlib import Path
 import numpy as np
 import pandas as pd
 
+from pipeline_core.parse_cache import cached_frame
+
 
 RAW_COLUMNS = [
     "poll_end_date",
@@ -107,9 +109,19 @@ def _sheet_has_president_context(df: pd.DataFrame, sheet_name: str) -> bool:
 
 
 def extract_president_rows_from_xlsx(xlsx_path: Path) -> pd.DataFrame:
-    rows: list[dict] = []
     if not xlsx_path.exists():
         return pd.DataFrame(columns=RAW_COLUMNS)
+    # source_url embeds the file name, so it is part of the cache key.
+    return cached_frame(
+        xlsx_path,
+        "president_rows",
+        lambda: _extract_president_rows(xlsx_path),
+        variant=xlsx_path.name,
+    )
+
+
+def _extract_president_rows(xlsx_path: Path) -> pd.DataFrame:
+    rows: list[dict] = []
 
     xl = pd.ExcelFile(xlsx_path)
     for sheet in xl.sheet_names:
@@ -13,6 +13,8 @@ from zoneinfo import ZoneInfo
 
 import pandas as pd
 
+from pipeline_core.pollster_accuracy import read_weights_table
+
 PARTY_STYLES = {
     "더불어민주당": {"color": "#003B96", "aliases": ["더불어민주당"]},
     "국민의힘": {"color": "#E61E2B", "aliases": ["국민의힘", "국민의 힘"]},
@@ -2151,28 +2153,12 @@ def load_forecast(outputs: Path) -> pd.DataFrame:
     raise FileNotFoundError("No forecast workbook found in outputs/")
 
 
-def load_weights(base: Path, outputs: Path) -> pd.DataFrame:
-    weights_csv = outputs / "weights.csv"
-    if weights_csv.exists():
-        w = pd.read_csv(weights_csv)
-        if {"조사기관", "mae", "weight", "weight_pct"}.issubset(w.columns):
-            return w.sort_values("weight", ascending=False).reset_index(drop=True)
-
-    mae_path = base / "data" / "pollster_accuracy_clusters_2024_2025.xlsx"
-    if not mae_path.exists():
-        return pd.DataFrame(columns=["조사기관", "mae", "weight", "weight_pct"])
-    m = pd.read_excel(mae_path, sheet_name=0)
-    mae_col = next((c for c in m.columns if "MAE" in str(c).upper()), None)
-    if mae_col is None or "조사기관" not in m.columns:
-        return pd.DataFrame(columns=["조사기관", "mae", "weight", "weight_pct"])
-    m = m[m["조사기관"].isin(POLLSTERS)].copy()
-    m[mae_col] = pd.to_numeric(m[mae_col], errors="coerce")
-    m = m.dropna(subset=[mae_col])
-    m["weight"] = 1.0 / m[mae_col]
-    m["weight"] = m["weight"] / m["weight"].sum()
-    m["weight_pct"] = m["weight"] * 100.0
-    out = m[["조사기관", mae_col, "weight", "weight_pct"]].rename(columns={mae_col: "mae"})
-    return out.sort_values("weight", ascending=False).reset_index(drop=True)
+def load_weights(outputs: Path) -> pd.DataFrame:
+    # Shared artifact written by the pipeline; the MAE workbook is only its initial seed.
+    weights = read_weights_table(outputs)
+    if weights.empty:
+        print(f"No pollster weights in {outputs} (weights.csv or pollster_accuracy.json); run src/pipeline.py first.")
+    return weights
 
 
 def load_recent_articles(base: Path) -> pd.DataFrame:
@@ -3431,7 +3417,7 @@ def main():
 
     blended = load_blended(outputs)
     forecast = load_forecast(outputs)
-    weights = load_weights(base, outputs)
+    weights = load_weights(outputs)
     articles, news_source = resolve_news_articles(base, outputs)
     backtest_overall = load_backtest_overall(outputs)
     president_overall = load_president_approval_overall(outputs)
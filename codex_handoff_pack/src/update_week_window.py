@@ -13,11 +13,30 @@ from bs4 import BeautifulSoup
 
 try:
     from pipeline_core.constants import POLLSTERS, SHEETS
-    from pipeline_core.sheet_loading import load_sheet
+    from pipeline_core.input_resolution import find_raw_poll_xlsx
+    from pipeline_core.pollster_accuracy import read_weights_table
+    from pipeline_core.sheet_loading import load_poll_sheets
 except Exception:
     # Backward compatibility for repos that still use monolithic pipeline module.
     from pipeline import POLLSTERS, SHEETS, load_sheet
 
+    def load_poll_sheets(xlsx_path: Path) -> pd.DataFrame:
+        return pd.concat([load_sheet(xlsx_path, s) for s in SHEETS], ignore_index=True)
+
+    def find_raw_poll_xlsx(data_dir: Path) -> Path | None:
+        cands = sorted(data_dir.glob("*.xlsx"), key=lambda p: p.stat().st_mtime, reverse=True)
+        for c in cands:
+            try:
+                x = pd.ExcelFile(c)
+            except Exception:
+                continue
+            if all(s in x.sheet_names for s in SHEETS):
+                return c
+        return None
+
+    def read_weights_table(outputs: Path) -> pd.DataFrame:
+        return pd.read_csv(outputs / "weights.csv")
+
 WEEK_START = pd.Timestamp("2026-02-09")
 WEEK_END = pd.Timestamp("2026-02-15")
 USER_AGENT = (
@@ -174,20 +193,15 @@ class UpdateArtifacts:
 
 
 def find_raw_input(data_dir: Path) -> Path:
-    cands = sorted(data_dir.glob("*.xlsx"), key=lambda p: p.stat().st_mtime, reverse=True)
-    for c in cands:
-        try:
-            x = pd.ExcelFile(c)
-        except Exception:
-            continue
-        if all(s in x.sheet_names for s in SHEETS):
-            return c
-    raise FileNotFoundError("Raw polling workbook not found in data/")
+    found = find_raw_poll_xlsx(data_dir)
+    if found is None:
+        raise FileNotFoundError("Raw polling workbook not found in data/")
+    return found
 
 
 def load_historical_raw(data_dir: Path) -> pd.DataFrame:
     raw_path = find_raw_input(data_dir)
-    df = pd.concat([load_sheet(raw_path, s) for s in SHEETS], ignore_index=True)
+    df = load_poll_sheets(raw_path)
     df = df[df["조사기관"].isin(POLLSTERS)].copy()
     return df
 
@@ -486,7 +500,7 @@ def run_update(base_dir: Path, observed_jsonl: Path) -> UpdateArtifacts:
     data_dir = base_dir / "data"
 
     blended = pd.read_excel(outputs / "weighted_time_series.xlsx", sheet_name="weighted_time_series")
-    weights_df = pd.read_csv(outputs / "weights.csv")
+    weights_df = read_weights_table(outputs)
     party_cols = party_columns_from_blended(blended)
 
     raw_df = load_historical_raw(data_dir)
@@ -3,20 +3,43 @@ Weekly run skeleton:
 - (optional) scrape latest public releases per pollster (only if full party breakdown is text-available)
 - update blended series
 - compare to last week's forecast, compute errors
-- update weights to reduce error (placeholder)
+- update weights: Huber-scaled inverse-variance weighting (online, simplex-constrained)
 - re-forecast next week
 
-NOTE: This is a scaffold. Plug in your scraper and an optimizer.
+NOTE: This is a scaffold. Plug in your scraper.
 """
 from __future__ import annotations
 
+from datetime import datetime
 from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
 import pandas as pd
 
-WEIGHT_UPDATE_LOSS = "huber"  # selected default: robust to outliers
+from pipeline_core.change_detection import PipelineSnapshot
+from pipeline_core.constants import POLLSTERS
+from pipeline_core.poll_store import row_hashes
+from pipeline_core.pollster_accuracy import (
+    OPTIMIZED_WEIGHTS,
+    WEIGHTS_COLUMNS,
+    leave_one_out_residuals,
+    read_weights_table,
+)
+from pipeline_core.weight_update import (
+    WeightOptimizerState,
+    load_optimizer_state,
+    save_optimizer_state,
+    solve_simplex_weights,
+)
+
+WEIGHT_UPDATE_LOSS = "huber"  # selected default: Huber scale per pollster, robust to outliers
 TEXT_ONLY_SCRAPING = True  # selected default: skip PDF/table parsing
 RUN_SCHEDULE = "weekly_monday_09_00"
 RUN_TIMEZONE = "Asia/Seoul"
+HUBER_DELTA = 1.5  # percentage points; residuals beyond this count linearly
+PRIOR_OBS = 20.0  # pseudo-observations shrinking each pollster toward the pooled loss
+ANCHOR_STRENGTH = 1.0  # proximal pull toward last week's weights, relative to the mean loss
 
 
 def scrape_latest_public_points() -> pd.DataFrame:
@@ -33,18 +56,85 @@ def scrape_latest_public_points() -> pd.DataFrame:
     return pd.DataFrame()
 
 
-def update_weights(prev_weights: pd.DataFrame, errors: pd.DataFrame) -> pd.DataFrame:
+def _pollster_col(weights: pd.DataFrame) -> str:
+    return "조사기관" if "조사기관" in weights.columns else "pollster"
+
+
+def errors_from_polls(polls: pd.DataFrame, weights: Dict[str, float]) -> pd.DataFrame:
     """
-    Placeholder for constrained optimization:
-      minimize loss(errors; weights) s.t. w>=0, sum(w)=1
+    Per-pollster errors, one row per (poll, party): the poll's value minus the
+    same-date blend of the other pollsters, keyed by 등록번호 and row content hash.
+    """
+    cols = ["key", "hash", "date_end", "pollster", "error"]
+    if polls is None or polls.empty:
+        return pd.DataFrame(columns=cols)
+    rows = polls[polls["조사기관"].isin(list(weights)) & polls["등록번호"].notna() & polls["date_end"].notna()]
+    rows = rows[~rows["등록번호"].astype(int).duplicated(keep="last")]
+    resid = leave_one_out_residuals(polls[polls["조사기관"].isin(list(weights))], weights).reindex(rows.index)
+    ids = pd.DataFrame(
+        {
+            "key": rows["등록번호"].astype(int).astype(str),
+            "hash": np.char.mod("%016x", row_hashes(rows)) if len(rows) else [],
+            "date_end": pd.to_datetime(rows["date_end"]),
+            "pollster": rows["조사기관"].astype(str),
+        },
+        index=rows.index,
+    )
+    long = resid.join(ids).melt(id_vars=cols[:-1], value_name="error")
+    return long[cols]
+
+
+def update_weights(
+    prev_weights: pd.DataFrame,
+    errors: pd.DataFrame,
+    state: Optional[WeightOptimizerState] = None,
+    prior_obs: float = PRIOR_OBS,
+    anchor_strength: float = ANCHOR_STRENGTH,
+) -> tuple[pd.DataFrame, WeightOptimizerState, dict]:
+    """
+    Constrained online update (Huber-scaled inverse-variance weighting):
+      minimize sum_p huber_scale_p * w_p^2 + rho/2 * ||w - w_prev||^2  s.t. w>=0, sum(w)=1
+    huber_scale_p is pollster p's mean Huber loss of its leave-one-out errors; the
+    objective is a blend-variance proxy, not a Huber fit of the blend residual.
 
     Inputs:
-      - prev_weights: columns [pollster, weight]
-      - errors: per-week errors by pollster (design your schema)
+      - prev_weights: weights.csv ([조사기관 or pollster, weight, ...]); warm start and anchor
+      - errors: [key, hash, date_end, pollster, error] from `errors_from_polls`; only new,
+        revised and same-date polls are folded into the running Huber statistics
+      - state: running statistics from the previous run (fresh if None)
+    Returns (weights table in the input schema, updated state, diagnostics). A `mae`
+    column is refilled with the shrunk leave-one-out MAE the weights were solved from.
     """
-    # TODO: implement optimizer with simplex projection.
-    # Use WEIGHT_UPDATE_LOSS='huber' as baseline.
-    return prev_weights
+    if WEIGHT_UPDATE_LOSS != "huber":
+        raise ValueError(f"Unsupported weight-update loss: {WEIGHT_UPDATE_LOSS}")
+    state = state if state is not None else WeightOptimizerState(delta=HUBER_DELTA)
+    new_obs = state.accumulate(errors)
+
+    col = _pollster_col(prev_weights)
+    table = prev_weights.copy()
+    if table.empty:
+        table = pd.DataFrame({col: POLLSTERS, "weight": 1.0 / len(POLLSTERS)})
+    pollsters = table[col].astype(str).tolist()
+    anchor = pd.to_numeric(table["weight"], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    anchor = anchor / anchor.sum() if anchor.sum() > 0 else np.full(len(anchor), 1.0 / len(anchor))
+
+    if new_obs == 0:
+        # Nothing new to learn from; re-solving would only drift further from the anchor.
+        w, diag = anchor, {"iterations": 0, "converged": True, "step_l1": 0.0, "objective_start": np.nan, "objective": np.nan}
+    else:
+        scales = state.scales(pollsters, prior_obs)
+        w, diag = solve_simplex_weights(scales, anchor, prox=anchor_strength * float(scales.mean()))
+    state.weights = dict(zip(pollsters, w.tolist()))
+
+    table["weight"] = w
+    if "weight_pct" in table.columns:
+        table["weight_pct"] = w * 100.0
+    if "mae" in table.columns:
+        table["mae"] = state.mae(pollsters, prior_obs)
+    table = table.sort_values("weight", ascending=False, kind="mergesort").reset_index(drop=True)
+    diag.update(new_obs=new_obs, total_obs=int(sum(state.count.values())), last_date=state.last_date,
+                max_weight_change=float(np.abs(w - anchor).max()) if len(w) else 0.0)
+    return table, state, diag
 
 
 def main():
@@ -54,19 +144,17 @@ def main():
     print(f"Schedule: {RUN_SCHEDULE} ({RUN_TIMEZONE})")
     print(f"Weight loss: {WEIGHT_UPDATE_LOSS}, text-only scraping: {TEXT_ONLY_SCRAPING}")
 
-    # Load current blended + weights
-    blended_path = outputs / "weighted_time_series.xlsx"
+    # Optimized weights go to their own file; `pipeline.py --pollster-weights optimized`
+    # blends with them. weights.csv stays what the last pipeline run blended with.
     weights_path = outputs / "weights.csv"
+    optimized_path = outputs / OPTIMIZED_WEIGHTS
+    state_path = outputs / "weight_optimizer_state.json"
+    log_path = outputs / "weight_update_log.csv"
 
-    if blended_path.exists():
-        blended = pd.read_excel(blended_path)
-    else:
-        blended = pd.DataFrame()
-
-    if weights_path.exists():
-        weights = pd.read_csv(weights_path)
-    else:
-        weights = pd.DataFrame(columns=["pollster", "weight"])
+    blend_weights = read_weights_table(outputs)
+    weights = pd.read_csv(optimized_path, float_precision="round_trip") if optimized_path.exists() else blend_weights
+    if weights.empty:
+        weights = pd.DataFrame(columns=WEIGHTS_COLUMNS)
 
     # 1) scrape
     new_points = scrape_latest_public_points()
@@ -74,14 +162,26 @@ def main():
         # TODO merge into your raw store, rebuild blended, etc.
         pass
 
-    # 2) compare errors vs last forecast (if exists)
-    # TODO
+    # 2) per-pollster errors: each poll against the other pollsters' same-date blend,
+    #    from the parsed rows of the last pipeline run
+    polls = PipelineSnapshot(outputs).frame("rows")
+    errors_df = errors_from_polls(polls, dict(zip(blend_weights["조사기관"], blend_weights["weight"])))
 
     # 3) update weights
-    # errors_df = ...
-    # weights = update_weights(weights, errors_df)
-
-    weights.to_csv(weights_path, index=False)
+    state = load_optimizer_state(state_path, HUBER_DELTA)
+    weights, state, diag = update_weights(weights, errors_df, state)
+    save_optimizer_state(state_path, state)
+    log_row = pd.DataFrame([{"run_at": datetime.now().isoformat(timespec="seconds"), **diag}])
+    log_row.to_csv(log_path, mode="a", header=not log_path.exists(), index=False)
+    print(
+        f"Weight update: +{diag['new_obs']} obs (total {diag['total_obs']}, through {diag['last_date']}), "
+        f"{diag['iterations']} iters, converged={diag['converged']}, "
+        f"objective {diag['objective_start']:.6g} -> {diag['objective']:.6g}, max |dw|={diag['max_weight_change']:.4f}"
+    )
+
+    weights.to_csv(optimized_path, index=False)
+    print("Wrote:", optimized_path)
+    print("Wrote:", state_path)
     print("Done.")
 
 if __name__ == "__main__":